@@ -0,0 +1,792 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Archivos DXF del editor de trazos
+Lectura y escritura de dibujos en DXF, independiente de Tkinter: la usan
+los hilos de trabajo del editor y la conversión por lotes (lote.py).
+
+Contenido:
+- Aplanado de entidades a polilíneas en mm y escala de unidades
+- Expansión de bloques (INSERT/MINSERT, anidados) con una cache por bloque
+- Encuadre del dibujo importado y conversión al modelo del editor
+- Unión de piezas contiguas y simplificación de la geometría importada
+- Entidades de exportación y escritura (documento ezdxf o flujo R12), con
+  los trazos opcionalmente ajustados como polilíneas con arcos (bulges)
+- Equivalencias entre colores del editor y AutoCAD Color Index (ACI)
+"""
+
+import math
+
+import ezdxf
+import numpy as np
+from ezdxf import units
+from ezdxf.addons import r12writer
+
+from geometria import (FLATTENING_DISTANCE, arc_points, bulge_polyline_points, chain_polylines,
+                       fit_polylines, reverse_bulge_polyline, simplify_polylines)
+from modelo import Stroke, as_points_array, points_bbox
+
+# Entidades DXF que se importan como trazos (polilíneas)
+DXF_STROKE_TYPES = ("LWPOLYLINE", "POLYLINE", "SPLINE", "ARC", "ELLIPSE")
+
+# Unión de piezas DXF contiguas al importar: tipos que se unen y distancia
+# máxima entre extremos para considerarlos el mismo punto
+DXF_CHAIN_TYPES = DXF_STROKE_TYPES + ("LINE",)
+CHAIN_TOLERANCE = 0.01  # mm
+
+# Margen alrededor del dibujo importado, como fracción de su tamaño
+IMPORT_MARGIN = 0.1
+
+# Entidades aplanadas entre llamadas al progreso de la lectura
+IMPORT_BATCH_SIZE = 500
+
+# Desviación máxima al ajustar los trazos exportados con rectas y arcos
+FIT_TOLERANCE = 0.05  # mm
+
+# Mapeo básico de colores comunes
+_COLOR_TO_ACI = {
+    '#000000': 7,   # Blanco (en AutoCAD, negro se muestra como blanco)
+    '#FF0000': 1,   # Rojo
+    '#FFFF00': 2,   # Amarillo
+    '#00FF00': 3,   # Verde
+    '#00FFFF': 4,   # Cyan
+    '#0000FF': 5,   # Azul
+    '#FF00FF': 6,   # Magenta
+    '#FFFFFF': 7,   # Blanco
+}
+
+# Mapeo inverso
+_ACI_TO_COLOR = {
+    1: '#FF0000',  # Rojo
+    2: '#FFFF00',  # Amarillo
+    3: '#00FF00',  # Verde
+    4: '#00FFFF',  # Cyan
+    5: '#0000FF',  # Azul
+    6: '#FF00FF',  # Magenta
+    7: '#000000',  # Negro (blanco en AutoCAD)
+}
+
+
+def color_to_aci(hex_color):
+    """Convierte color hexadecimal a AutoCAD Color Index (ACI)."""
+    return _COLOR_TO_ACI.get(hex_color.upper(), 7)  # Por defecto blanco
+
+
+def aci_to_color(aci):
+    """Convierte AutoCAD Color Index (ACI) a color hexadecimal."""
+    return _ACI_TO_COLOR.get(aci, '#000000')  # Por defecto negro
+
+
+def unit_scale_to_mm(doc):
+    """Convierte las unidades del DXF a milímetros."""
+    # $INSUNITS no existe antes de R2000 (ezdxf completa la cabecera con
+    # metros): esos archivos, como los de la exportación R12, van en mm
+    if doc.dxfversion < "AC1015":
+        return 1.0
+    insunits = doc.header.get("$INSUNITS", doc.units)
+    unit_map = {
+        units.MM: 1.0,
+        units.CM: 10.0,
+        units.M: 1000.0,
+        units.IN: 25.4,
+        units.FT: 304.8,
+        0: 1.0,  # Unitless
+    }
+    return unit_map.get(insunits, 1.0)
+
+
+def entity_points_mm(entity, unit_scale, tolerance=FLATTENING_DISTANCE):
+    """
+    Devuelve los puntos (x, y) en mm de una entidad para calcular bbox y dibujar curvas.
+
+    Las curvas (SPLINE/ELLIPSE/ARC y los tramos con bulge de las
+    polilíneas) se aproximan con una desviación máxima de tolerance mm:
+    el número de puntos depende del tamaño de la curva, no es fijo.
+
+    Args:
+        entity: Entidad DXF
+        unit_scale: Factor de conversión de unidades del DXF a mm
+        tolerance: Desviación máxima de las curvas aproximadas (mm)
+
+    Returns:
+        numpy.ndarray: Arreglo (n, 2) en mm (vacío si la entidad no aporta puntos)
+    """
+    dtype = entity.dxftype()
+
+    if dtype in ("LWPOLYLINE", "POLYLINE"):
+        if dtype == "LWPOLYLINE":
+            vertices = entity.get_points("xyb")
+        else:
+            vertices = [(vertex.dxf.location.x, vertex.dxf.location.y, vertex.dxf.bulge)
+                        for vertex in entity.vertices]
+        vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+        if entity.is_closed and len(vertices) > 1 and vertices[-1, 2]:
+            # El bulge del último vértice describe el tramo que cierra la polilínea
+            vertices = np.vstack((vertices, vertices[:1]))
+        points = bulge_polyline_points(vertices, tolerance / unit_scale)
+
+    elif dtype == "LINE":
+        start = entity.dxf.start
+        end = entity.dxf.end
+        points = [(start.x, start.y), (end.x, end.y)]
+
+    elif dtype == "CIRCLE":
+        cx, cy = entity.dxf.center.x, entity.dxf.center.y
+        radius = entity.dxf.radius
+        points = [
+            (cx - radius, cy - radius),
+            (cx + radius, cy + radius),
+            (cx - radius, cy + radius),
+            (cx + radius, cy - radius),
+        ]
+
+    elif dtype == "ARC":
+        cx, cy = entity.dxf.center.x, entity.dxf.center.y
+        radius = entity.dxf.radius
+        start_angle = math.radians(entity.dxf.start_angle)
+        end_angle = math.radians(entity.dxf.end_angle)
+        if end_angle < start_angle:
+            end_angle += 2 * math.pi
+        # La tolerancia está en mm y el arco en unidades del DXF
+        points = arc_points((cx, cy), radius, start_angle, end_angle - start_angle,
+                            tolerance / unit_scale)
+
+    elif dtype in ("SPLINE", "ELLIPSE"):
+        try:
+            points = [(point.x, point.y)
+                      for point in entity.flattening(distance=tolerance / unit_scale)]
+        except Exception:
+            points = []
+
+    else:
+        points = []
+
+    return as_points_array(points) * unit_scale
+
+
+class BlockCache:
+    """
+    Definiciones de bloque aplanadas, para expandir INSERT y MINSERT.
+
+    Cada bloque se aplana una sola vez (por nivel de escala) a un único
+    arreglo de puntos en unidades del DXF; cada inserción lo reutiliza
+    con una transformación afín vectorizada (una multiplicación de
+    matrices por instancia) en lugar de volver a aplanar sus entidades.
+    Los INSERT anidados se expanden componiendo las transformaciones.
+
+    Una inserción ampliada amplía también el error de aplanado: los
+    bloques se aplanan de nuevo, con la tolerancia dividida por 2, cada
+    vez que la escala de la instancia se duplica.
+    """
+
+    __slots__ = ("blocks", "unit_scale", "tolerance", "_flat", "flattened", "instances")
+
+    # Anidamiento máximo de bloques (los bloques que se insertan a sí mismos se omiten)
+    MAX_DEPTH = 16
+
+    def __init__(self, blocks, unit_scale, tolerance=FLATTENING_DISTANCE):
+        """
+        Args:
+            blocks: Sección de bloques del documento (doc.blocks)
+            unit_scale: Factor de conversión de unidades del DXF a mm
+            tolerance: Desviación máxima de las curvas aproximadas (mm)
+        """
+        self.blocks = blocks
+        self.unit_scale = unit_scale
+        self.tolerance = tolerance
+        self._flat = {}  # (nombre, nivel) -> definición aplanada
+        self.flattened = 0  # Definiciones aplanadas
+        self.instances = 0  # Inserciones expandidas (contando las anidadas)
+
+    def insert_geometry(self, insert):
+        """
+        Expande un INSERT (o MINSERT) del modelspace.
+
+        Args:
+            insert: Entidad INSERT
+
+        Returns:
+            list: (dxftype, points_mm, aci) de cada entidad de las
+            instancias, en mm del dibujo
+        """
+        geometry = []
+        scale = self.unit_scale
+        for virtual in insert.multi_insert() if insert.mcount > 1 else (insert,):
+            matrix, offset = _insert_affine(virtual)
+            self._expand(virtual.dxf.name, matrix * scale, offset * scale,
+                         insert.dxf.color, geometry, ())
+        return geometry
+
+    def _expand(self, name, matrix, offset, color, geometry, parents):
+        """Agrega a geometry una instancia del bloque name y sus bloques anidados."""
+        if name in parents or len(parents) >= self.MAX_DEPTH:
+            return
+        # Escala de la instancia en unidades del DXF (la de mm se descuenta)
+        scale = np.sqrt((matrix ** 2).sum(axis=1)).max() / self.unit_scale
+        level = max(0, math.ceil(math.log2(scale) - 1e-9)) if scale > 0 else 0
+        flat = self._flat.get((name, level))
+        if flat is None:
+            flat = self._flat[(name, level)] = self._flatten(name, level)
+        if flat is None:
+            return
+        self.instances += 1
+
+        points, entries, circles, nested = flat
+        transformed = points @ matrix + offset
+        for dtype, aci, start, end in entries:
+            geometry.append((dtype, transformed[start:end], color if aci == 0 else aci))
+
+        if circles:
+            # Un círculo sigue siéndolo si la transformación no lo deforma
+            a, b = matrix
+            uniform = (abs(a @ b) <= 1e-9 * (a @ a)
+                       and abs(a @ a - b @ b) <= 1e-9 * (a @ a))
+            for center, radius, aci in circles:
+                aci = color if aci == 0 else aci
+                if uniform:
+                    cx, cy = np.asarray(center) @ matrix + offset
+                    r = radius * math.sqrt(a @ a)
+                    corners = np.array([(cx - r, cy - r), (cx + r, cy + r),
+                                        (cx - r, cy + r), (cx + r, cy - r)])
+                    geometry.append(("CIRCLE", corners, aci))
+                else:
+                    outline = arc_points(center, radius, 0.0, 2 * math.pi,
+                                         self._level_tolerance(level))
+                    geometry.append(("ELLIPSE", outline @ matrix + offset, aci))
+
+        parents = parents + (name,)
+        for child, child_matrix, child_offset, child_aci in nested:
+            self._expand(child, child_matrix @ matrix, child_offset @ matrix + offset,
+                         color if child_aci == 0 else child_aci, geometry, parents)
+
+    def _level_tolerance(self, level):
+        """Tolerancia de aplanado en unidades del DXF para un nivel de escala."""
+        return self.tolerance / self.unit_scale / 2 ** level
+
+    def _flatten(self, name, level):
+        """
+        Aplana la definición de un bloque.
+
+        Returns:
+            tuple: (points, entries, circles, nested) con todos los puntos
+            en un arreglo (n, 2), las entidades como (dxftype, aci, inicio,
+            fin) sobre ese arreglo, los círculos como (centro, radio, aci)
+            y los INSERT anidados como (nombre, matriz, desplazamiento,
+            aci); None si el bloque no existe
+        """
+        block = self.blocks.get(name)
+        if block is None:
+            return None
+        self.flattened += 1
+
+        tolerance = self._level_tolerance(level)
+        pieces = []
+        entries = []
+        circles = []
+        nested = []
+        size = 0
+        for entity in block:
+            dtype = entity.dxftype()
+            aci = entity.dxf.color
+            if dtype == "INSERT":
+                for virtual in entity.multi_insert() if entity.mcount > 1 else (entity,):
+                    matrix, offset = _insert_affine(virtual)
+                    nested.append((virtual.dxf.name, matrix, offset, aci))
+            elif dtype == "CIRCLE":
+                center = entity.dxf.center
+                circles.append(((center.x, center.y), entity.dxf.radius, aci))
+            else:
+                # Puntos en unidades del DXF: la escala a mm va en la transformación
+                points = entity_points_mm(entity, 1.0, tolerance)
+                if len(points):
+                    pieces.append(points)
+                    entries.append((dtype, aci, size, size + len(points)))
+                    size += len(points)
+
+        points = np.concatenate(pieces) if pieces else np.empty((0, 2))
+        return points, entries, circles, nested
+
+
+def _insert_affine(insert):
+    """
+    Transformación de un INSERT en el plano XY.
+
+    Returns:
+        tuple: (matrix, offset) con matrix (2, 2) y offset (2,) tales que
+        un punto p del bloque queda en p @ matrix + offset
+    """
+    m = insert.matrix44()
+    row_x, row_y, row_t = m.get_row(0), m.get_row(1), m.get_row(3)
+    return (np.array([row_x[:2], row_y[:2]], dtype=float),
+            np.array(row_t[:2], dtype=float))
+
+
+def collect_dxf_geometry(msp, unit_scale, progress=None, batch_size=IMPORT_BATCH_SIZE,
+                         blocks=None):
+    """
+    Recorre el modelspace una sola vez, aplanando cada entidad.
+
+    Cada curva (SPLINE/ELLIPSE/ARC) se aplana una única vez; los puntos
+    en mm quedan en una cache que luego se proyecta al modelo, y el
+    bounding box se acumula durante el mismo recorrido. Los INSERT se
+    expanden con blocks: sus entidades se agregan como si estuvieran en
+    el modelspace.
+
+    Args:
+        msp: Modelspace del documento DXF
+        unit_scale: Factor de conversión de unidades del DXF a mm
+        progress: Función opcional progress(done, total), llamada cada
+            batch_size entidades; puede lanzar una excepción para cancelar
+        batch_size: Entidades entre llamadas a progress
+        blocks: BlockCache para expandir los INSERT, o None para omitirlos
+
+    Returns:
+        tuple: (geometry, bbox) donde geometry es una lista de
+        (dxftype, points_mm, color) con points_mm como arreglo (n, 2) y
+        bbox es (min_x, min_y, max_x, max_y) o None si ninguna entidad
+        aportó puntos.
+    """
+    geometry = []
+    min_x = min_y = float("inf")
+    max_x = max_y = float("-inf")
+    total = len(msp)
+
+    for done, entity in enumerate(msp):
+        if progress is not None and done % batch_size == 0:
+            progress(done, total)
+
+        if entity.dxftype() == "INSERT":
+            if blocks is None:
+                continue
+            instance = blocks.insert_geometry(entity)
+            if not instance:
+                continue
+            # Un solo bbox para todas las entidades de la instancia
+            points_mm = np.concatenate([points for _, points, _ in instance])
+            geometry.extend((dtype, points, aci_to_color(aci)) for dtype, points, aci in instance)
+        else:
+            points_mm = entity_points_mm(entity, unit_scale)
+            if not len(points_mm):
+                continue
+            geometry.append((entity.dxftype(), points_mm, aci_to_color(entity.dxf.color)))
+
+        entity_min_x, entity_min_y, entity_max_x, entity_max_y = points_bbox(points_mm)
+        min_x = min(min_x, entity_min_x)
+        max_x = max(max_x, entity_max_x)
+        min_y = min(min_y, entity_min_y)
+        max_y = max(max_y, entity_max_y)
+
+    if min_x == float("inf"):
+        return geometry, None
+    return geometry, (min_x, min_y, max_x, max_y)
+
+
+def read_dxf(filename, progress=None, cache=None):
+    """
+    Lee un DXF y aplana su modelspace (ver collect_dxf_geometry),
+    expandiendo los INSERT y MINSERT con sus bloques (ver BlockCache).
+
+    Si ninguna entidad aporta puntos, el bounding box sale de la cabecera
+    ($EXTMIN/$EXTMAX) cuando existe.
+
+    Args:
+        filename: Ruta del archivo DXF
+        progress: Función opcional progress(done, total)
+        cache: cache_dxf.ImportCache, o None; si el archivo ya está en la
+            cache no se lee con ezdxf (y progress no se llama)
+
+    Returns:
+        tuple: (geometry, bbox) con bbox None si el dibujo está vacío; con
+        cache, los puntos pueden ser arreglos de sólo lectura
+    """
+    if cache is not None:
+        key = cache.key(filename)
+        cached = cache.load(key)
+        if cached is not None:
+            return cached
+
+    doc = ezdxf.readfile(filename)
+    unit_scale = unit_scale_to_mm(doc)
+    blocks = BlockCache(doc.blocks, unit_scale)
+    geometry, bbox = collect_dxf_geometry(doc.modelspace(), unit_scale, progress,
+                                          blocks=blocks)
+
+    if bbox is None:
+        extmin = doc.header.get("$EXTMIN")
+        extmax = doc.header.get("$EXTMAX")
+        if extmin and extmax:
+            # Según la versión, ezdxf devuelve Vec3 o tuplas
+            bbox = (extmin[0] * unit_scale, extmin[1] * unit_scale,
+                    extmax[0] * unit_scale, extmax[1] * unit_scale)
+
+    if cache is not None:
+        cache.store(key, geometry, bbox, unit_scale)
+    return geometry, bbox
+
+
+def import_frame(bbox, margin=IMPORT_MARGIN):
+    """
+    Encuadra el dibujo importado en un lienzo con margen.
+
+    Args:
+        bbox: (min_x, min_y, max_x, max_y) del dibujo en mm
+        margin: Margen a cada lado como fracción del tamaño del dibujo
+
+    Returns:
+        tuple: (frame, canvas_size) con frame = (min_x, max_y, margin_x,
+        margin_y) para to_model y canvas_size = (ancho, alto) en cm
+    """
+    min_x, min_y, max_x, max_y = bbox
+    width_mm = max_x - min_x
+    height_mm = max_y - min_y
+    margin_x = width_mm * margin
+    margin_y = height_mm * margin
+
+    canvas_size = ((width_mm + 2 * margin_x) / 10, (height_mm + 2 * margin_y) / 10)
+    return (min_x, max_y, margin_x, margin_y), canvas_size
+
+
+def to_model(points_mm, frame):
+    """
+    Traslada puntos del DXF (mm) al modelo del editor.
+
+    La esquina superior izquierda del bbox con margen queda en el origen
+    del lienzo; la escala sigue en mm, independiente de la vista.
+
+    Args:
+        points_mm: Arreglo (n, 2) en mm del DXF
+        frame: Encuadre (min_x, max_y, margin_x, margin_y) de import_frame
+
+    Returns:
+        numpy.ndarray: Nuevo arreglo (n, 2) en mm del modelo
+    """
+    min_x, max_y, margin_x, margin_y = frame
+    return points_mm - (min_x - margin_x, max_y + margin_y)
+
+
+def geometry_to_model(geometry, frame):
+    """
+    Convierte geometría aplanada del DXF en trazos y formas del modelo.
+
+    Args:
+        geometry: Lista de (dxftype, points_mm, color) de collect_dxf_geometry
+        frame: Encuadre calculado para el dibujo (ver import_frame)
+
+    Returns:
+        tuple: (strokes, shapes) listos para agregar al editor
+    """
+    strokes = []
+    shapes = []
+
+    for dtype, points_mm, color in geometry:
+        if dtype in DXF_STROKE_TYPES:
+            if len(points_mm) > 1:
+                strokes.append(Stroke(to_model(points_mm, frame), color, 2))
+
+        elif dtype == "LINE":
+            start, end = to_model(points_mm, frame).tolist()
+
+            shapes.append({
+                "type": "line",
+                "start": tuple(start),
+                "end": tuple(end),
+                "color": color,
+                "width": 2
+            })
+
+        elif dtype == "CIRCLE":
+            # Los dos primeros puntos del CIRCLE son las esquinas
+            # opuestas de su bbox: (cx - r, cy - r) y (cx + r, cy + r)
+            (x0, y0), (x1, y1) = to_model(points_mm[:2], frame).tolist()
+            radius = (x1 - x0) / 2
+            center = ((x0 + x1) / 2, (y0 + y1) / 2)
+
+            shapes.append({
+                "type": "circle",
+                "start": center,
+                "end": (center[0] + radius, center[1]),
+                "color": color,
+                "width": 2
+            })
+
+    return strokes, shapes
+
+
+def chain_dxf_geometry(geometry, tolerance=CHAIN_TOLERANCE):
+    """
+    Une las piezas contiguas del mismo color en trazos continuos.
+
+    Los programas CAD suelen partir un contorno en cientos de LINE y ARC
+    sueltos; cada uno sería un trazo aparte y un levantamiento de la
+    herramienta. Las cadenas de más de una pieza pasan a ser una
+    polilínea ("LWPOLYLINE") en la posición de su primera pieza; las
+    piezas que no se unen a nada quedan como estaban.
+
+    Args:
+        geometry: Lista de (dxftype, points_mm, color) de collect_dxf_geometry
+        tolerance: Distancia máxima entre extremos unidos (mm)
+
+    Returns:
+        tuple: (geometry, pieces, chains, closed) con la nueva lista, el
+        número de piezas que podían unirse, el de trazos resultantes y
+        cuántos de ellos son contornos cerrados
+    """
+    by_color = {}
+    for index, (dtype, points_mm, color) in enumerate(geometry):
+        if dtype in DXF_CHAIN_TYPES and len(points_mm) > 1:
+            by_color.setdefault(color, []).append(index)
+
+    result = list(geometry)
+    pieces = chains = closed_count = 0
+    for color, indices in by_color.items():
+        pieces += len(indices)
+        for points_mm, chain, closed in chain_polylines(
+                [geometry[index][1] for index in indices], tolerance):
+            chains += 1
+            closed_count += closed
+            if len(chain) > 1:
+                members = [indices[i] for i in chain]
+                for index in members:
+                    result[index] = None
+                result[min(members)] = ("LWPOLYLINE", points_mm, color)
+
+    return [entry for entry in result if entry is not None], pieces, chains, closed_count
+
+
+def simplify_dxf_geometry(geometry, tolerance):
+    """
+    Simplifica las curvas aplanadas (en mm) de la geometría importada.
+
+    Args:
+        geometry: Lista de (dxftype, points_mm, color); se modifica en el lugar
+        tolerance: Desviación máxima en mm
+
+    Returns:
+        tuple: (removed, elapsed) con los puntos eliminados y los segundos usados
+    """
+    curve_indices = [i for i, (dtype, _, _) in enumerate(geometry)
+                     if dtype in DXF_STROKE_TYPES]
+    simplified, removed, elapsed = simplify_polylines(
+        [geometry[i][1] for i in curve_indices], tolerance)
+    for i, points_mm in zip(curve_indices, simplified):
+        dtype, _, color = geometry[i]
+        geometry[i] = (dtype, points_mm, color)
+    return removed, elapsed
+
+
+def load_dxf(filename, tolerance=None, chain_tolerance=CHAIN_TOLERANCE, cache=None):
+    """
+    Importa un DXF completo al modelo del editor en una sola llamada.
+
+    Hace los mismos pasos que la importación del editor: aplanado, unión
+    de piezas contiguas, simplificación y encuadre con margen.
+
+    Args:
+        filename: Ruta del archivo DXF
+        tolerance: Tolerancia de simplificación en mm, o None
+        chain_tolerance: Tolerancia para unir piezas contiguas en mm, o None
+        cache: cache_dxf.ImportCache para no volver a aplanar el archivo, o None
+
+    Returns:
+        tuple: (strokes, shapes, canvas_size) con canvas_size (ancho, alto) en cm
+
+    Raises:
+        ValueError: Si el archivo no contiene entidades válidas
+    """
+    geometry, bbox = read_dxf(filename, cache=cache)
+    if bbox is None:
+        raise ValueError("El archivo DXF está vacío o no contiene entidades válidas")
+
+    if chain_tolerance is not None:
+        geometry, _, _, _ = chain_dxf_geometry(geometry, chain_tolerance)
+    if tolerance is not None:
+        simplify_dxf_geometry(geometry, tolerance)
+
+    frame, canvas_size = import_frame(bbox)
+    strokes, shapes = geometry_to_model(geometry, frame)
+    return strokes, shapes, canvas_size
+
+
+def shape_dxf_entity(shape):
+    """
+    Convierte una forma en su entidad DXF.
+
+    Returns:
+        tuple: (kind, geometry, layer, color_aci) como en
+        dxf_export_entities, o None si el tipo no es conocido
+    """
+    start_x, start_y = start_mm = tuple(shape['start'])
+    end_x, end_y = end_mm = tuple(shape['end'])
+
+    color_aci = color_to_aci(shape['color'])
+
+    if shape['type'] == 'line':
+        return "line", (start_mm, end_mm), 'SHAPES', color_aci
+
+    elif shape['type'] == 'circle':
+        # Calcular radio
+        radius = math.sqrt((end_x - start_x)**2 + (end_y - start_y)**2)
+        return "circle", (start_mm, radius), 'SHAPES', color_aci
+
+    elif shape['type'] == 'rectangle':
+        # Crear rectángulo como polyline cerrada
+        top_left = start_mm
+        bottom_right = end_mm
+        points = [
+            top_left,
+            (bottom_right[0], top_left[1]),
+            bottom_right,
+            (top_left[0], bottom_right[1]),
+            top_left  # Cerrar
+        ]
+        return "polyline", (points, True), 'SHAPES', color_aci
+
+    elif shape['type'] == 'triangle':
+        # Calcular puntos del triángulo
+        mid_x = (start_x + end_x) / 2
+        points_mm = [
+            (mid_x, start_y),
+            (start_x, end_y),
+            (end_x, end_y),
+            (mid_x, start_y)  # Cerrar
+        ]
+        return "polyline", (points_mm, True), 'SHAPES', color_aci
+
+    return None
+
+
+def dxf_export_entities(strokes, strokes_mm, shapes, order=None):
+    """
+    Genera las entidades a exportar, en mm, sin depender del escritor.
+
+    Args:
+        strokes: Trazos a exportar (para su color)
+        strokes_mm: Puntos (n, 2) de cada trazo, ya simplificados si
+            corresponde, o vértices (n, 3) con bulges (ver geometria.fit_arcs)
+        shapes: Formas a exportar
+        order: Pares (índice, invertido) sobre strokes + shapes en el orden
+            de escritura, o None para el orden original
+
+    Yields:
+        tuple: (kind, geometry, layer, color_aci), con kind "polyline"
+        (geometry = (puntos, cerrada)), "bulge_polyline" ((vértices
+        (x, y, bulge), cerrada)), "line" ((inicio, fin)) o "circle"
+        ((centro, radio))
+    """
+    if order is None:
+        order = ((index, False) for index in range(len(strokes) + len(shapes)))
+
+    for index, reverse in order:
+        if index < len(strokes):
+            # Convertir trazos a polylines DXF
+            points_mm = strokes_mm[index]
+            if len(points_mm) < 2:
+                continue
+            color_aci = color_to_aci(strokes[index].color)
+            if points_mm.shape[1] == 2:
+                if reverse:
+                    points_mm = points_mm[::-1]
+                yield "polyline", (points_mm.tolist(), False), 'STROKES', color_aci
+            elif points_mm[:, 2].any():
+                if reverse:
+                    points_mm = reverse_bulge_polyline(points_mm)
+                yield "bulge_polyline", (points_mm.tolist(), False), 'STROKES', color_aci
+            else:
+                # Ajustado sólo con rectas: una polilínea común
+                points_mm = points_mm[::-1, :2] if reverse else points_mm[:, :2]
+                yield "polyline", (points_mm.tolist(), False), 'STROKES', color_aci
+        else:
+            entity = shape_dxf_entity(shapes[index - len(strokes)])
+            if entity is None:
+                continue
+            kind, geometry, layer, color_aci = entity
+            if reverse:
+                # Un círculo empieza y termina en el mismo punto: no se invierte
+                if kind == "line":
+                    geometry = geometry[::-1]
+                elif kind == "polyline":
+                    points, closed = geometry
+                    geometry = (points[::-1], closed)
+            yield kind, geometry, layer, color_aci
+
+
+def write_dxf_document(filename, entities):
+    """Escribe las entidades armando un documento ezdxf R2010 completo."""
+    # Crear nuevo documento DXF (R2010 es compatible con la mayoría de CNCs)
+    doc = ezdxf.new('R2010', setup=True)
+    msp = doc.modelspace()
+
+    # Configurar unidades en milímetros (estándar para CNC)
+    doc.units = units.MM
+
+    # Crear capas para organización
+    doc.layers.add('STROKES', color=7)  # Blanco
+    doc.layers.add('SHAPES', color=1)   # Rojo
+
+    for kind, geometry, layer, color_aci in entities:
+        attribs = {'layer': layer, 'color': color_aci}
+        if kind == "polyline":
+            points, closed = geometry
+            msp.add_lwpolyline(points, close=closed, dxfattribs=attribs)
+        elif kind == "bulge_polyline":
+            points, closed = geometry
+            msp.add_lwpolyline(points, format="xyb", close=closed, dxfattribs=attribs)
+        elif kind == "line":
+            msp.add_line(*geometry, dxfattribs=attribs)
+        elif kind == "circle":
+            msp.add_circle(*geometry, dxfattribs=attribs)
+
+    # Guardar archivo DXF
+    doc.saveas(filename)
+
+
+def write_dxf_stream(filename, entities):
+    """
+    Escribe las entidades en flujo como DXF R12 con r12writer.
+
+    Cada entidad se vuelca al archivo en cuanto se genera, sin documento
+    intermedio. R12 no tiene cabecera de unidades ni LWPOLYLINE: las
+    coordenadas van en mm y los trazos como POLYLINE 2D.
+    """
+    with r12writer(filename) as dxf:
+        for kind, geometry, layer, color_aci in entities:
+            if kind == "polyline":
+                points, closed = geometry
+                dxf.add_polyline_2d(points, closed=closed, layer=layer, color=color_aci)
+            elif kind == "bulge_polyline":
+                points, closed = geometry
+                dxf.add_polyline_2d(points, format="xyb", closed=closed, layer=layer,
+                                    color=color_aci)
+            elif kind == "line":
+                dxf.add_line(*geometry, layer=layer, color=color_aci)
+            elif kind == "circle":
+                dxf.add_circle(*geometry, layer=layer, color=color_aci)
+
+
+def save_dxf(filename, strokes, shapes, strokes_mm=None, order=None, stream=False,
+             fit_tolerance=None):
+    """
+    Exporta un dibujo del editor a DXF en una sola llamada.
+
+    Args:
+        filename: Ruta del archivo DXF
+        strokes: Trazos del dibujo (sólo se exportan los de tipo "brush")
+        shapes: Formas del dibujo
+        strokes_mm: Puntos de cada trazo "brush" (por ejemplo simplificados),
+            o None para los del dibujo
+        order: Orden de escritura (ver dxf_export_entities), o None
+        stream: Escribir en flujo (R12) en lugar de armar el documento
+        fit_tolerance: Ajustar los trazos con rectas y arcos con esta
+            desviación máxima en mm (ver geometria.fit_arcs), o None
+    """
+    brush_strokes = [stroke for stroke in strokes if stroke.type == 'brush']
+    if strokes_mm is None:
+        strokes_mm = [stroke.points for stroke in brush_strokes]
+    if fit_tolerance is not None:
+        strokes_mm, _, _, _ = fit_polylines(strokes_mm, fit_tolerance)
+
+    entities = dxf_export_entities(brush_strokes, strokes_mm, shapes, order)
+    if stream:
+        write_dxf_stream(filename, entities)
+    else:
+        write_dxf_document(filename, entities)
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la expansión de bloques DXF (INSERT/MINSERT)
+Compara BlockCache, que aplana cada definición de bloque una vez y coloca
+cada instancia con una transformación afín, con la referencia de ezdxf:
+explotar cada INSERT en entidades virtuales y aplanar cada una.
+
+Sin archivo, genera un DXF con piezas de biblioteca (polilíneas, arcos,
+splines y una elipse) que a su vez insertan un bloque de tornillo, miles de
+INSERT girados y escalados y un MINSERT en rejilla.
+
+Uso:
+    python benchmarks/bench_bloques_dxf.py
+    python benchmarks/bench_bloques_dxf.py --inserciones 1000
+    python benchmarks/bench_bloques_dxf.py biblioteca.dxf
+"""
+
+import argparse
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+import ezdxf
+import numpy as np
+
+# Los módulos del editor están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archivo_dxf import BlockCache, collect_dxf_geometry, entity_points_mm, unit_scale_to_mm
+
+
+def synthetic_dxf(filename, inserts, parts=20, seed=3):
+    """
+    Escribe un DXF de piezas repetidas con INSERT anidados y un MINSERT.
+
+    Args:
+        filename: Ruta del archivo a escribir
+        inserts: Número de INSERT en el modelspace (sin contar el MINSERT)
+        parts: Número de bloques de pieza distintos
+        seed: Semilla de las posiciones y tamaños
+    """
+    rng = random.Random(seed)
+    doc = ezdxf.new()
+    doc.header["$INSUNITS"] = 4  # mm
+
+    bolt = doc.blocks.new("BOLT")
+    bolt.add_circle((0, 0), 3)
+    bolt.add_arc((0, 0), 4, 0, 270)
+    for k in range(6):
+        bolt.add_line((3 * math.cos(k), 3 * math.sin(k)), (4 * math.cos(k), 4 * math.sin(k)))
+
+    for b in range(parts):
+        block = doc.blocks.new(f"PART{b}")
+        w, h = rng.uniform(20, 60), rng.uniform(10, 40)
+        block.add_lwpolyline([(0, 0), (w, 0), (w, h), (0, h)], close=True)
+        for _ in range(8):
+            a = rng.uniform(0, 360)
+            block.add_arc((rng.uniform(0, w), rng.uniform(0, h)), rng.uniform(2, 10), a, a + 120)
+        for _ in range(4):
+            block.add_spline([(x, rng.uniform(0, h)) for x in np.linspace(0, w, 6)])
+        block.add_ellipse((w / 2, h / 2), major_axis=(w / 3, 0), ratio=0.5)
+        for _ in range(4):
+            block.add_blockref("BOLT", (rng.uniform(0, w), rng.uniform(0, h)))
+
+    msp = doc.modelspace()
+    for _ in range(inserts):
+        scale = rng.choice([1, 1, 1, 0.5, 2])
+        msp.add_blockref(f"PART{rng.randrange(parts)}",
+                         (rng.uniform(0, 5000), rng.uniform(0, 5000)),
+                         dxfattribs={"rotation": rng.uniform(0, 360),
+                                     "xscale": scale, "yscale": scale})
+    grid = msp.add_blockref("PART0", (6000, 0))
+    grid.grid(size=(20, 25), spacing=(80, 80))
+    doc.saveas(filename)
+
+
+def explode(insert, unit_scale, out):
+    """Referencia: explota el INSERT con ezdxf y aplana cada entidad virtual."""
+    for instance in (insert.multi_insert() if insert.mcount > 1 else (insert,)):
+        for entity in instance.virtual_entities():
+            if entity.dxftype() == "INSERT":
+                explode(entity, unit_scale, out)
+            else:
+                points = entity_points_mm(entity, unit_scale)
+                if len(points):
+                    out.append(points)
+
+
+def main(argv=None):
+    """Ejecuta el benchmark desde la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Compara la expansión de bloques con cache frente a explotar cada INSERT.")
+    parser.add_argument("archivo", nargs="?", help="DXF a importar (por defecto, uno sintético)")
+    parser.add_argument("--inserciones", type=int, default=5000,
+                        help="INSERT del DXF sintético (por defecto 5000)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = args.archivo
+        if filename is None:
+            filename = os.path.join(tmp, "bloques.dxf")
+            synthetic_dxf(filename, args.inserciones)
+        doc = ezdxf.readfile(filename)
+
+    msp = doc.modelspace()
+    unit_scale = unit_scale_to_mm(doc)
+    print(f"{len(msp)} entidades en el modelspace, {len(doc.blocks)} bloques")
+
+    start = time.perf_counter()
+    blocks = BlockCache(doc.blocks, unit_scale)
+    geometry, _ = collect_dxf_geometry(msp, unit_scale, blocks=blocks)
+    cached = time.perf_counter() - start
+    print(f"  BlockCache: {cached:.2f} s, {len(geometry)} entidades, "
+          f"{sum(len(points) for _, points, _ in geometry)} puntos, "
+          f"{blocks.flattened} bloques aplanados para {blocks.instances} instancias")
+
+    start = time.perf_counter()
+    exploded = []
+    for entity in msp:
+        if entity.dxftype() == "INSERT":
+            explode(entity, unit_scale, exploded)
+        else:
+            points = entity_points_mm(entity, unit_scale)
+            if len(points):
+                exploded.append(points)
+    reference = time.perf_counter() - start
+    print(f"  explotar y aplanar cada instancia: {reference:.2f} s, {len(exploded)} entidades, "
+          f"{sum(map(len, exploded))} puntos")
+
+    print(f"BlockCache {reference / cached:.1f}x más rápido")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
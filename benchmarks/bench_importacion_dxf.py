@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de la importación DXF en una pasada frente a dos pasadas
+Compara collect_dxf_geometry (cada entidad se aplana una sola vez y el
+bounding box se acumula en el mismo recorrido) con el recorrido anterior del
+editor: una pasada para el bounding box y otra para dibujar, aplanando cada
+curva dos veces.
+
+Sin archivo, genera un DXF sintético de líneas, arcos, splines, polilíneas
+y elipses repartidos en una hoja de 1 m.
+
+Uso:
+    python benchmarks/bench_importacion_dxf.py
+    python benchmarks/bench_importacion_dxf.py --entidades 10000
+    python benchmarks/bench_importacion_dxf.py plano.dxf --repeticiones 3
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import ezdxf
+
+# Los módulos del editor están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from archivo_dxf import (DXF_STROKE_TYPES, collect_dxf_geometry, entity_points_mm,
+                         unit_scale_to_mm)
+from modelo import points_bbox
+
+
+def synthetic_dxf(filename, count, seed=1):
+    """
+    Escribe un DXF con count entidades de los tipos que importa el editor.
+
+    Args:
+        filename: Ruta del archivo a escribir
+        count: Número de entidades
+        seed: Semilla de las posiciones y tamaños
+    """
+    rng = random.Random(seed)
+    doc = ezdxf.new("R2010")
+    doc.header["$INSUNITS"] = 4  # mm
+    msp = doc.modelspace()
+    for i in range(count):
+        x, y = rng.uniform(0, 1000), rng.uniform(0, 1000)
+        kind = i % 5
+        if kind == 0:
+            msp.add_line((x, y), (x + 5, y + 3))
+        elif kind == 1:
+            msp.add_arc((x, y), rng.uniform(1, 50), 10, 200)
+        elif kind == 2:
+            msp.add_spline([(x, y), (x + 10, y + 20), (x + 30, y - 5), (x + 40, y + 10)])
+        elif kind == 3:
+            msp.add_lwpolyline([(x, y), (x + 3, y), (x + 3, y + 3), (x, y + 3)])
+        else:
+            msp.add_ellipse((x, y), major_axis=(10, 0), ratio=0.5)
+    doc.saveas(filename)
+
+
+def two_pass(msp, unit_scale):
+    """
+    Recorrido anterior: bounding box en una pasada, puntos en otra.
+
+    Returns:
+        tuple: (geometry, bbox) como collect_dxf_geometry
+    """
+    min_x = min_y = float("inf")
+    max_x = max_y = float("-inf")
+    for entity in msp:
+        points_mm = entity_points_mm(entity, unit_scale)
+        if len(points_mm):
+            entity_min_x, entity_min_y, entity_max_x, entity_max_y = points_bbox(points_mm)
+            min_x = min(min_x, entity_min_x)
+            max_x = max(max_x, entity_max_x)
+            min_y = min(min_y, entity_min_y)
+            max_y = max(max_y, entity_max_y)
+
+    geometry = []
+    for entity in msp:
+        if entity.dxftype() in DXF_STROKE_TYPES + ("LINE", "CIRCLE"):
+            geometry.append((entity.dxftype(), entity_points_mm(entity, unit_scale), None))
+    return geometry, (min_x, min_y, max_x, max_y)
+
+
+def one_pass(msp, unit_scale):
+    """Recorrido actual del editor (ver collect_dxf_geometry)."""
+    return collect_dxf_geometry(msp, unit_scale)
+
+
+def main(argv=None):
+    """Ejecuta el benchmark desde la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Compara la importación DXF en una pasada con la de dos pasadas.")
+    parser.add_argument("archivo", nargs="?", help="DXF a importar (por defecto, uno sintético)")
+    parser.add_argument("--entidades", type=int, default=50000,
+                        help="entidades del DXF sintético (por defecto 50000)")
+    parser.add_argument("--repeticiones", type=int, default=2)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        filename = args.archivo
+        if filename is None:
+            filename = os.path.join(tmp, "sintetico.dxf")
+            synthetic_dxf(filename, args.entidades)
+
+        start = time.perf_counter()
+        doc = ezdxf.readfile(filename)
+        print(f"{filename}: {len(doc.modelspace())} entidades, "
+              f"lectura con ezdxf {time.perf_counter() - start:.2f} s")
+
+    msp = doc.modelspace()
+    unit_scale = unit_scale_to_mm(doc)
+    best = {}
+    for _ in range(args.repeticiones):
+        for function in (two_pass, one_pass):
+            start = time.perf_counter()
+            geometry, bbox = function(msp, unit_scale)
+            elapsed = time.perf_counter() - start
+            best[function.__name__] = min(elapsed, best.get(function.__name__, elapsed))
+            points = sum(len(points) for _, points, _ in geometry)
+            print(f"  {function.__name__}: {elapsed:.2f} s, {len(geometry)} entidades, "
+                  f"{points} puntos, bbox {tuple(round(v, 3) for v in bbox)}")
+
+    print(f"Dos pasadas {best['two_pass']:.2f} s, una pasada {best['one_pass']:.2f} s "
+          f"({best['two_pass'] / best['one_pass']:.2f}x)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de tamaño y tiempo de carga: JSON del editor frente a proyecto
+Guarda un mismo dibujo como JSON (igual que el editor, con sangría) y como
+proyecto binario con coordenadas float64 y float32, y mide el tamaño de
+cada archivo, el tiempo de guardado y el de carga. En la carga del proyecto
+también se mide un recorrido de todos los puntos, que en float32 incluye
+su conversión.
+
+Sin archivo, genera un dibujo de trazos a mano alzada y formas.
+
+Uso:
+    python benchmarks/bench_proyecto.py
+    python benchmarks/bench_proyecto.py --trazos 20000 --puntos 200
+    python benchmarks/bench_proyecto.py dibujo.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+# Los módulos del editor están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modelo import Stroke, drawing_from_dict, drawing_to_dict
+from proyecto import PROJECT_SUFFIX, load_project, save_project
+
+
+def synthetic_drawing(strokes, points, shapes, seed=0):
+    """
+    Genera un dibujo de trazos a mano alzada y formas en una hoja A3.
+
+    Args:
+        strokes: Número de trazos
+        points: Puntos por trazo
+        shapes: Número de formas
+        seed: Semilla del generador
+
+    Returns:
+        tuple: (strokes, shapes, canvas_size) como modelo.drawing_from_dict
+    """
+    rng = np.random.default_rng(seed)
+    stroke_list = []
+    for _ in range(strokes):
+        angle = np.cumsum(rng.normal(0.0, 0.1, points))
+        steps = np.column_stack([np.cos(angle), -np.abs(np.sin(angle))]) * 0.3
+        start = rng.uniform((0.0, -297.0), (420.0, 0.0))
+        stroke_list.append(Stroke(start + np.cumsum(steps, axis=0), "#000000", 2))
+
+    kinds = ("line", "circle", "rectangle", "triangle")
+    shape_list = []
+    for i in range(shapes):
+        x, y = rng.uniform((0.0, -297.0), (400.0, -20.0))
+        shape_list.append({"type": kinds[i % len(kinds)], "start": (x, y), "end": (x + 20, y + 20),
+                           "color": "#FF0000", "width": 2})
+    return stroke_list, shape_list, (42.0, 29.7)
+
+
+def timed(function, *args):
+    """Ejecuta function(*args) y devuelve (resultado, segundos)."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def save_json(filename, strokes, shapes, canvas_size):
+    """Guarda el dibujo como lo hace EditorTrazos._save_json."""
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(drawing_to_dict(strokes, shapes, canvas_size), f, indent=2, ensure_ascii=False)
+
+
+def load_json(filename):
+    """Carga el dibujo como lo hace EditorTrazos._load_json."""
+    with open(filename, "r", encoding="utf-8") as f:
+        return drawing_from_dict(json.load(f))
+
+
+def touch_points(drawing):
+    """Recorre todos los puntos de los trazos (los float32 se convierten aquí)."""
+    return sum(float(stroke.points[:, 0].sum()) for stroke in drawing[0])
+
+
+def main(argv=None):
+    """Ejecuta el benchmark desde la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Compara tamaño y carga del JSON del editor y del proyecto binario.")
+    parser.add_argument("archivo", nargs="?", help="dibujo JSON del editor (por defecto, uno sintético)")
+    parser.add_argument("--trazos", type=int, default=5000)
+    parser.add_argument("--puntos", type=int, default=300, help="puntos por trazo")
+    parser.add_argument("--formas", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    if args.archivo:
+        drawing = load_json(args.archivo)
+    else:
+        drawing = synthetic_drawing(args.trazos, args.puntos, args.formas)
+    strokes, shapes, canvas_size = drawing
+    print(f"{len(strokes)} trazos, {sum(len(stroke) for stroke in strokes)} puntos, "
+          f"{len(shapes)} formas")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        json_name = os.path.join(tmp, "dibujo.json")
+        _, save_time = timed(save_json, json_name, strokes, shapes, canvas_size)
+        loaded, load_time = timed(load_json, json_name)
+        _, touch_time = timed(touch_points, loaded)
+        print(f"  JSON: {os.path.getsize(json_name) / 1e6:.2f} MB, guardar {save_time:.3f} s, "
+              f"cargar {load_time:.3f} s, recorrer puntos {touch_time:.3f} s")
+        del loaded
+
+        for coordinates in ("float64", "float32"):
+            name = os.path.join(tmp, coordinates + PROJECT_SUFFIX)
+            _, save_time = timed(save_project, name, strokes, shapes, canvas_size, coordinates)
+            loaded, load_time = timed(load_project, name)
+            _, touch_time = timed(touch_points, loaded)
+            print(f"  proyecto {coordinates}: {os.path.getsize(name) / 1e6:.2f} MB, "
+                  f"guardar {save_time:.3f} s, cargar {load_time:.4f} s, "
+                  f"recorrer puntos {touch_time:.3f} s")
+            # Soltar las vistas sobre el archivo mapeado antes de borrarlo
+            del loaded
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
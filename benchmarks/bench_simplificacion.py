@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de simplificación e índice espacial sobre trazos sintéticos grandes
+Genera trazos parecidos a los hechos a mano (un paseo aleatorio de curvatura
+suave con ruido) y mide:
+
+- simplify_polyline sobre un solo trazo enorme, con varias tolerancias
+- simplify_polylines sobre un lote de trazos medianos
+- el caso degenerado de muchos puntos colineales
+- SegmentGrid.insert y SegmentGrid.query con los trazos densos y con los
+  simplificados, y con pocos segmentos largos y diagonales (los que antes se
+  guardaban en todo su bounding box)
+
+Uso:
+    python benchmarks/bench_simplificacion.py
+    python benchmarks/bench_simplificacion.py --puntos 200000 --trazos 200
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+# Los módulos del editor están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from geometria import SegmentGrid, simplify_polyline, simplify_polylines
+
+
+def freehand_stroke(rng, n, step=0.05, jitter=0.005):
+    """
+    Genera un trazo sintético parecido a uno hecho a mano.
+
+    Args:
+        rng: numpy.random.Generator
+        n: Número de puntos
+        step: Distancia entre puntos consecutivos (mm)
+        jitter: Desviación del ruido agregado a cada punto (mm)
+
+    Returns:
+        numpy.ndarray: Arreglo (n, 2) en mm
+    """
+    angle = np.cumsum(rng.normal(0.0, 0.02, n))
+    points = np.column_stack([np.cumsum(np.cos(angle) * step), np.cumsum(np.sin(angle) * step)])
+    return points + rng.normal(0.0, jitter, (n, 2))
+
+
+def timed(function, *args):
+    """Ejecuta function(*args) y devuelve (resultado, segundos)."""
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def bench_grid(label, strokes, cell_size, queries, rng):
+    """Mide la construcción de un SegmentGrid y consultas al azar sobre él."""
+    grid = SegmentGrid(cell_size)
+    start = time.perf_counter()
+    for key, points in enumerate(strokes):
+        grid.insert(key, points)
+    build = time.perf_counter() - start
+
+    everything = np.concatenate(strokes)
+    low, high = everything.min(axis=0), everything.max(axis=0)
+    centers = rng.uniform(low, high, (queries, 2)).tolist()
+    start = time.perf_counter()
+    for x, y in centers:
+        grid.query(x, y, cell_size / 2)
+    query = time.perf_counter() - start
+
+    segments = sum(max(len(points) - 1, 0) for points in strokes)
+    print(f"  {label}: {segments} segmentos, {len(grid._cells)} celdas, "
+          f"insertar {build:.2f} s, {queries} consultas {query * 1000 / queries:.3f} ms c/u")
+
+
+def main(argv=None):
+    """Ejecuta el benchmark desde la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Mide la simplificación RDP y el índice de segmentos con trazos sintéticos.")
+    parser.add_argument("--puntos", type=int, default=1_000_000,
+                        help="puntos del trazo grande (por defecto 1.000.000)")
+    parser.add_argument("--trazos", type=int, default=1000,
+                        help="trazos de 1000 puntos del lote (por defecto 1000)")
+    parser.add_argument("--tolerancias", type=float, nargs="+", default=(0.05, 0.1),
+                        help="tolerancias de simplificación en mm")
+    parser.add_argument("--celda", type=float, default=10.0,
+                        help="tamaño de celda del índice espacial (mm)")
+    parser.add_argument("--consultas", type=int, default=10000)
+    parser.add_argument("--semilla", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(args.semilla)
+    big = freehand_stroke(rng, args.puntos)
+
+    print("Ramer–Douglas–Peucker")
+    for tolerance in args.tolerancias:
+        result, elapsed = timed(simplify_polyline, big, tolerance)
+        print(f"  1 trazo x {len(big)} puntos, tolerancia {tolerance} mm: "
+              f"{len(result)} puntos en {elapsed:.2f} s")
+
+    batch = [freehand_stroke(rng, 1000) for _ in range(args.trazos)]
+    simplified, removed, elapsed = simplify_polylines(batch, max(args.tolerancias))
+    print(f"  {len(batch)} trazos x 1000 puntos, tolerancia {max(args.tolerancias)} mm: "
+          f"{removed} puntos eliminados en {elapsed:.2f} s")
+
+    line = np.column_stack([np.linspace(0.0, 100.0, 200_000), np.zeros(200_000)])
+    result, elapsed = timed(simplify_polyline, line, 0.01)
+    print(f"  200000 puntos colineales: {len(result)} puntos en {elapsed * 1000:.1f} ms")
+
+    # Trazos repartidos en una hoja de ~1 m para que el índice tenga muchas celdas
+    offsets = rng.uniform(0.0, 1000.0, (len(batch), 2))
+    batch = [points + offset for points, offset in zip(batch, offsets)]
+    simplified = [points + offset for points, offset in zip(simplified, offsets)]
+    diagonals = [rng.uniform(0.0, 1000.0, (2, 2)) for _ in range(1000)]
+
+    print(f"SegmentGrid (celda {args.celda} mm)")
+    bench_grid("trazos densos", batch, args.celda, args.consultas, rng)
+    bench_grid("trazos simplificados", simplified, args.celda, args.consultas, rng)
+    bench_grid("diagonales largas", diagonals, args.celda, args.consultas, rng)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
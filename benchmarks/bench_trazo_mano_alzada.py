@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark de latencia entrada → pantalla del trazo a mano alzada
+Reproduce en tiempo real un trazo en espiral con velocidad variable a la
+frecuencia de eventos pedida (mouse de 125 Hz, tabletas de 1 kHz) a través
+de los manejadores del editor, y compara:
+
+- agrupado: el editor actual (_queue_motion/_flush_motion), un coords() por
+  cuadro y filtro de distancia mínima
+- por evento: el manejador anterior, un coords() con el trazo entero en cada
+  movimiento
+
+No necesita pantalla: el bucle de eventos imita el de Tk (primero la
+entrada, luego los temporizadores y al final las tareas ociosas, donde Tk
+redibuja) y los argumentos de coords() se convierten con un intérprete Tcl
+real. El redibujo de X no se incluye; también crece con el largo del trazo.
+
+La latencia es la que mide el propio editor: desde la llegada del
+movimiento más viejo de cada actualización hasta que corre la tarea ociosa
+posterior al redibujo.
+
+Uso:
+    python benchmarks/bench_trazo_mano_alzada.py
+    python benchmarks/bench_trazo_mano_alzada.py --frecuencias 1000 --segundos 2
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+import tkinter
+import types
+
+# Los módulos del editor están en la raíz del repositorio
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from editor_trazos import EditorTrazos
+from historial import History
+
+
+class EventLoop:
+    """Bucle de eventos con la prioridad de Tk: entrada, temporizadores, tareas ociosas."""
+
+    def __init__(self):
+        self.timers = []  # (vencimiento perf_counter, función, argumentos)
+        self.idle = []  # (función, argumentos)
+
+    def after(self, ms, function, *args):
+        self.timers.append((time.perf_counter() + ms / 1000, function, args))
+
+    def after_idle(self, function, *args):
+        self.idle.append((function, args))
+
+    def run(self, arrivals, handle):
+        """
+        Entrega cada evento en su momento de llegada y atiende lo programado.
+
+        Args:
+            arrivals: Momentos de llegada (perf_counter) de los eventos, ordenados
+            handle: Función handle(i) que procesa el evento i
+
+        Returns:
+            float: Segundos de CPU dentro de handle
+        """
+        busy = 0.0
+        i = 0
+        while True:
+            now = time.perf_counter()
+            if i < len(arrivals) and arrivals[i] <= now:
+                start = time.perf_counter()
+                handle(i)
+                busy += time.perf_counter() - start
+                i += 1
+                continue
+            due = [timer for timer in self.timers if timer[0] <= now]
+            if due:
+                for timer in due:
+                    self.timers.remove(timer)
+                    timer[1](*timer[2])
+                continue
+            if self.idle:
+                batch, self.idle = self.idle, []
+                for function, args in batch:
+                    function(*args)
+                continue
+            if i >= len(arrivals) and not self.timers:
+                return busy
+            upcoming = [timer[0] for timer in self.timers]
+            if i < len(arrivals):
+                upcoming.append(arrivals[i])
+            time.sleep(max(0.0, min(min(upcoming) - now, 0.0005)))
+
+
+class TclCanvas:
+    """Canvas mínimo: coords() pasa por Tcl y programa el redibujo como tarea ociosa."""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.tcl = tkinter.Tcl()
+        self.items = {}
+        self.redraw_pending = False
+        self.updates = 0
+
+    def canvasx(self, x):
+        return x
+
+    def canvasy(self, y):
+        return y
+
+    def create_line(self, *coords, **options):
+        item = len(self.items) + 1
+        self.items[item] = list(tkinter._flatten(coords))
+        return item
+
+    def coords(self, item, *coords):
+        flat = tkinter._flatten(coords)
+        self.tcl.call(("list",) + flat)
+        self.items[item] = list(flat)
+        self.updates += 1
+        if not self.redraw_pending:
+            self.redraw_pending = True
+            self.loop.after_idle(self._redraw)
+
+    def _redraw(self):
+        self.redraw_pending = False
+
+
+class PerEventEditor(EditorTrazos):
+    """Manejador anterior: actualiza el item con el trazo entero en cada movimiento."""
+
+    def _queue_motion(self, x, y, arrival):
+        self._motion_events += 1
+        self._motion_coords.extend((x, y))
+        self._motion_since = arrival
+        self._flush_motion()
+
+
+def headless_editor(cls, loop):
+    """Crea un editor sin ventana con lo que usan los manejadores del pincel."""
+    editor = object.__new__(cls)
+    editor.root = loop
+    editor.canvas = TclCanvas(loop)
+    editor.zoom = 1.0
+    editor.current_tool = "brush"
+    editor.brush_color = "#000000"
+    editor.brush_size = 2
+    editor.strokes = []
+    editor._positions = {}
+    editor._position_shifts = []
+    editor.current_stroke = []
+    editor.current_coords = []
+    editor.current_item = None
+    editor._motion_coords = []
+    editor._motion_since = None
+    editor._motion_pending = False
+    editor._motion_last_flush = 0.0
+    editor._event_clock = 0.0
+    editor._motion_events = 0
+    editor._motion_flushes = 0
+    editor._paint_latencies = []
+    editor.simplify_enabled = types.SimpleNamespace(get=lambda: False)
+    editor.input_status = types.SimpleNamespace(set=lambda text: None)
+    editor._history = History()
+    editor._journal = types.SimpleNamespace(add_stroke=lambda stroke: None)
+    editor._journal_sync_pending = True
+    editor._import_queue = None
+    editor._register_stroke = lambda stroke, item=None, draw=False: None
+    return editor
+
+
+def spiral(count, rate):
+    """Puntos de una espiral recorrida a 0.2 – 3 px por milisegundo."""
+    points = []
+    x, y, angle = 400.0, 300.0, 0.0
+    for i in range(count):
+        speed = (0.2 + 2.8 * (0.5 + 0.5 * math.sin(i * rate / 700_000))) * 1000 / rate
+        angle += 4.0 / rate
+        x += speed * math.cos(angle)
+        y += speed * math.sin(angle)
+        points.append((round(x, 1), round(y, 1)))
+    return points
+
+
+def replay(cls, rate, seconds):
+    """
+    Dibuja un trazo con eventos a rate Hz durante seconds segundos.
+
+    Returns:
+        dict: eventos, actualizaciones, puntos, CPU y latencias (s) del trazo
+    """
+    loop = EventLoop()
+    editor = headless_editor(cls, loop)
+    points = spiral(int(rate * seconds), rate)
+    start = time.perf_counter() + 0.01
+    arrivals = [start + i / rate for i in range(len(points))]
+
+    def event(i):
+        x, y = points[i]
+        return types.SimpleNamespace(x=x, y=y, time=(arrivals[i] - start) * 1000)
+
+    time.sleep(max(0.0, start - time.perf_counter()))
+    editor._on_mouse_down(event(0))
+    # El editor ancla event.time al reloj al presionar; aquí la llegada es exacta
+    editor._event_clock = start
+    busy = loop.run(arrivals[1:], lambda i: editor._on_mouse_drag(event(i + 1)))
+    editor._on_mouse_up(event(len(points) - 1))
+    loop.run([], None)
+
+    return {
+        "events": len(points),
+        "updates": editor.canvas.updates,
+        "points": len(editor.strokes[-1].points),
+        "busy": busy,
+        "latencies": sorted(editor._paint_latencies),
+    }
+
+
+def main(argv=None):
+    """Ejecuta el benchmark desde la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Mide la latencia entrada → pantalla del trazo a mano alzada.")
+    parser.add_argument("--frecuencias", type=float, nargs="+", default=(125, 500, 1000),
+                        help="eventos de movimiento por segundo")
+    parser.add_argument("--segundos", type=float, default=5.0, help="duración de cada trazo")
+    args = parser.parse_args(argv)
+
+    for rate in args.frecuencias:
+        print(f"{rate:.0f} Hz, {args.segundos:.0f} s")
+        for label, cls in (("por evento", PerEventEditor), ("agrupado", EditorTrazos)):
+            result = replay(cls, rate, args.segundos)
+            latencies = result["latencies"]
+            mean = 1000 * sum(latencies) / len(latencies)
+            p95 = 1000 * latencies[int(0.95 * (len(latencies) - 1))]
+            print(f"  {label}: {result['events']} eventos → {result['updates']} coords(), "
+                  f"{result['points']} puntos; latencia media {mean:.1f} ms, p95 {p95:.1f} ms, "
+                  f"máx. {1000 * latencies[-1]:.1f} ms; CPU en el manejador {result['busy']:.2f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
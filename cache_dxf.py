@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cache persistente de DXF importados
+Guarda en disco la geometría ya aplanada de cada DXF, independiente de
+Tkinter: al volver a abrir el mismo archivo no se ejecutan ezdxf ni el
+aplanado.
+
+Cada entrada es un único archivo binario con una cabecera JSON y los
+arreglos en crudo (alineados a 8 bytes), que se leen con mmap sin copiar:
+
+    MAGIC | largo de la cabecera (uint32) | cabecera JSON | relleno
+    | offsets (int64, n + 1) | tipos (uint16, n) | colores (uint16, n)
+    | relleno | puntos (float64, N × 2)
+
+La clave es el hash del contenido del archivo junto con la tolerancia de
+aplanado y la versión del formato; la escala de unidades sale del propio
+contenido (su cabecera), así que ya está cubierta por el hash. Cuando el
+directorio supera su tamaño máximo se borran las entradas usadas hace más
+tiempo (LRU, según la fecha de modificación, que se renueva en cada uso).
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from geometria import FLATTENING_DISTANCE
+
+
+# Identificador y versión del formato (cambiarla invalida las entradas viejas)
+MAGIC = b"DXFGEOM1"
+FORMAT_VERSION = 1
+
+# Tamaño máximo por defecto del directorio de la cache
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+SUFFIX = ".geom"
+
+_HEADER_SIZE = struct.Struct("<I")
+
+
+def default_cache_dir():
+    """Directorio por defecto: $XDG_CACHE_HOME (o ~/.cache)/editor_trazos/dxf."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "editor_trazos", "dxf")
+
+
+def file_digest(filename, chunk_size=1 << 20):
+    """Hash BLAKE2b del contenido de un archivo, en hexadecimal."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(filename, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_geometry(path, geometry, bbox, unit_scale=None):
+    """
+    Escribe la geometría aplanada en el formato de la cache.
+
+    Se escribe en un archivo temporal que luego reemplaza al definitivo:
+    un proceso que lee la misma entrada nunca la ve a medio escribir.
+
+    Args:
+        path: Ruta del archivo
+        geometry: Lista de (dxftype, points_mm, color) de archivo_dxf.read_dxf
+        bbox: (min_x, min_y, max_x, max_y) en mm, o None
+        unit_scale: Escala de unidades del DXF (sólo informativa)
+
+    Returns:
+        int: Bytes escritos
+    """
+    kinds = sorted({dtype for dtype, _, _ in geometry})
+    colors = sorted({color for _, _, color in geometry})
+    kind_index = {kind: i for i, kind in enumerate(kinds)}
+    color_index = {color: i for i, color in enumerate(colors)}
+
+    offsets = np.zeros(len(geometry) + 1, dtype=np.int64)
+    np.cumsum([len(points) for _, points, _ in geometry], out=offsets[1:])
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "count": len(geometry),
+        "points": int(offsets[-1]),
+        "kinds": kinds,
+        "colors": colors,
+        "bbox": list(bbox) if bbox is not None else None,
+        "unit_scale": unit_scale,
+    }).encode("utf-8")
+
+    directory = os.path.dirname(path) or "."
+    fd, temp = tempfile.mkstemp(suffix=".tmp", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(_HEADER_SIZE.pack(len(header)))
+            f.write(header)
+            _pad(f)
+            f.write(offsets.tobytes())
+            f.write(np.array([kind_index[dtype] for dtype, _, _ in geometry],
+                             dtype=np.uint16).tobytes())
+            f.write(np.array([color_index[color] for _, _, color in geometry],
+                             dtype=np.uint16).tobytes())
+            _pad(f)
+            for _, points, _ in geometry:
+                f.write(np.ascontiguousarray(points, dtype=np.float64).tobytes())
+            size = f.tell()
+        os.replace(temp, path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    return size
+
+
+def read_geometry(path):
+    """
+    Lee una entrada de la cache con mmap, sin copiar los puntos.
+
+    Returns:
+        tuple: (geometry, bbox) como archivo_dxf.read_dxf; los puntos de
+        cada entidad son vistas de sólo lectura sobre el archivo mapeado
+
+    Raises:
+        ValueError: Si el archivo no tiene el formato esperado
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"No es una entrada de la cache: {path}")
+    position = len(MAGIC)
+    (header_size,) = _HEADER_SIZE.unpack_from(data, position)
+    position += _HEADER_SIZE.size
+    header = json.loads(bytes(data[position:position + header_size]))
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Versión de la cache no soportada: {path}")
+    position = _aligned(position + header_size)
+
+    count = header["count"]
+    offsets = np.frombuffer(data, np.int64, count + 1, position)
+    position += offsets.nbytes
+    kinds = np.frombuffer(data, np.uint16, count, position).tolist()
+    colors = np.frombuffer(data, np.uint16, count, position + 2 * count).tolist()
+    position = _aligned(position + 4 * count)
+    points = np.frombuffer(data, np.float64, 2 * header["points"], position).reshape(-1, 2)
+
+    kind_names = header["kinds"]
+    color_names = header["colors"]
+    bounds = offsets.tolist()
+    geometry = [(kind_names[kind], points[start:end], color_names[color])
+                for kind, color, start, end in zip(kinds, colors, bounds[:-1], bounds[1:])]
+    bbox = tuple(header["bbox"]) if header["bbox"] is not None else None
+    return geometry, bbox
+
+
+class ImportCache:
+    """
+    Cache LRU en disco de la geometría aplanada de los DXF.
+
+    Cuenta aciertos y fallos desde su creación. Las entradas dañadas o de
+    otra versión se tratan como fallos y se borran.
+    """
+
+    __slots__ = ("directory", "max_bytes", "tolerance", "hits", "misses")
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES,
+                 tolerance=FLATTENING_DISTANCE):
+        """
+        Args:
+            directory: Directorio de la cache (por defecto default_cache_dir())
+            max_bytes: Tamaño máximo del directorio antes de desalojar entradas
+            tolerance: Tolerancia de aplanado con la que se leen los DXF (mm)
+        """
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.tolerance = tolerance
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, filename):
+        """Clave de un DXF: hash del contenido, tolerancia y versión del formato."""
+        return f"{file_digest(filename)}-{self.tolerance:g}-v{FORMAT_VERSION}"
+
+    def path(self, key):
+        """Ruta del archivo de una clave."""
+        return os.path.join(self.directory, key + SUFFIX)
+
+    def load(self, key):
+        """
+        Busca una entrada y renueva su fecha de uso.
+
+        Returns:
+            tuple: (geometry, bbox), o None si no está (cuenta un fallo)
+        """
+        path = self.path(key)
+        try:
+            geometry, bbox = read_geometry(path)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError):
+            # Entrada dañada: se descarta y se vuelve a generar
+            self.misses += 1
+            self._remove(path)
+            return None
+        self.hits += 1
+        return geometry, bbox
+
+    def store(self, key, geometry, bbox, unit_scale=None):
+        """
+        Guarda una entrada y desaloja las más viejas si hace falta.
+
+        Un error al escribir (disco lleno, sin permisos) no impide la
+        importación: la entrada simplemente no queda guardada.
+
+        Returns:
+            int: Bytes escritos (0 si no se pudo escribir)
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            size = write_geometry(self.path(key), geometry, bbox, unit_scale)
+        except OSError:
+            return 0
+        self.evict(keep=key)
+        return size
+
+    def evict(self, keep=None):
+        """
+        Borra las entradas usadas hace más tiempo hasta respetar max_bytes.
+
+        Args:
+            keep: Clave que no se borra (la recién guardada)
+
+        Returns:
+            int: Entradas borradas
+        """
+        entries = []
+        total = 0
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            if not name.endswith(SUFFIX):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                info = os.stat(path)
+            except OSError:
+                continue
+            entries.append((info.st_mtime, info.st_size, path))
+            total += info.st_size
+
+        removed = 0
+        keep_path = self.path(keep) if keep is not None else None
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path == keep_path:
+                continue
+            if self._remove(path):
+                total -= size
+                removed += 1
+        return removed
+
+    def summary(self):
+        """Texto con los aciertos y fallos acumulados."""
+        return f"cache de importación: {self.hits} aciertos, {self.misses} fallos"
+
+    @staticmethod
+    def _remove(path):
+        """Borra un archivo de la cache; False si no se pudo (por ejemplo, en uso)."""
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        return True
+
+
+def _aligned(position, alignment=8):
+    """Siguiente posición múltiplo de alignment."""
+    return -(-position // alignment) * alignment
+
+
+def _pad(f, alignment=8):
+    """Rellena con ceros hasta la siguiente posición múltiplo de alignment."""
+    position = f.tell()
+    f.write(b"\0" * (_aligned(position, alignment) - position))
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Cinemática del robot SCARA
+Conversión vectorizada entre posiciones del dibujo (mm) y ángulos de las
+articulaciones, independiente de Tkinter.
+
+Contenido:
+- Brazo SCARA planar de dos eslabones: cinemática inversa y directa
+- Resolución de dibujos completos (todas las polilíneas en una sola pasada)
+- Detección de puntos inalcanzables y de discontinuidades (saltos de
+  articulación y cambios de codo)
+
+Convenciones: ángulos en radianes en [-π, π); θ1 se mide desde el eje X
+del modelo alrededor de la base y θ2 es el giro del segundo eslabón
+respecto del primero. El codo ELBOW_POSITIVE da θ2 >= 0 y ELBOW_NEGATIVE
+da θ2 <= 0.
+"""
+
+import math
+
+import numpy as np
+
+
+ELBOW_POSITIVE = 1
+ELBOW_NEGATIVE = -1
+ELBOW_AUTO = 0  # Codo positivo salvo que sólo el negativo respete los límites
+
+# Salto máximo de una articulación entre dos puntos consecutivos de un trazo
+MAX_JOINT_STEP = math.radians(10)
+
+
+def wrap_angles(angles):
+    """Normaliza ángulos (radianes) al intervalo [-π, π)."""
+    return (angles + math.pi) % (2 * math.pi) - math.pi
+
+
+class ScaraArm:
+    """Brazo SCARA planar de dos eslabones con base fija en el plano del dibujo."""
+
+    __slots__ = ("l1", "l2", "base", "elbow", "theta1_limits", "theta2_limits")
+
+    def __init__(self, l1, l2, base=(0.0, 0.0), elbow=ELBOW_POSITIVE,
+                 theta1_limits=None, theta2_limits=None):
+        """
+        Crea un brazo.
+
+        Args:
+            l1: Longitud del primer eslabón (mm)
+            l2: Longitud del segundo eslabón (mm)
+            base: Posición (x, y) del eje de θ1 en el modelo (mm)
+            elbow: ELBOW_POSITIVE, ELBOW_NEGATIVE o ELBOW_AUTO
+            theta1_limits: (mín, máx) de θ1 en radianes, o None si no hay límite
+            theta2_limits: (mín, máx) de θ2 en radianes, o None si no hay límite
+
+        Raises:
+            ValueError: Si algún eslabón no es positivo o el codo no es válido
+        """
+        if l1 <= 0 or l2 <= 0:
+            raise ValueError("Las longitudes de los eslabones deben ser positivas")
+        if elbow not in (ELBOW_POSITIVE, ELBOW_NEGATIVE, ELBOW_AUTO):
+            raise ValueError(f"Configuración de codo no válida: {elbow!r}")
+
+        self.l1 = float(l1)
+        self.l2 = float(l2)
+        self.base = (float(base[0]), float(base[1]))
+        self.elbow = elbow
+        self.theta1_limits = theta1_limits
+        self.theta2_limits = theta2_limits
+
+    def __repr__(self):
+        return (f"ScaraArm(l1={self.l1!r}, l2={self.l2!r}, base={self.base!r}, "
+                f"elbow={self.elbow!r})")
+
+    def reach(self):
+        """Radios (mínimo, máximo) alcanzables alrededor de la base, en mm."""
+        return abs(self.l1 - self.l2), self.l1 + self.l2
+
+    def forward(self, angles):
+        """
+        Cinemática directa.
+
+        Args:
+            angles: Arreglo (n, 2) de (θ1, θ2) en radianes
+
+        Returns:
+            numpy.ndarray: Posiciones (n, 2) del efector en mm del modelo
+        """
+        angles = np.asarray(angles, dtype=np.float64).reshape(-1, 2)
+        theta1 = angles[:, 0]
+        theta12 = theta1 + angles[:, 1]
+
+        points = np.empty_like(angles)
+        points[:, 0] = self.base[0] + self.l1 * np.cos(theta1) + self.l2 * np.cos(theta12)
+        points[:, 1] = self.base[1] + self.l1 * np.sin(theta1) + self.l2 * np.sin(theta12)
+        return points
+
+    def inverse(self, points):
+        """
+        Cinemática inversa vectorizada.
+
+        Args:
+            points: Secuencia de puntos (x, y) o arreglo (n, 2) en mm del modelo
+
+        Returns:
+            tuple: (angles, reachable, elbows) con angles (n, 2) en radianes
+            (NaN donde no hay solución), reachable (n,) bool y elbows (n,)
+            int8 con el codo usado en cada punto (0 si es inalcanzable)
+        """
+        pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        x = pts[:, 0] - self.base[0]
+        y = pts[:, 1] - self.base[1]
+
+        # Ley de cosenos para θ2; |cos θ2| > 1 queda fuera del anillo alcanzable
+        cos2 = (x * x + y * y - self.l1 * self.l1 - self.l2 * self.l2) / (2 * self.l1 * self.l2)
+        in_reach = np.abs(cos2) <= 1.0
+        np.clip(cos2, -1.0, 1.0, out=cos2)
+        sin2 = np.sqrt(1.0 - cos2 * cos2)
+        heading = np.arctan2(y, x)
+        k1 = self.l1 + self.l2 * cos2
+
+        if self.elbow == ELBOW_AUTO:
+            theta1, theta2 = self._solve(heading, cos2, sin2, k1)
+            theta1_neg, theta2_neg = self._solve(heading, cos2, -sin2, k1)
+            ok_pos = self._within_limits(theta1, theta2)
+            ok_neg = self._within_limits(theta1_neg, theta2_neg)
+
+            use_neg = ~ok_pos & ok_neg
+            theta1 = np.where(use_neg, theta1_neg, theta1)
+            theta2 = np.where(use_neg, theta2_neg, theta2)
+            elbows = np.where(use_neg, ELBOW_NEGATIVE, ELBOW_POSITIVE).astype(np.int8)
+            reachable = in_reach & (ok_pos | ok_neg)
+        else:
+            theta1, theta2 = self._solve(heading, cos2, self.elbow * sin2, k1)
+            elbows = np.full(len(pts), self.elbow, dtype=np.int8)
+            reachable = in_reach & self._within_limits(theta1, theta2)
+
+        angles = np.column_stack((theta1, theta2))
+        angles[~reachable] = np.nan
+        elbows[~reachable] = 0
+        return angles, reachable, elbows
+
+    def inverse_polylines(self, polylines, max_step=MAX_JOINT_STEP):
+        """
+        Resuelve un dibujo completo en una sola llamada vectorizada.
+
+        Todas las polilíneas se concatenan en un único arreglo; los saltos
+        entre el final de una y el comienzo de la siguiente (trayectos con
+        la herramienta levantada) no cuentan como discontinuidades.
+
+        Args:
+            polylines: Lista de arreglos (n, 2) en mm del modelo
+            max_step: Salto máximo de θ1 o θ2 (radianes) entre puntos consecutivos
+
+        Returns:
+            tuple: (angles, reachable, elbows, offsets, jumps) con los
+            resultados de inverse() para todos los puntos concatenados,
+            offsets (m + 1,) con el inicio de cada polilínea en ese arreglo
+            y jumps con los índices de los puntos a los que se llega con una
+            discontinuidad (ver joint_discontinuities)
+        """
+        lengths = [len(points) for points in polylines]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+
+        if offsets[-1] == 0:
+            empty = np.empty((0, 2))
+            return (empty, np.empty(0, dtype=bool), np.empty(0, dtype=np.int8),
+                    offsets, np.empty(0, dtype=np.int64))
+
+        points = np.concatenate([np.asarray(p, dtype=np.float64).reshape(-1, 2) for p in polylines])
+        angles, reachable, elbows = self.inverse(points)
+        jumps = joint_discontinuities(angles, elbows, max_step, offsets)
+        return angles, reachable, elbows, offsets, jumps
+
+    def path_rates(self, angles, directions):
+        """
+        Derivadas de los ángulos respecto de la distancia recorrida (dθ/ds).
+
+        Es la inversa del jacobiano aplicada a la dirección del movimiento:
+        multiplicada por la velocidad del efector (mm/s) da la velocidad de
+        cada articulación (rad/s). Cerca de la singularidad (brazo estirado
+        o plegado, sin θ2 ≈ 0) crece sin límite; el determinante se acota
+        para que el resultado sea finito.
+
+        Args:
+            angles: Arreglo (n, 2) de (θ1, θ2) en radianes
+            directions: Arreglo (n, 2) de direcciones unitarias en el modelo
+
+        Returns:
+            numpy.ndarray: Arreglo (n, 2) con dθ1/ds y dθ2/ds en rad/mm
+        """
+        angles = np.asarray(angles, dtype=np.float64).reshape(-1, 2)
+        directions = np.asarray(directions, dtype=np.float64).reshape(-1, 2)
+        theta1 = angles[:, 0]
+        theta12 = theta1 + angles[:, 1]
+        ux = directions[:, 0]
+        uy = directions[:, 1]
+
+        det = self.l1 * self.l2 * np.sin(angles[:, 1])
+        floor = self.l1 * self.l2 * 1e-6
+        det = np.where(np.abs(det) < floor, np.copysign(floor, det), det)
+
+        ex = self.l1 * np.cos(theta1) + self.l2 * np.cos(theta12)
+        ey = self.l1 * np.sin(theta1) + self.l2 * np.sin(theta12)
+        rates = np.empty_like(angles)
+        rates[:, 0] = self.l2 * (np.cos(theta12) * ux + np.sin(theta12) * uy) / det
+        rates[:, 1] = -(ex * ux + ey * uy) / det
+        return rates
+
+    def _solve(self, heading, cos2, sin2, k1):
+        """Ángulos (θ1, θ2) para un signo de codo ya aplicado a sin2."""
+        theta2 = np.arctan2(sin2, cos2)
+        theta1 = wrap_angles(heading - np.arctan2(self.l2 * sin2, k1))
+        return theta1, theta2
+
+    def _within_limits(self, theta1, theta2):
+        """Máscara de las soluciones que respetan los límites de las articulaciones."""
+        ok = np.ones(len(theta1), dtype=bool)
+        for theta, limits in ((theta1, self.theta1_limits), (theta2, self.theta2_limits)):
+            if limits is not None:
+                low, high = limits
+                ok &= (theta >= low) & (theta <= high)
+        return ok
+
+
+def joint_discontinuities(angles, elbows, max_step=MAX_JOINT_STEP, offsets=None):
+    """
+    Busca discontinuidades en una secuencia de ángulos de articulación.
+
+    Hay discontinuidad al llegar al punto i si θ1 o θ2 cambian más de
+    max_step respecto del punto i - 1 (por ejemplo, al pasar cerca de la
+    singularidad con el brazo estirado) o si cambia el codo. Los pares con
+    algún punto inalcanzable se omiten: esos puntos ya se informan aparte.
+
+    Args:
+        angles: Arreglo (n, 2) de ángulos en radianes (NaN si inalcanzable)
+        elbows: Arreglo (n,) con el codo de cada punto (0 si inalcanzable)
+        max_step: Salto máximo permitido (radianes)
+        offsets: Inicios de cada polilínea (como en inverse_polylines); los
+            saltos hacia esos puntos se ignoran
+
+    Returns:
+        numpy.ndarray: Índices de los puntos a los que se llega con un salto
+    """
+    if len(angles) < 2:
+        return np.empty(0, dtype=np.int64)
+
+    step = np.abs(wrap_angles(np.diff(angles, axis=0)))
+    both = (elbows[1:] != 0) & (elbows[:-1] != 0)
+    jump = both & ((step > max_step).any(axis=1) | (elbows[1:] != elbows[:-1]))
+
+    if offsets is not None:
+        starts = np.asarray(offsets[1:-1])
+        jump[starts[starts > 0] - 1] = False
+
+    return np.flatnonzero(jump) + 1
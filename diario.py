@@ -0,0 +1,517 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Diario de la sesión del editor de trazos
+Anota cada cambio del dibujo apenas ocurre, independiente de Tkinter, para
+recuperar la sesión tras un cierre inesperado (caída del programa o corte
+de luz) sin reescribir el dibujo completo.
+
+La sesión vive en un directorio con dos archivos por generación:
+
+    sesion-NNNNNN.trazos   instantánea completa (ver proyecto.py)
+    sesion-NNNNNN.diario   cambios posteriores a la instantánea
+
+El diario sólo crece por el final: MAGIC | generación (uint64) y luego
+registros
+
+    largo de los datos (uint32) | tipo (uint8) | CRC-32 (uint32) | datos
+
+Los registros se acumulan en memoria hasta sync(), que los escribe de una
+vez y hace un único fsync por lote. Un registro cortado por la caída no
+pasa el CRC: la lectura se detiene ahí y el archivo se recorta.
+
+Cuando el diario supera a la instantánea (y un tamaño mínimo) se compacta:
+se escribe la instantánea de la generación siguiente, un diario vacío, y se
+borran los archivos de la anterior. La generación vigente es la última con
+instantánea (o la 0, que empieza con el dibujo vacío), así que una caída en
+medio de la compactación también deja una sesión coherente.
+
+Cada editor abierto toma su sesión con un flock exclusivo sobre
+sesion.lock, que se suelta al cerrar el diario o al terminar el proceso
+(también si se cae). Con el directorio por defecto, un segundo editor usa
+el siguiente directorio libre (sesion-1, sesion-2...), así que sólo se
+recuperan sesiones que ningún editor tiene abiertas.
+"""
+
+import os
+import re
+import struct
+import zlib
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin bloqueo, una sola sesión
+    fcntl = None
+
+from modelo import Stroke
+from proyecto import PROJECT_SUFFIX, load_project, save_project
+
+
+# Identificador y versión del formato del diario
+MAGIC = b"TRZDIAR1"
+
+JOURNAL_SUFFIX = ".diario"
+
+# Tamaño mínimo del diario antes de compactarlo (además de superar a la
+# instantánea): acota el tiempo de recuperación sin compactar a cada rato
+COMPACT_MIN_BYTES = 16 * 1024 * 1024
+
+# Archivo bloqueado por el editor que tiene abierta la sesión
+LOCK_NAME = "sesion.lock"
+
+# Editores abiertos a la vez con el directorio por defecto
+MAX_SESSIONS = 16
+
+# Tipos de registro
+ADD_STROKE = 1  # Trazo agregado al final
+ADD_SHAPE = 2  # Forma agregada al final
+CLEAR = 3  # Dibujo vaciado
+CANVAS_SIZE = 4  # Tamaño del lienzo en cm
+SPLICE = 5  # Tramo de trazos o formas reemplazado (borrador, deshacer y rehacer)
+
+_NAME = re.compile(r"sesion-(\d{6})(%s|%s)$" % (re.escape(PROJECT_SUFFIX),
+                                                 re.escape(JOURNAL_SUFFIX)))
+_GENERATION = struct.Struct("<Q")
+_RECORD = struct.Struct("<IBI")
+_TEXT = struct.Struct("<H")
+_STROKE = struct.Struct("<dI")
+_SHAPE = struct.Struct("<5d")
+_SIZE = struct.Struct("<dd")
+_SPLICE = struct.Struct("<BIII")
+
+
+def default_session_dir():
+    """Directorio por defecto: $XDG_STATE_HOME (o ~/.local/state)/editor_trazos/sesion."""
+    base = (os.environ.get("XDG_STATE_HOME")
+            or os.path.join(os.path.expanduser("~"), ".local", "state"))
+    return os.path.join(base, "editor_trazos", "sesion")
+
+
+def replay(data, strokes, shapes, canvas_size=None, position=0):
+    """
+    Aplica a un dibujo los registros de un diario.
+
+    Se detiene en el primer registro incompleto, con CRC incorrecto o que
+    no se puede aplicar (lo que queda después se descarta).
+
+    Args:
+        data: Contenido del diario (bytes)
+        strokes: Lista de trazos, que se modifica en el lugar
+        shapes: Lista de formas, que se modifica en el lugar
+        canvas_size: (ancho_cm, alto_cm) del lienzo antes del diario, o None
+        position: Posición del primer registro en data
+
+    Returns:
+        tuple: (canvas_size, position, records) con el tamaño del lienzo
+        final, el fin del último registro válido y los registros aplicados
+    """
+    records = 0
+    while position + _RECORD.size <= len(data):
+        size, kind, crc = _RECORD.unpack_from(data, position)
+        start = position + _RECORD.size
+        payload = data[start:start + size]
+        if len(payload) != size or _checksum(kind, payload) != crc:
+            break
+        try:
+            canvas_size = _apply(kind, payload, strokes, shapes, canvas_size)
+        except (ValueError, IndexError, struct.error, UnicodeDecodeError):
+            break
+        position = start + size
+        records += 1
+    return canvas_size, position, records
+
+
+class SessionJournal:
+    """
+    Diario de cambios de la sesión con instantáneas periódicas.
+
+    Los métodos de registro sólo acumulan bytes en memoria; sync() los
+    escribe y hace fsync. Si el disco falla, el diario se desactiva (error
+    guarda el motivo) y el editor sigue funcionando sin él.
+
+    recover() toma la sesión (ver _claim) y compact() no escribe nada
+    mientras no se haya tomado.
+    """
+
+    __slots__ = ("directory", "compact_bytes", "generation", "snapshot_bytes",
+                 "journal_bytes", "error", "_slots", "_claimed", "_lock", "_file", "_buffer")
+
+    def __init__(self, directory=None, compact_bytes=COMPACT_MIN_BYTES):
+        """
+        Args:
+            directory: Directorio de la sesión (por defecto default_session_dir(),
+                o el siguiente libre si otro editor lo tiene abierto)
+            compact_bytes: Tamaño mínimo del diario antes de compactarlo
+        """
+        self.directory = directory or default_session_dir()
+        self.compact_bytes = compact_bytes
+        self.generation = 0
+        self.snapshot_bytes = 0
+        self.journal_bytes = 0
+        self.error = None
+        self._slots = 1 if directory else MAX_SESSIONS
+        self._claimed = False  # La sesión es de este diario (ver _claim)
+        self._lock = None  # Descriptor de LOCK_NAME con el flock tomado
+        self._file = None
+        self._buffer = bytearray()
+
+    def path(self, generation, suffix):
+        """Ruta del archivo de una generación (suffix: PROJECT_SUFFIX o JOURNAL_SUFFIX)."""
+        return os.path.join(self.directory, f"sesion-{generation:06d}{suffix}")
+
+    def recover(self):
+        """
+        Reconstruye el dibujo de la sesión guardada y abre su diario.
+
+        Borra los archivos de otras generaciones y recorta el registro final
+        si quedó incompleto; los cambios siguientes se agregan a continuación.
+
+        Returns:
+            tuple: (strokes, shapes, canvas_size, records) con canvas_size
+            None si la sesión no lo indica y los registros aplicados
+
+        Raises:
+            OSError: Si el directorio de la sesión no se puede usar o ya
+                está abierto en otro editor
+            ValueError: Si la instantánea está dañada
+        """
+        self._claim()
+        generations = {}
+        for name in os.listdir(self.directory):
+            match = _NAME.match(name)
+            if match:
+                generations.setdefault(int(match.group(1)), set()).add(match.group(2))
+        snapshots = [generation for generation, suffixes in generations.items()
+                     if PROJECT_SUFFIX in suffixes]
+        self.generation = max(snapshots, default=0)
+
+        for generation in generations:
+            if generation != self.generation:
+                for suffix in (PROJECT_SUFFIX, JOURNAL_SUFFIX):
+                    _remove(self.path(generation, suffix))
+
+        strokes, shapes, canvas_size = [], [], None
+        self.snapshot_bytes = 0
+        if self.generation in snapshots:
+            snapshot = self.path(self.generation, PROJECT_SUFFIX)
+            strokes, shapes, canvas_size = load_project(snapshot)
+            self.snapshot_bytes = os.path.getsize(snapshot)
+
+        records = 0
+        valid = 0
+        header = MAGIC + _GENERATION.pack(self.generation)
+        try:
+            with open(self.path(self.generation, JOURNAL_SUFFIX), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            data = b""
+        if data.startswith(header):
+            canvas_size, valid, records = replay(data, strokes, shapes, canvas_size, len(header))
+
+        self._open(valid)
+        return strokes, shapes, canvas_size, records
+
+    def add_stroke(self, stroke):
+        """Anota un trazo agregado al final del dibujo."""
+        self._append(ADD_STROKE, _stroke_bytes(stroke))
+
+    def add_shape(self, shape):
+        """Anota una forma agregada al final del dibujo."""
+        self._append(ADD_SHAPE, _shape_bytes(shape))
+
+    def splice(self, shapes, index, removed, inserted):
+        """
+        Anota un tramo reemplazado (ver historial.History).
+
+        Args:
+            shapes: True si el tramo es de formas, False si es de trazos
+            index: Posición del tramo
+            removed: Cantidad de elementos quitados
+            inserted: Trazos o formas puestos en su lugar
+        """
+        item_bytes = _shape_bytes if shapes else _stroke_bytes
+        self._append(SPLICE, b"".join([_SPLICE.pack(shapes, index, removed, len(inserted))]
+                                      + [item_bytes(item) for item in inserted]))
+
+    def clear(self):
+        """Anota que se vació el dibujo."""
+        self._append(CLEAR, b"")
+
+    def set_canvas_size(self, width_cm, height_cm):
+        """Anota el tamaño del lienzo."""
+        self._append(CANVAS_SIZE, _SIZE.pack(width_cm, height_cm))
+
+    def sync(self):
+        """
+        Escribe los registros acumulados y hace fsync.
+
+        Returns:
+            int: Bytes escritos
+        """
+        if self._file is None or not self._buffer:
+            return 0
+        try:
+            self._file.write(self._buffer)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            self._disable(e)
+            return 0
+        size = len(self._buffer)
+        self.journal_bytes += size
+        self._buffer.clear()
+        return size
+
+    def needs_compaction(self):
+        """True si el diario ya ocupa más que la instantánea y que compact_bytes."""
+        return self.journal_bytes > max(self.compact_bytes, self.snapshot_bytes)
+
+    def compact(self, strokes, shapes, canvas_size):
+        """
+        Reemplaza la sesión por una instantánea del dibujo y un diario vacío.
+
+        Los registros aún sin escribir se descartan: ya están en la
+        instantánea.
+
+        Args:
+            strokes: Trazos del dibujo
+            shapes: Formas del dibujo
+            canvas_size: (ancho_cm, alto_cm) del lienzo
+
+        Returns:
+            int: Bytes de la instantánea (0 si no se pudo escribir)
+        """
+        if not self._claimed:
+            return 0
+        previous = self.generation
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            snapshot_bytes = save_project(self.path(previous + 1, PROJECT_SUFFIX),
+                                          strokes, shapes, canvas_size)
+            if self._file is not None:
+                self._file.close()
+            self.generation = previous + 1
+            self.snapshot_bytes = snapshot_bytes
+            self._buffer.clear()
+            self._open(0)
+        except OSError as e:
+            self._disable(e)
+            return 0
+
+        for suffix in (PROJECT_SUFFIX, JOURNAL_SUFFIX):
+            _remove(self.path(previous, suffix))
+        return snapshot_bytes
+
+    def close(self):
+        """Escribe lo pendiente y cierra el diario (la sesión queda guardada y libre)."""
+        self.sync()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self._lock is not None:
+            os.close(self._lock)
+            self._lock = None
+        self._claimed = False
+
+    def _claim(self):
+        """
+        Toma el directorio de la sesión con un flock exclusivo sobre LOCK_NAME.
+
+        Si otro editor lo tiene, prueba con directory-1, directory-2... (hasta
+        MAX_SESSIONS directorios, sólo con el directorio por defecto). Sin
+        fcntl la sesión se usa sin bloquear.
+
+        Raises:
+            OSError: Si no se puede crear el directorio o todos están tomados
+        """
+        if self._claimed:
+            return
+        base = self.directory
+        for slot in range(self._slots):
+            directory = base if slot == 0 else f"{base}-{slot}"
+            os.makedirs(directory, exist_ok=True)
+            if fcntl is not None:
+                fd = os.open(os.path.join(directory, LOCK_NAME), os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    os.close(fd)
+                    continue
+                self._lock = fd
+            self.directory = directory
+            self._claimed = True
+            return
+        raise OSError(f"La sesión {base} ya está abierta en otro editor")
+
+    def _open(self, valid):
+        """
+        Abre el diario de la generación actual para agregar registros.
+
+        Args:
+            valid: Bytes válidos del diario existente (0 para crearlo de nuevo)
+        """
+        path = self.path(self.generation, JOURNAL_SUFFIX)
+        self._file = None
+        if valid:
+            f = open(path, "r+b")
+            f.truncate(valid)
+            f.seek(valid)
+        else:
+            f = open(path, "wb")
+            f.write(MAGIC + _GENERATION.pack(self.generation))
+            f.flush()
+            os.fsync(f.fileno())
+            _sync_directory(self.directory)
+        self._file = f
+        self.journal_bytes = f.tell()
+        self.error = None
+
+    def _append(self, kind, payload):
+        """Agrega un registro al lote pendiente (nada si el diario no está abierto)."""
+        if self._file is None:
+            return
+        self._buffer += _RECORD.pack(len(payload), kind, _checksum(kind, payload))
+        self._buffer += payload
+
+    def _disable(self, error):
+        """Desactiva el diario tras un error de disco."""
+        self.error = error
+        self._buffer.clear()
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+
+def _checksum(kind, payload):
+    """CRC-32 del tipo y los datos de un registro."""
+    return zlib.crc32(payload, zlib.crc32(bytes((kind,))))
+
+
+def _apply(kind, payload, strokes, shapes, canvas_size):
+    """
+    Aplica un registro a un dibujo.
+
+    Returns:
+        tuple: Tamaño del lienzo después del registro
+
+    Raises:
+        ValueError: Si el tipo no se conoce o sobran datos
+        IndexError: Si el registro apunta fuera del dibujo
+    """
+    position = 0
+    if kind == ADD_STROKE:
+        stroke, position = _read_stroke(payload, position)
+        strokes.append(stroke)
+    elif kind == ADD_SHAPE:
+        shape, position = _read_shape(payload, position)
+        shapes.append(shape)
+    elif kind == SPLICE:
+        is_shapes, index, removed, count = _SPLICE.unpack_from(payload, position)
+        position += _SPLICE.size
+        read_item = _read_shape if is_shapes else _read_stroke
+        inserted = []
+        for _ in range(count):
+            item, position = read_item(payload, position)
+            inserted.append(item)
+        items = shapes if is_shapes else strokes
+        if index + removed > len(items):
+            raise IndexError("El registro no corresponde al dibujo")
+        items[index:index + removed] = inserted
+    elif kind == CLEAR:
+        strokes.clear()
+        shapes.clear()
+    elif kind == CANVAS_SIZE:
+        canvas_size = _SIZE.unpack_from(payload, position)
+        position += _SIZE.size
+    else:
+        raise ValueError(f"Tipo de registro desconocido: {kind}")
+
+    if position != len(payload):
+        raise ValueError("Datos sobrantes en el registro")
+    return canvas_size
+
+
+def _text_bytes(value):
+    """Texto UTF-8 precedido por su largo."""
+    data = value.encode("utf-8")
+    return _TEXT.pack(len(data)) + data
+
+
+def _read_text(data, position):
+    """Lee un texto de _text_bytes; devuelve (texto, posición siguiente)."""
+    (size,) = _TEXT.unpack_from(data, position)
+    position += _TEXT.size
+    if position + size > len(data):
+        raise ValueError("Texto incompleto")
+    return data[position:position + size].decode("utf-8"), position + size
+
+
+def _stroke_bytes(stroke):
+    """Serializa un trazo: color, tipo, ancho, cantidad de puntos y puntos float64."""
+    points = np.ascontiguousarray(stroke.points, dtype="<f8")
+    return b"".join((_text_bytes(stroke.color), _text_bytes(stroke.type),
+                     _STROKE.pack(stroke.width, len(points)), points.tobytes()))
+
+
+def _read_stroke(data, position):
+    """Lee un trazo de _stroke_bytes; devuelve (trazo, posición siguiente)."""
+    color, position = _read_text(data, position)
+    kind, position = _read_text(data, position)
+    width, count = _STROKE.unpack_from(data, position)
+    position += _STROKE.size
+    end = position + 16 * count
+    if end > len(data):
+        raise ValueError("Puntos incompletos")
+    # Se copian: los trazos no retienen el contenido del diario leído
+    points = np.frombuffer(data, "<f8", 2 * count, position).reshape(-1, 2).copy()
+    return Stroke(points, color, _number(width), kind), end
+
+
+def _shape_bytes(shape):
+    """Serializa una forma: tipo, color, ancho, inicio y fin."""
+    (x1, y1), (x2, y2) = shape["start"], shape["end"]
+    return b"".join((_text_bytes(shape["type"]), _text_bytes(shape["color"]),
+                     _SHAPE.pack(shape["width"], x1, y1, x2, y2)))
+
+
+def _read_shape(data, position):
+    """Lee una forma de _shape_bytes; devuelve (forma, posición siguiente)."""
+    kind, position = _read_text(data, position)
+    color, position = _read_text(data, position)
+    width, x1, y1, x2, y2 = _SHAPE.unpack_from(data, position)
+    shape = {"type": kind, "start": (x1, y1), "end": (x2, y2),
+             "color": color, "width": _number(width)}
+    return shape, position + _SHAPE.size
+
+
+def _number(value):
+    """Devuelve los anchos enteros como int, igual que en el JSON del editor."""
+    return int(value) if value.is_integer() else value
+
+
+def _sync_directory(path):
+    """fsync del directorio para que los archivos nuevos sobrevivan a un corte (sólo POSIX)."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _remove(path):
+    """Borra un archivo de la sesión si existe; False si no se pudo."""
+    try:
+        os.remove(path)
+    except OSError:
+        return False
+    return True
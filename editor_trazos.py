@@ -14,11 +14,34 @@ Características:
 """
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox, colorchooser
+from tkinter import ttk, filedialog, messagebox, colorchooser, simpledialog
+import asyncio
+import gc
 import json
 import math
-import ezdxf
-from ezdxf import units
+import os
+import queue
+import threading
+import time
+from collections import deque
+import numpy as np
+
+from archivo_dxf import (CHAIN_TOLERANCE, FIT_TOLERANCE, chain_dxf_geometry, dxf_export_entities,
+                         geometry_to_model, import_frame, read_dxf, simplify_dxf_geometry,
+                         write_dxf_document, write_dxf_stream)
+from cache_dxf import ImportCache
+from diario import SessionJournal
+from envio import ControllerSender, SimulatedController, command_lines, send_job
+from geometria import (BoundsTable, SegmentGrid, cut_polyline, decimate_polyline, fit_polylines,
+                       simplify_polylines)
+from historial import SHAPES, STROKES, History
+from modelo import Stroke, as_points_array, drawing_from_dict, drawing_to_dict, points_bbox, shape_outline
+from proyecto import PROJECT_SUFFIX, load_project, save_project
+from trabajo import drawing_order, drawing_paths, job_chunks, ordered_paths, write_job
+
+
+class OperationCancelled(Exception):
+    """El usuario canceló la importación o exportación de un DXF en curso."""
 
 
 class EditorTrazos:
@@ -32,9 +55,66 @@ class EditorTrazos:
     # 1 cm = 10 mm, por lo tanto: px/mm = PIXELS_PER_CM / 10
     PIXELS_PER_MM = PIXELS_PER_CM / 10.0
 
-    # Precisión para curvas DXF (SPLINE/ELLIPSE/ARC)
-    FLATTENING_DISTANCE = 0.5  # mm
-    ARC_SEGMENTS = 64
+    # Tolerancia por defecto de la simplificación Ramer–Douglas–Peucker
+    SIMPLIFY_TOLERANCE = 0.05  # mm
+
+    # Guías de medición: pasos disponibles y separación mínima en pantalla
+    GUIDE_STEPS_CM = (1, 5, 10)
+    GUIDE_MIN_SPACING_PX = 25
+
+    # Límites y paso del zoom de la vista
+    ZOOM_MIN = 0.05
+    ZOOM_MAX = 20.0
+    ZOOM_STEP = 1.2
+
+    # Nivel de detalle: máximo de items de geometría en el canvas, error de
+    # decimación permitido en pantalla y margen pre-dibujado alrededor de la vista
+    MAX_VISIBLE_ITEMS = 50000
+    LOD_TOLERANCE_PX = 0.5
+    LOD_MIN_POINTS = 32  # Trazos más cortos se dibujan sin decimar
+    VIEW_PADDING = 0.25
+
+    # Índice espacial: celda mínima (mm) y máximo de celdas por lado del lienzo,
+    # para que un segmento largo en un dibujo enorme no ocupe millones de celdas
+    INDEX_CELL_MM = 10.0
+    INDEX_MAX_CELLS = 1024
+
+    # Importación/exportación DXF en segundo plano: entidades por lote,
+    # intervalo de sondeo de la cola y tiempo máximo de trabajo por tick de la UI
+    IMPORT_BATCH_SIZE = 500
+    EXPORT_BATCH_SIZE = 2000
+    FILE_POLL_MS = 50
+    IMPORT_TICK_BUDGET = 0.04  # s
+
+    # Trazo a mano alzada: los movimientos del mouse se acumulan y se pintan
+    # a lo sumo una vez por cuadro; los que se alejan menos de la distancia
+    # mínima (px de pantalla) del último punto aceptado se descartan
+    MOTION_FRAME_MS = 16
+    MOTION_MIN_DISTANCE_PX = 1.0
+
+    # Diario de la sesión: los cambios se escriben y sincronizan (fsync) en
+    # lotes, a lo sumo este tiempo después de ocurrir
+    JOURNAL_SYNC_MS = 1000
+
+    # Historial de deshacer: memoria máxima estimada de las acciones guardadas
+    # y máximo de objetos que deshacer/rehacer dibuja al instante (con más,
+    # se registran y la vista dibuja sólo los visibles)
+    HISTORY_MAX_BYTES = 256 * 1024 * 1024
+    HISTORY_DRAW_LIMIT = 1000
+    # Memoria del índice espacial guardado al limpiar, por byte de puntos
+    # (medida con tracemalloc: unas 3,5 veces los puntos)
+    HISTORY_INDEX_FACTOR = 3.5
+
+    # Empalmes que desplazan elementos (el borrador parte trazos en el lugar)
+    # anotados antes de recalcular de una vez las posiciones guardadas
+    POSITION_SHIFTS_LIMIT = 256
+
+    # Tiempo máximo para optimizar el orden de los trazos al exportar
+    ORDER_TIME_BUDGET = 2.0  # s
+    # Desviación máxima al ajustar los trazos del DXF con rectas y arcos
+    FIT_TOLERANCE = FIT_TOLERANCE  # mm
+    # Puerto serie propuesto al enviar al robot
+    SEND_PORT = "/dev/ttyUSB0"
 
     def __init__(self, root):
         """
@@ -54,18 +134,74 @@ class EditorTrazos:
         self.canvas_width_cm = 30
         self.canvas_height_cm = 20
         self.show_guides = tk.BooleanVar(value=True)
+        self.zoom = 1.0  # Factor de zoom de la vista (1.0 = tamaño real)
+        self._guides_pending = False  # Redibujo de guías ya programado
+        self.simplify_enabled = tk.BooleanVar(value=False)
 
         # Almacenamiento de trazos y formas
-        self.strokes = []  # Lista de trazos libres
+        # El modelo está en mm con el eje Y hacia arriba (como en DXF); la
+        # vista lo proyecta al canvas con la escala PIXELS_PER_MM * zoom
+        self.strokes = []  # Lista de trazos libres (Stroke)
         self.shapes = []  # Lista de formas geométricas
-        self.current_stroke = []  # Trazo actual en progreso
+        self.current_stroke = []  # Trazo actual en progreso (mm)
+        self.current_item = None  # Item de canvas del trazo en progreso
+        self.current_coords = []  # Coordenadas planas [x0, y0, x1, y1, ...] del trazo en progreso
+        self._motion_coords = []  # Coordenadas de canvas aceptadas y aún sin pintar
+        self._motion_since = None  # Llegada (perf_counter) del movimiento más viejo sin pintar
+        self._event_clock = 0.0  # perf_counter - event.time / 1000, fijado al presionar
+        self._motion_pending = False  # Pintado del trazo en progreso ya programado
+        self._motion_last_flush = 0.0  # perf_counter del último pintado
+        self._motion_events = 0  # Movimientos recibidos en el trazo en progreso
+        self._motion_flushes = 0  # Actualizaciones del item en el trazo en progreso
+        self._paint_latencies = []  # Entrada → pantalla (s) de cada actualización
+        self.item_to_stroke = {}  # Item de canvas -> trazo en self.strokes
+        self.item_to_shape = {}  # Item de canvas -> forma en self.shapes
+
+        # Geometría registrada, indexada por clave (id del trazo o forma).
+        # Sólo los objetos en la vista tienen item de canvas.
+        self.model_objects = {}  # Clave -> trazo o forma
+        self._positions = {}  # Clave -> (posición en self.strokes o self.shapes, desplazamientos ya contados)
+        self._position_shifts = []  # (lista, desde, delta) de los empalmes posteriores (ver _position)
+        self.key_to_item = {}  # Clave -> item de canvas dibujado
+        self.spatial_index = SegmentGrid(cell_size=self.INDEX_CELL_MM)  # Segmentos de trazos y contornos de formas (mm)
+        self.view_bounds = BoundsTable()  # Bounding boxes para recortar a la vista (mm)
+        self._lod_cache = {}  # Clave -> (nivel, puntos decimados)
+        self._item_lod = {}  # Item de trazo -> (nivel de detalle, puntos dibujados)
+        self._render_pending = False  # Actualización de la vista ya programada
         self.temp_shape = None  # Forma temporal durante el dibujo
-        self.shape_start = None  # Punto inicial para formas
+        self.shape_start = None  # Punto inicial para formas (mm)
+
+        # Importación DXF en curso (hilo de trabajo -> cola -> UI)
+        self._import_queue = None  # Cola de mensajes del hilo, o None si no hay importación
+        self._import_cancel = None  # threading.Event para cancelar
+        self._import_previous = None  # Dibujo reemplazado por la importación, hasta terminarla
+        self._import_report = None  # Resumen de simplificación de la importación
+        self._import_pending = deque()  # Trazos y formas recibidos aún sin registrar
+        self._import_cache = ImportCache()  # DXF ya aplanados, en disco
+
+        # Exportación DXF en curso
+        self._export_queue = None  # Cola de mensajes del hilo, o None si no hay exportación
+        self._export_cancel = None  # threading.Event para cancelar
+        self._export_report = None  # Resumen de simplificación de la exportación
+        self._sender = None  # ControllerSender del envío al robot en curso
+        self.stream_export = tk.BooleanVar(value=False)  # Exportación rápida R12 en flujo
+        self.optimize_order = tk.BooleanVar(value=True)  # Reordenar trazos al exportar
+        self.fit_arcs = tk.BooleanVar(value=True)  # Ajustar trazos con arcos en el DXF
+        self.chain_import = tk.BooleanVar(value=True)  # Unir piezas contiguas al importar
+
+        # Diario de la sesión, para recuperar el dibujo tras un cierre inesperado
+        self._journal = SessionJournal()
+        self._journal_sync_pending = False  # Escritura del diario ya programada
+
+        # Deshacer/rehacer, con los trazos compartidos entre historial y dibujo
+        self._history = History(self.HISTORY_MAX_BYTES)
 
         # Configurar la interfaz de usuario
         self._setup_ui()
         self._setup_canvas()
         self._bind_events()
+        self.root.protocol("WM_DELETE_WINDOW", self._on_close)
+        self.root.after_idle(self._recover_session)
 
     def _setup_ui(self):
         """Configura la interfaz de usuario con diseño profesional azulado."""
@@ -99,6 +235,17 @@ class EditorTrazos:
         self._create_tool_button(tools_frame, "▭ Rectángulo", "rectangle")
         self._create_tool_button(tools_frame, "△ Triángulo", "triangle")
 
+        # Deshacer/rehacer (también Ctrl+Z, Ctrl+Y y Ctrl+Mayús+Z)
+        undo_btn = tk.Button(tools_frame, text="↶ Deshacer", command=self._undo,
+                             bg=self.button_color, fg="white", activebackground=self.button_active,
+                             width=10, height=1)
+        undo_btn.pack(side=tk.LEFT, padx=(12, 3))
+
+        redo_btn = tk.Button(tools_frame, text="↷ Rehacer", command=self._redo,
+                             bg=self.button_color, fg="white", activebackground=self.button_active,
+                             width=10, height=1)
+        redo_btn.pack(side=tk.LEFT, padx=3)
+
         # Panel izquierdo - Configuración
         left_frame = tk.Frame(self.root, bg=self.panel_color, width=250)
         left_frame.pack(side=tk.LEFT, fill=tk.Y, padx=5, pady=5)
@@ -129,6 +276,11 @@ class EditorTrazos:
         self.size_scale.set(2)
         self.size_scale.pack(pady=5, padx=10, fill=tk.X)
 
+        # Eventos y latencia del último trazo a mano alzada
+        self.input_status = tk.StringVar(value="")
+        tk.Label(left_frame, textvariable=self.input_status, bg=self.panel_color,
+                 fg="#1A5A6A", font=("Arial", 8), wraplength=230).pack(padx=10)
+
         # Sección de color
         self._create_section_label(left_frame, "Color")
 
@@ -171,22 +323,107 @@ class EditorTrazos:
                                      bg=self.panel_color, selectcolor=self.button_color)
         guides_check.pack(pady=5, padx=10)
 
+        # Simplificación de trazos (captura, importación y exportación)
+        self._create_section_label(left_frame, "Simplificación (mm)")
+
+        simplify_frame = tk.Frame(left_frame, bg=self.panel_color)
+        simplify_frame.pack(pady=5, padx=10, fill=tk.X)
+
+        simplify_check = tk.Checkbutton(simplify_frame, text="Simplificar",
+                                        variable=self.simplify_enabled,
+                                        bg=self.panel_color, selectcolor=self.button_color)
+        simplify_check.pack(side=tk.LEFT)
+
+        tk.Label(simplify_frame, text="Tolerancia:", bg=self.panel_color).pack(side=tk.LEFT)
+        self.simplify_tolerance_var = tk.StringVar(value=str(self.SIMPLIFY_TOLERANCE))
+        tolerance_entry = tk.Entry(simplify_frame, textvariable=self.simplify_tolerance_var, width=6)
+        tolerance_entry.pack(side=tk.LEFT, padx=5)
+
+        self.simplify_status = tk.StringVar(value="")
+        tk.Label(left_frame, textvariable=self.simplify_status, bg=self.panel_color,
+                 fg="#1A5A6A", font=("Arial", 8), wraplength=230).pack(padx=10)
+
         # Separador
         ttk.Separator(left_frame, orient=tk.HORIZONTAL).pack(pady=10, fill=tk.X)
 
         # Botones de archivo
         self._create_section_label(left_frame, "Archivo")
 
+        save_project_btn = tk.Button(left_frame, text="💾 Guardar proyecto",
+                                     command=self._save_project,
+                                     bg=self.button_color, fg="white",
+                                     activebackground=self.button_active)
+        save_project_btn.pack(pady=5, padx=10, fill=tk.X)
+
+        open_project_btn = tk.Button(left_frame, text="📂 Abrir proyecto",
+                                     command=self._load_project,
+                                     bg=self.button_color, fg="white",
+                                     activebackground=self.button_active)
+        open_project_btn.pack(pady=5, padx=10, fill=tk.X)
+
         save_btn = tk.Button(left_frame, text="💾 Guardar DXF",
                            command=self._save_dxf,
                            bg=self.button_color, fg="white", activebackground=self.button_active)
         save_btn.pack(pady=5, padx=10, fill=tk.X)
 
+        send_btn = tk.Button(left_frame, text="📡 Enviar al robot",
+                           command=self._send_to_robot,
+                           bg=self.button_color, fg="white", activebackground=self.button_active)
+        send_btn.pack(pady=5, padx=10, fill=tk.X)
+
+        stream_check = tk.Checkbutton(left_frame, text="Exportación rápida (DXF R12)",
+                                      variable=self.stream_export,
+                                      bg=self.panel_color, selectcolor=self.button_color)
+        stream_check.pack(padx=10)
+
+        fit_check = tk.Checkbutton(left_frame, text="Ajustar arcos (DXF)",
+                                   variable=self.fit_arcs,
+                                   bg=self.panel_color, selectcolor=self.button_color)
+        fit_check.pack(padx=10)
+
+        order_check = tk.Checkbutton(left_frame, text="Optimizar recorrido",
+                                     variable=self.optimize_order,
+                                     bg=self.panel_color, selectcolor=self.button_color)
+        order_check.pack(padx=10)
+
+        gcode_btn = tk.Button(left_frame, text="🤖 Exportar G-code",
+                            command=self._export_gcode,
+                            bg=self.button_color, fg="white", activebackground=self.button_active)
+        gcode_btn.pack(pady=5, padx=10, fill=tk.X)
+
         load_btn = tk.Button(left_frame, text="📂 Cargar DXF",
                            command=self._load_dxf,
                            bg=self.button_color, fg="white", activebackground=self.button_active)
         load_btn.pack(pady=5, padx=10, fill=tk.X)
 
+        chain_check = tk.Checkbutton(left_frame, text="Unir trazos contiguos",
+                                     variable=self.chain_import,
+                                     bg=self.panel_color, selectcolor=self.button_color)
+        chain_check.pack(padx=10)
+
+        # Progreso de la importación/exportación DXF
+        progress_frame = tk.Frame(left_frame, bg=self.panel_color)
+        progress_frame.pack(pady=(0, 5), padx=10, fill=tk.X)
+
+        self.file_progress = ttk.Progressbar(progress_frame, maximum=100, mode="determinate")
+        self.file_progress.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
+        self.file_cancel_btn = tk.Button(progress_frame, text="Cancelar",
+                                           command=self._cancel_file_job, state=tk.DISABLED,
+                                           bg=self.button_color, fg="white",
+                                           activebackground=self.button_active)
+        self.file_cancel_btn.pack(side=tk.LEFT, padx=(5, 0))
+
+        self.file_pause_btn = tk.Button(progress_frame, text="Pausar",
+                                          command=self._toggle_send_pause, state=tk.DISABLED,
+                                          bg=self.button_color, fg="white",
+                                          activebackground=self.button_active)
+        self.file_pause_btn.pack(side=tk.LEFT, padx=(5, 0))
+
+        self.file_status = tk.StringVar(value="")
+        tk.Label(left_frame, textvariable=self.file_status, bg=self.panel_color,
+                 fg="#1A5A6A", font=("Arial", 8), wraplength=230).pack(padx=10)
+
         clear_btn = tk.Button(left_frame, text="🗑️ Limpiar Todo",
                             command=self._clear_canvas,
                             bg="#D84A4A", fg="white", activebackground="#B83838")
@@ -227,9 +464,9 @@ class EditorTrazos:
                                highlightthickness=1, highlightbackground="#4A90A4")
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
 
-        # Configurar scrollbars
-        h_scrollbar.config(command=self.canvas.xview)
-        v_scrollbar.config(command=self.canvas.yview)
+        # Configurar scrollbars (las guías se recalculan al desplazar la vista)
+        h_scrollbar.config(command=self._on_xview)
+        v_scrollbar.config(command=self._on_yview)
 
         # Configurar tamaño inicial del canvas
         self._update_canvas_size()
@@ -239,6 +476,102 @@ class EditorTrazos:
         self.canvas.bind("<Button-1>", self._on_mouse_down)
         self.canvas.bind("<B1-Motion>", self._on_mouse_drag)
         self.canvas.bind("<ButtonRelease-1>", self._on_mouse_up)
+        self.canvas.bind("<Configure>", lambda event: self._on_view_changed())
+
+        # Zoom con la rueda del mouse (Windows/macOS y X11) y paneo con el botón central
+        self.canvas.bind("<MouseWheel>", self._on_mouse_wheel)
+        self.canvas.bind("<Button-4>", self._on_mouse_wheel)
+        self.canvas.bind("<Button-5>", self._on_mouse_wheel)
+        self.canvas.bind("<ButtonPress-2>", self._on_pan_start)
+        self.canvas.bind("<B2-Motion>", self._on_pan_drag)
+
+        # Deshacer/rehacer con el teclado
+        self.root.bind("<Control-z>", self._undo)
+        self.root.bind("<Control-y>", self._redo)
+        self.root.bind("<Control-Z>", self._redo)
+
+    def _on_xview(self, *args):
+        """Desplaza la vista horizontalmente y actualiza las guías visibles."""
+        self.canvas.xview(*args)
+        self._on_view_changed()
+
+    def _on_yview(self, *args):
+        """Desplaza la vista verticalmente y actualiza las guías visibles."""
+        self.canvas.yview(*args)
+        self._on_view_changed()
+
+    def _on_mouse_wheel(self, event):
+        """Aplica zoom centrado en la posición del mouse."""
+        if event.num == 4 or event.delta > 0:
+            self._zoom_at(self.ZOOM_STEP, event.x, event.y)
+        elif event.num == 5 or event.delta < 0:
+            self._zoom_at(1 / self.ZOOM_STEP, event.x, event.y)
+
+    def _on_pan_start(self, event):
+        """Inicia el paneo con el botón central."""
+        self.canvas.scan_mark(event.x, event.y)
+
+    def _on_pan_drag(self, event):
+        """Desplaza la vista mientras se arrastra con el botón central."""
+        self.canvas.scan_dragto(event.x, event.y, gain=1)
+        self._on_view_changed()
+
+    def _zoom_at(self, factor, window_x, window_y):
+        """
+        Cambia el zoom manteniendo fijo el punto bajo el cursor.
+
+        Los items ya dibujados se escalan con canvas.scale (sin reconstruir el
+        canvas); el modelo en mm no cambia.
+
+        Args:
+            factor: Factor multiplicativo de zoom
+            window_x, window_y: Posición del cursor en coordenadas de ventana
+        """
+        new_zoom = min(self.ZOOM_MAX, max(self.ZOOM_MIN, self.zoom * factor))
+        factor = new_zoom / self.zoom
+        if factor == 1:
+            return
+
+        canvas_x = self.canvas.canvasx(window_x)
+        canvas_y = self.canvas.canvasy(window_y)
+        self.zoom = new_zoom
+
+        # Escalar respecto al origen: el canvas sigue siendo modelo * escala
+        self.canvas.scale("all", 0, 0, factor, factor)
+        width_px, height_px = self._apply_scrollregion()
+
+        # Desplazar la vista para que el punto bajo el cursor no se mueva
+        if width_px > 0:
+            self.canvas.xview_moveto((canvas_x * factor - window_x) / width_px)
+        if height_px > 0:
+            self.canvas.yview_moveto((canvas_y * factor - window_y) / height_px)
+
+        self._on_view_changed()
+
+    def _on_view_changed(self):
+        """Programa la actualización de guías y geometría tras mover o escalar la vista."""
+        self._schedule_guides()
+        self._schedule_render()
+
+    def _view_scale(self):
+        """Escala actual de la vista en px de canvas por mm del modelo."""
+        return self.PIXELS_PER_MM * self.zoom
+
+    def _canvas_to_mm(self, x, y):
+        """Convierte coordenadas de canvas a coordenadas del modelo (mm, Y hacia arriba)."""
+        scale = self._view_scale()
+        return x / scale, -y / scale
+
+    def _mm_to_canvas(self, x_mm, y_mm):
+        """Convierte coordenadas del modelo (mm) a coordenadas de canvas."""
+        scale = self._view_scale()
+        return x_mm * scale, -y_mm * scale
+
+    def _mm_to_canvas_coords(self, points):
+        """Convierte un arreglo (n, 2) en mm a la lista plana de coordenadas de canvas."""
+        coords = points * self._view_scale()
+        coords[:, 1] *= -1
+        return coords.ravel().tolist()
 
     def _set_tool(self, tool):
         """Establece la herramienta actual."""
@@ -282,12 +615,17 @@ class EditorTrazos:
             width_cm = float(self.canvas_width_var.get())
             height_cm = float(self.canvas_height_var.get())
 
-            # Convertir cm a píxeles
-            width_px = int(width_cm * self.PIXELS_PER_CM)
-            height_px = int(height_cm * self.PIXELS_PER_CM)
+            self.canvas_width_cm = width_cm
+            self.canvas_height_cm = height_cm
+            self._journal.set_canvas_size(width_cm, height_cm)
+            self._schedule_journal_sync()
 
             # Configurar la región de desplazamiento del canvas
-            self.canvas.config(scrollregion=(0, 0, width_px, height_px))
+            self._apply_scrollregion()
+
+            # Ajustar la rejilla del índice al lienzo mientras está vacío
+            if not len(self.spatial_index):
+                self.spatial_index.clear(self._index_cell_size())
 
             # Redibujar guías si están activadas
             if self.show_guides.get():
@@ -295,6 +633,24 @@ class EditorTrazos:
         except ValueError:
             messagebox.showerror("Error", "Por favor ingrese valores numéricos válidos.")
 
+    def _index_cell_size(self):
+        """Lado de celda del índice espacial (mm) para el tamaño actual del lienzo."""
+        extent_mm = max(self.canvas_width_cm, self.canvas_height_cm) * 10
+        return max(self.INDEX_CELL_MM, extent_mm / self.INDEX_MAX_CELLS)
+
+    def _apply_scrollregion(self):
+        """
+        Ajusta la región de desplazamiento al lienzo con el zoom actual.
+
+        Returns:
+            tuple: (width_px, height_px) de la región
+        """
+        scale = self.PIXELS_PER_CM * self.zoom
+        width_px = int(self.canvas_width_cm * scale)
+        height_px = int(self.canvas_height_cm * scale)
+        self.canvas.config(scrollregion=(0, 0, width_px, height_px))
+        return width_px, height_px
+
     def _toggle_guides(self):
         """Activa o desactiva las guías de medición."""
         if self.show_guides.get():
@@ -303,10 +659,43 @@ class EditorTrazos:
             # Eliminar guías
             self.canvas.delete("guide")
 
+    def _schedule_guides(self):
+        """Programa un único redibujo de guías para cuando Tk esté ocioso."""
+        if self.show_guides.get() and not self._guides_pending:
+            self._guides_pending = True
+            self.root.after_idle(self._draw_guides)
+
+    def _guide_step_cm(self):
+        """Elige el paso de las guías (1, 5 o 10 cm) según el zoom de la vista."""
+        px_per_cm = self.PIXELS_PER_CM * self.zoom
+        for step in self.GUIDE_STEPS_CM:
+            if step * px_per_cm >= self.GUIDE_MIN_SPACING_PX:
+                return step
+        return self.GUIDE_STEPS_CM[-1]
+
+    def _visible_area(self):
+        """Devuelve el área visible del canvas (x0, y0, x1, y1) en coordenadas de canvas."""
+        x0 = self.canvas.canvasx(0)
+        y0 = self.canvas.canvasy(0)
+        x1 = self.canvas.canvasx(self.canvas.winfo_width())
+        y1 = self.canvas.canvasy(self.canvas.winfo_height())
+        return x0, y0, x1, y1
+
     def _draw_guides(self):
-        """Dibuja guías de medición en el canvas con numeración cartesiana."""
+        """
+        Dibuja guías de medición con numeración cartesiana.
+
+        Sólo se crean las guías que caen en el área visible, con un paso de
+        1, 5 o 10 cm según el zoom, por lo que el número de items no depende
+        del tamaño del lienzo. Las guías no se registran en el índice
+        espacial, así que el borrador nunca las alcanza.
+        """
+        self._guides_pending = False
+
         # Eliminar guías existentes
         self.canvas.delete("guide")
+        if not self.show_guides.get():
+            return
 
         # Obtener dimensiones del canvas
         scrollregion = self.canvas.cget("scrollregion")
@@ -320,15 +709,22 @@ class EditorTrazos:
         width = int(parts[2])
         height = int(parts[3])
 
-        # Dibujar líneas de cuadrícula cada 1 cm
-        cm_px = self.PIXELS_PER_CM
+        # Área visible recortada a la región del lienzo
+        view_x0, view_y0, view_x1, view_y1 = self._visible_area()
+        view_x0 = max(0, view_x0)
+        view_y0 = max(0, view_y0)
+        view_x1 = min(width, view_x1)
+        view_y1 = min(height, view_y1)
+
+        step_cm = self._guide_step_cm()
+        step_px = step_cm * self.PIXELS_PER_CM * self.zoom
 
         # Ejes principales (X=0 e Y=0) más gruesos
         # Eje Y (vertical) en x=0
-        self.canvas.create_line(0, 0, 0, height, fill="#808080",
+        self.canvas.create_line(0, view_y0, 0, view_y1, fill="#808080",
                                width=2, tags="guide")
         # Eje X (horizontal) en y=height (invertido porque Y crece hacia abajo en canvas)
-        self.canvas.create_line(0, height, width, height, fill="#808080",
+        self.canvas.create_line(view_x0, height, view_x1, height, fill="#808080",
                                width=2, tags="guide")
 
         # Etiquetas de los ejes
@@ -339,50 +735,71 @@ class EditorTrazos:
                                fill="#404040", font=("Arial", 10, "bold"),
                                tags="guide")
 
-        # Líneas verticales con numeración
-        x = cm_px
-        cm_count = 1
-        while x < width:
-            self.canvas.create_line(x, 0, x, height, fill="#D0D0D0",
+        # Líneas verticales visibles con numeración (etiquetas al pie de la vista)
+        count = max(1, math.ceil(view_x0 / step_px))
+        x = count * step_px
+        while x < view_x1:
+            self.canvas.create_line(x, view_y0, x, view_y1, fill="#D0D0D0",
                                    dash=(2, 4), tags="guide")
             # Etiqueta con el valor en cm
-            self.canvas.create_text(x, height - 5, text=str(cm_count),
+            self.canvas.create_text(x, view_y1 - 5, text=str(count * step_cm),
                                    fill="#606060", font=("Arial", 8),
-                                   anchor=tk.N, tags="guide")
-            x += cm_px
-            cm_count += 1
-
-        # Líneas horizontales con numeración (invertida porque Y crece hacia abajo)
-        y = height - cm_px
-        cm_count = 1
-        while y > 0:
-            self.canvas.create_line(0, y, width, y, fill="#D0D0D0",
+                                   anchor=tk.S, tags="guide")
+            count += 1
+            x = count * step_px
+
+        # Líneas horizontales visibles con numeración (invertida porque Y crece hacia abajo)
+        count = max(1, math.ceil((height - view_y1) / step_px))
+        y = height - count * step_px
+        while y > view_y0:
+            self.canvas.create_line(view_x0, y, view_x1, y, fill="#D0D0D0",
                                    dash=(2, 4), tags="guide")
             # Etiqueta con el valor en cm
-            self.canvas.create_text(5, y, text=str(cm_count),
+            self.canvas.create_text(view_x0 + 5, y, text=str(count * step_cm),
                                    fill="#606060", font=("Arial", 8),
                                    anchor=tk.W, tags="guide")
-            y -= cm_px
-            cm_count += 1
+            count += 1
+            y = height - count * step_px
 
         # Asegurar que las guías estén al fondo
         self.canvas.tag_lower("guide")
 
     def _on_mouse_down(self, event):
         """Maneja el evento de presionar el botón del mouse."""
-        # Convertir coordenadas de ventana a canvas
+        # El dibujo no se edita mientras una importación lo reemplaza
+        if self._import_queue is not None:
+            return
+
+        # Convertir coordenadas de ventana a canvas y a mm del modelo
         x = self.canvas.canvasx(event.x)
         y = self.canvas.canvasy(event.y)
+        x_mm, y_mm = self._canvas_to_mm(x, y)
 
         if self.current_tool == "brush":
-            # Iniciar un nuevo trazo
-            self.current_stroke = [(x, y)]
+            # Iniciar un nuevo trazo con un único item de canvas
+            self.current_stroke = [(x_mm, y_mm)]
+            self.current_coords = [x, y]
+            self._motion_coords = []
+            self._motion_since = None
+            self._event_clock = time.perf_counter() - event.time / 1000
+            self._motion_events = 0
+            self._motion_flushes = 0
+            self._paint_latencies = []
+            # Tk requiere al menos dos puntos: el inicial se duplica hasta el primer movimiento
+            self.current_item = self.canvas.create_line(
+                x, y, x, y,
+                fill=self.brush_color,
+                width=self.brush_size,
+                capstyle=tk.ROUND,
+                smooth=True
+            )
         elif self.current_tool == "eraser":
-            # Iniciar borrado
-            self.current_stroke = [(x, y)]
+            # Iniciar borrado; toda la pasada se deshace de una vez
+            self.current_stroke = [(x_mm, y_mm)]
+            self._history.begin()
         elif self.current_tool in ["line", "circle", "rectangle", "triangle"]:
             # Guardar punto inicial para formas
-            self.shape_start = (x, y)
+            self.shape_start = (x_mm, y_mm)
 
     def _on_mouse_drag(self, event):
         """Maneja el evento de arrastrar el mouse."""
@@ -391,34 +808,17 @@ class EditorTrazos:
         y = self.canvas.canvasy(event.y)
 
         if self.current_tool == "brush":
-            # Dibujar línea desde el último punto
+            # Acumular el punto; el item se actualiza en _flush_motion
             if self.current_stroke:
-                last_x, last_y = self.current_stroke[-1]
-                line = self.canvas.create_line(last_x, last_y, x, y,
-                                              fill=self.brush_color,
-                                              width=self.brush_size,
-                                              capstyle=tk.ROUND,
-                                              smooth=True)
-                self.current_stroke.append((x, y))
+                self._queue_motion(x, y, self._event_clock + event.time / 1000)
         elif self.current_tool == "eraser":
-            # Borrar elementos encontrados (excepto guías)
+            # Borrar geométricamente trazos y formas (las guías no están indexadas)
             if self.current_stroke:
-                # Buscar elementos en el área del borrador
-                # Usar un radio basado en el tamaño del brush
-                radius = self.brush_size / 2
-                items = self.canvas.find_overlapping(
-                    x - radius, y - radius,
-                    x + radius, y + radius
-                )
-                # Eliminar solo elementos que NO sean guías
-                for item in items:
-                    tags = self.canvas.gettags(item)
-                    if "guide" not in tags:
-                        self.canvas.delete(item)
-                        # También eliminar del almacenamiento si es necesario
-                        # (esto se manejará mejor en el futuro)
-
-                self.current_stroke.append((x, y))
+                # Usar un radio basado en el tamaño del brush (px de pantalla -> mm)
+                radius = self.brush_size / 2 / self._view_scale()
+                x_mm, y_mm = self._canvas_to_mm(x, y)
+                self._erase_at(x_mm, y_mm, radius)
+                self.current_stroke.append((x_mm, y_mm))
         elif self.current_tool in ["line", "circle", "rectangle", "triangle"]:
             # Dibujar forma temporal
             if self.shape_start:
@@ -427,7 +827,8 @@ class EditorTrazos:
                     self.canvas.delete(self.temp_shape)
 
                 # Dibujar nueva forma temporal
-                self.temp_shape = self._draw_shape_preview(self.shape_start, (x, y))
+                self.temp_shape = self._draw_shape_preview(self.shape_start,
+                                                           self._canvas_to_mm(x, y))
 
     def _on_mouse_up(self, event):
         """Maneja el evento de soltar el botón del mouse."""
@@ -436,20 +837,39 @@ class EditorTrazos:
         y = self.canvas.canvasy(event.y)
 
         if self.current_tool == "brush":
-            # Guardar el trazo completo
+            # Guardar el trazo completo, con el último punto aunque esté cerca
             if self.current_stroke:
-                self.current_stroke.append((x, y))
-                stroke_data = {
-                    "type": self.current_tool,
-                    "points": self.current_stroke,
-                    "color": self.brush_color,
-                    "width": self.brush_size
-                }
+                self._motion_coords.extend((x, y))
+                if self._motion_since is None:
+                    self._motion_since = self._event_clock + event.time / 1000
+                self._flush_motion()
+                self.root.after_idle(self._report_input, self._motion_events,
+                                     self._motion_flushes, self._paint_latencies)
+                stroke_data = Stroke(self.current_stroke, self.brush_color, self.brush_size)
+
+                # Simplificar el trazo capturado (tolerancia en mm)
+                tolerance = self._get_simplify_tolerance()
+                if tolerance is not None:
+                    simplified, removed, elapsed = simplify_polylines(
+                        [stroke_data.points], tolerance)
+                    stroke_data.points = simplified[0]
+                    self.canvas.coords(self.current_item,
+                                       self._mm_to_canvas_coords(stroke_data.points))
+                    self._report_simplification("Captura", removed, elapsed)
+
                 self.strokes.append(stroke_data)
+                self._set_position(stroke_data, len(self.strokes) - 1)
+                self._register_stroke(stroke_data, item=self.current_item)
+                self._history.record(STROKES, len(self.strokes) - 1, (), (stroke_data,))
+                self._journal.add_stroke(stroke_data)
+                self._schedule_journal_sync()
                 self.current_stroke = []
+                self.current_coords = []
+                self.current_item = None
         elif self.current_tool == "eraser":
             # No guardar trazos de borrador
             self.current_stroke = []
+            self._history.end()
         elif self.current_tool in ["line", "circle", "rectangle", "triangle"]:
             # Finalizar forma
             if self.shape_start:
@@ -462,18 +882,449 @@ class EditorTrazos:
                 shape_data = {
                     "type": self.current_tool,
                     "start": self.shape_start,
-                    "end": (x, y),
+                    "end": self._canvas_to_mm(x, y),
                     "color": self.brush_color,
                     "width": self.brush_size
                 }
                 self.shapes.append(shape_data)
-                self._draw_shape(shape_data)
+                self._set_position(shape_data, len(self.shapes) - 1)
+                self._register_shape(shape_data, draw=True)
+                self._history.record(SHAPES, len(self.shapes) - 1, (), (shape_data,))
+                self._journal.add_shape(shape_data)
+                self._schedule_journal_sync()
                 self.shape_start = None
 
+    def _get_simplify_tolerance(self):
+        """Devuelve la tolerancia de simplificación en mm, o None si está desactivada."""
+        if not self.simplify_enabled.get():
+            return None
+        try:
+            tolerance = float(self.simplify_tolerance_var.get())
+        except ValueError:
+            return None
+        return tolerance if tolerance > 0 else None
+
+    def _report_simplification(self, stage, removed, elapsed):
+        """Muestra y devuelve el resumen de una etapa de simplificación."""
+        report = f"{stage}: {removed} puntos eliminados en {elapsed * 1000:.1f} ms"
+        self.simplify_status.set(report)
+        return report
+
+    def _queue_motion(self, x, y, arrival):
+        """
+        Acumula un movimiento del trazo en progreso (coordenadas de canvas).
+
+        Un mouse o una tableta de alta frecuencia envían cientos de eventos
+        por segundo y cada coords() reenvía a Tk el trazo entero: pintar en
+        cada evento satura el bucle y el trazo queda detrás del cursor. Los
+        puntos se acumulan y _flush_motion los pinta a lo sumo una vez por
+        cuadro (MOTION_FRAME_MS), en cuanto Tk termina los eventos pendientes.
+
+        Args:
+            x, y: Posición en coordenadas de canvas
+            arrival: Momento del evento (perf_counter), para medir la latencia
+        """
+        self._motion_events += 1
+        coords = self._motion_coords or self.current_coords
+        dx = x - coords[-2]
+        dy = y - coords[-1]
+        if dx * dx + dy * dy < self.MOTION_MIN_DISTANCE_PX ** 2:
+            return
+
+        self._motion_coords.extend((x, y))
+        if self._motion_since is None:
+            self._motion_since = arrival
+
+        if not self._motion_pending:
+            self._motion_pending = True
+            wait_ms = self.MOTION_FRAME_MS - (time.perf_counter() - self._motion_last_flush) * 1000
+            if wait_ms <= 0:
+                self.root.after_idle(self._flush_motion)
+            else:
+                self.root.after(int(wait_ms) + 1, self._flush_motion)
+
+    def _flush_motion(self):
+        """Agrega los movimientos acumulados al trazo en progreso con un único coords()."""
+        self._motion_pending = False
+        if not self._motion_coords or not self.current_stroke:
+            return
+
+        coords = self._motion_coords
+        scale = self._view_scale()
+        self.current_stroke.extend(zip([x / scale for x in coords[0::2]],
+                                       [-y / scale for y in coords[1::2]]))
+        self.current_coords.extend(coords)
+        self._motion_coords = []
+        if self.current_item is not None:
+            self.canvas.coords(self.current_item, self.current_coords)
+
+        # Tk redibuja el canvas en una tarea ociosa programada por coords();
+        # la que se programa ahora corre después, con el trazo ya en pantalla
+        since, latencies = self._motion_since, self._paint_latencies
+        self._motion_since = None
+        self._motion_flushes += 1
+        self._motion_last_flush = time.perf_counter()
+        self.root.after_idle(lambda: latencies.append(time.perf_counter() - since))
+
+    def _report_input(self, events, flushes, latencies):
+        """Muestra los eventos y la latencia entrada → pantalla de un trazo terminado."""
+        if not latencies:
+            return
+        self.input_status.set(
+            f"Trazo: {events} eventos → {flushes} actualizaciones; "
+            f"latencia media {1000 * sum(latencies) / len(latencies):.1f} ms, "
+            f"máx. {1000 * max(latencies):.1f} ms")
+
+    def _draw_stroke(self, stroke_data, points=None):
+        """
+        Dibuja un trazo como un único item de polilínea.
+
+        Args:
+            stroke_data: Trazo (Stroke) a dibujar
+            points: Puntos a dibujar en mm (por defecto, todos los del trazo)
+
+        Returns:
+            int: Id del item de canvas, o None si el trazo tiene menos de 2 puntos
+        """
+        if points is None:
+            points = stroke_data.points
+        if len(points) < 2:
+            return None
+
+        return self.canvas.create_line(self._mm_to_canvas_coords(points),
+                                       fill=stroke_data.color,
+                                       width=stroke_data.width,
+                                       capstyle=tk.ROUND,
+                                       smooth=True)
+
+    def _register_stroke(self, stroke_data, item=None, draw=False):
+        """
+        Registra un trazo en el índice espacial y en la tabla de la vista.
+
+        Args:
+            stroke_data: Trazo (Stroke) ya agregado a self.strokes
+            item: Item de canvas existente que ya lo representa (trazo en vivo)
+            draw: Dibujarlo ya en lugar de esperar a la próxima actualización de la vista
+        """
+        key = id(stroke_data)
+        self.model_objects[key] = stroke_data
+        self.spatial_index.insert(key, stroke_data.points)
+        if len(stroke_data.points):
+            self.view_bounds.add(key, stroke_data.bbox())
+
+        if item is not None:
+            self.key_to_item[key] = item
+            self.item_to_stroke[item] = stroke_data
+            self._item_lod[item] = (None, len(stroke_data.points))
+        elif draw:
+            self._show_object(key, self._lod_level())
+        else:
+            self._schedule_render()
+
+    def _register_shape(self, shape_data, draw=False):
+        """
+        Registra el contorno de una forma en el índice espacial y en la tabla de la vista.
+
+        Args:
+            shape_data: Forma ya agregada a self.shapes
+            draw: Dibujarla ya en lugar de esperar a la próxima actualización de la vista
+        """
+        key = id(shape_data)
+        outline = as_points_array(self._shape_outline(shape_data))
+        self.model_objects[key] = shape_data
+        self.spatial_index.insert(key, outline)
+        if len(outline):
+            self.view_bounds.add(key, points_bbox(outline))
+
+        if draw:
+            self._show_object(key, self._lod_level())
+        else:
+            self._schedule_render()
+
+    def _unregister(self, key):
+        """Elimina un trazo o forma del índice, de la vista y del canvas."""
+        self.model_objects.pop(key, None)
+        self._positions.pop(key, None)
+        self.spatial_index.remove(key)
+        self.view_bounds.remove(key)
+        self._lod_cache.pop(key, None)
+        self._hide_object(key)
+
+    def _lod_level(self):
+        """
+        Nivel de detalle para el zoom actual.
+
+        Es el exponente de la mayor potencia de 2 (en mm) que no supera
+        LOD_TOLERANCE_PX en pantalla; los trazos se deciman con esa tolerancia.
+        """
+        return math.floor(math.log2(self.LOD_TOLERANCE_PX / self._view_scale()))
+
+    def _lod_points(self, key, stroke_data, level, size=None):
+        """
+        Devuelve los puntos del trazo decimados para un nivel (con cache).
+
+        Args:
+            key: Clave del trazo
+            stroke_data: Trazo (Stroke)
+            level: Nivel de detalle (ver _lod_level)
+            size: Lado mayor del bounding box en mm, si ya se conoce
+        """
+        points = stroke_data.points
+        tolerance = 2.0 ** level
+        if size is not None and size * math.sqrt(2) <= tolerance:
+            # Todo el trazo cabe en la tolerancia: basta con sus extremos
+            return points[[0, -1]]
+        if len(points) < self.LOD_MIN_POINTS:
+            return points
+
+        cached = self._lod_cache.get(key)
+        if cached is not None and cached[0] == level:
+            return cached[1]
+        points = decimate_polyline(stroke_data.points, tolerance)
+        if len(points) == len(stroke_data.points):
+            points = stroke_data.points
+        self._lod_cache[key] = (level, points)
+        return points
+
+    def _show_object(self, key, level, size=None):
+        """Crea (o actualiza al nivel de detalle dado) el item de un objeto del modelo."""
+        obj = self.model_objects[key]
+        item = self.key_to_item.get(key)
+
+        if isinstance(obj, Stroke):
+            if item is not None:
+                drawn_level, drawn_count = self._item_lod[item]
+                if drawn_level != level:
+                    points = self._lod_points(key, obj, level, size)
+                    # canvas.scale ya ajustó los items dibujados completos
+                    if len(points) != drawn_count or drawn_count != len(obj.points):
+                        self.canvas.coords(item, self._mm_to_canvas_coords(points))
+                    self._item_lod[item] = (level, len(points))
+                return
+            points = self._lod_points(key, obj, level, size)
+            item = self._draw_stroke(obj, points)
+            if item is None:
+                return
+            self.item_to_stroke[item] = obj
+            self._item_lod[item] = (level, len(points))
+        else:
+            if item is not None:
+                return
+            item = self._draw_shape(obj)
+            if item is None:
+                return
+            self.item_to_shape[item] = obj
+
+        self.key_to_item[key] = item
+
+    def _hide_object(self, key):
+        """Elimina el item de canvas de un objeto del modelo, si lo tiene."""
+        item = self.key_to_item.pop(key, None)
+        if item is None:
+            return
+        self.canvas.delete(item)
+        self.item_to_stroke.pop(item, None)
+        self.item_to_shape.pop(item, None)
+        self._item_lod.pop(item, None)
+
+    def _schedule_render(self):
+        """Programa una única actualización de la geometría visible."""
+        if not self._render_pending:
+            self._render_pending = True
+            self.root.after_idle(self._render_view)
+
+    def _render_view(self):
+        """
+        Sincroniza los items de canvas con la geometría visible.
+
+        El modelo completo permanece en memoria, pero sólo los objetos cuyo
+        bounding box toca la vista (más VIEW_PADDING) tienen item, con sus
+        trazos decimados según el zoom. Si hay más de MAX_VISIBLE_ITEMS
+        candidatos se dibujan los más grandes, de modo que el número de items
+        está acotado sin importar el tamaño del archivo.
+
+        Returns:
+            int: Número de items de geometría en el canvas
+        """
+        self._render_pending = False
+
+        x0, y0, x1, y1 = self._visible_area()
+        pad_x = (x1 - x0) * self.VIEW_PADDING
+        pad_y = (y1 - y0) * self.VIEW_PADDING
+        min_x, max_y = self._canvas_to_mm(x0 - pad_x, y0 - pad_y)
+        max_x, min_y = self._canvas_to_mm(x1 + pad_x, y1 + pad_y)
+
+        keys, sizes = self.view_bounds.query(min_x, min_y, max_x, max_y)
+        if len(keys) > self.MAX_VISIBLE_ITEMS:
+            largest = np.argsort(-sizes, kind="stable")[:self.MAX_VISIBLE_ITEMS]
+            largest = np.sort(largest)
+            keys = [keys[i] for i in largest.tolist()]
+            sizes = sizes[largest]
+
+        visible = set(keys)
+        for key in [key for key in self.key_to_item if key not in visible]:
+            self._hide_object(key)
+
+        level = self._lod_level()
+        for key, size in zip(keys, sizes.tolist()):
+            self._show_object(key, level, size)
+
+        self.canvas.tag_lower("guide")
+        return len(self.key_to_item)
+
+    def _shape_outline(self, shape_data):
+        """Contorno de una forma como polilínea (ver modelo.shape_outline)."""
+        return shape_outline(shape_data)
+
+    def _erase_at(self, x, y, radius):
+        """
+        Borra la geometría que cae dentro del círculo del borrador.
+
+        Consulta el índice espacial, recorta sólo los segmentos alcanzados y
+        divide los trazos en piezas cuando es necesario, actualizando a la vez
+        self.strokes, self.shapes y el canvas. Las formas recortadas se
+        convierten en líneas (rectángulo, triángulo) o en trazos (círculo).
+        Las piezas ocupan el lugar del original, así que el orden del dibujo
+        (el de la pluma al exportar) se conserva. La posición de cada objeto
+        alcanzado sale de self._positions sin recorrer las listas (ver
+        _position).
+
+        Args:
+            x, y: Centro del borrador en mm del modelo
+            radius: Radio del borrador en mm
+        """
+        for key, segments in self.spatial_index.query(x, y, radius).items():
+            obj = self.model_objects[key]
+            if isinstance(obj, Stroke):
+                pieces = cut_polyline(obj.points, segments, x, y, radius)
+                if pieces is None:
+                    continue
+                index = self._position(self.strokes, obj)
+                self._unregister(key)
+                new_strokes = [obj.copy_with(piece) for piece in pieces]
+                self._splice(self.strokes, STROKES, index, (obj,), new_strokes)
+                for new_stroke in new_strokes:
+                    self._register_stroke(new_stroke, draw=True)
+                continue
+
+            shape = obj
+            pieces = cut_polyline(self._shape_outline(shape), segments, x, y, radius)
+            if pieces is None:
+                continue
+            index = self._position(self.shapes, shape)
+            self._unregister(key)
+
+            if shape["type"] == "circle":
+                # El contorno recortado de un círculo se conserva como trazo
+                new_shapes = []
+                new_strokes = [Stroke(piece, shape["color"], shape["width"]) for piece in pieces]
+            else:
+                # Los lados restantes de formas rectas se conservan como líneas
+                new_strokes = []
+                new_shapes = [
+                    {"type": "line", "start": tuple(start), "end": tuple(end),
+                     "color": shape["color"], "width": shape["width"]}
+                    for piece in pieces
+                    for start, end in zip(piece.tolist(), piece.tolist()[1:])
+                ]
+
+            self._splice(self.shapes, SHAPES, index, (shape,), new_shapes)
+            for new_shape in new_shapes:
+                self._register_shape(new_shape, draw=True)
+            self._splice(self.strokes, STROKES, len(self.strokes), (), new_strokes)
+            for new_stroke in new_strokes:
+                self._register_stroke(new_stroke, draw=True)
+
+    def _position(self, items, obj):
+        """
+        Posición de obj en items (self.strokes o self.shapes) sin recorrer la lista.
+
+        Si la posición guardada falta o quedó vieja, se recalculan de una vez
+        las de ambas listas.
+
+        Raises:
+            ValueError: Si obj no está en items
+        """
+        index = self._stored_position(items, obj)
+        if index is None:
+            self._reindex_positions()
+            index = self._stored_position(items, obj)
+            if index is None:
+                raise ValueError("Elemento no encontrado en el modelo")
+        return index
+
+    def _stored_position(self, items, obj):
+        """
+        Posición guardada de obj, corrida por los empalmes anotados después.
+
+        Returns:
+            int: Posición de obj en items, o None si no está ahí
+        """
+        entry = self._positions.get(id(obj))
+        if entry is None:
+            return None
+        index, counted = entry
+        target = STROKES if items is self.strokes else SHAPES
+        for shift_target, start, delta in self._position_shifts[counted:]:
+            if shift_target == target and index >= start:
+                index += delta
+        if index < len(items) and items[index] is obj:
+            return index
+        return None
+
+    def _set_position(self, obj, index):
+        """Guarda la posición actual de obj en su lista."""
+        self._positions[id(obj)] = (index, len(self._position_shifts))
+
+    def _shift_positions(self, target, index, removed, inserted):
+        """Anota que un empalme corrió los elementos posteriores a él."""
+        delta = inserted - removed
+        if delta:
+            self._position_shifts.append((target, index + removed, delta))
+
+    def _reindex_positions(self, limit=0):
+        """
+        Recalcula las posiciones de todos los trazos y formas.
+
+        Args:
+            limit: Hacerlo sólo si hay al menos tantos empalmes anotados (con
+                POSITION_SHIFTS_LIMIT, para que consultarlas siga costando poco)
+        """
+        if len(self._position_shifts) < limit:
+            return
+        self._position_shifts = []
+        self._positions = {}
+        for items in (self.strokes, self.shapes):
+            self._positions.update((id(item), (i, 0)) for i, item in enumerate(items))
+
+    def _in_model(self, obj):
+        """True si obj está en self.strokes o self.shapes en su posición guardada."""
+        items = self.strokes if isinstance(obj, Stroke) else self.shapes
+        return self._stored_position(items, obj) is not None
+
+    def _splice(self, items, target, index, removed, inserted):
+        """
+        Reemplaza items[index:index + len(removed)] por inserted.
+
+        Actualiza las posiciones de los objetos insertados y de los que
+        quedan detrás, y anota el cambio en el historial y en el diario de
+        la sesión; no toca el canvas.
+        """
+        if not removed and not inserted:
+            return
+        items[index:index + len(removed)] = inserted
+        self._shift_positions(target, index, len(removed), len(inserted))
+        for offset, item in enumerate(inserted):
+            self._set_position(item, index + offset)
+        self._reindex_positions(self.POSITION_SHIFTS_LIMIT)
+        self._history.record(target, index, removed, inserted)
+        self._journal.splice(target == SHAPES, index, len(removed), inserted)
+        self._schedule_journal_sync()
+
     def _draw_shape_preview(self, start, end):
-        """Dibuja una vista previa de la forma durante el arrastre."""
-        x1, y1 = start
-        x2, y2 = end
+        """Dibuja una vista previa de la forma durante el arrastre (start y end en mm)."""
+        x1, y1 = self._mm_to_canvas(*start)
+        x2, y2 = self._mm_to_canvas(*end)
 
         if self.current_tool == "line":
             return self.canvas.create_line(x1, y1, x2, y2,
@@ -499,36 +1350,145 @@ class EditorTrazos:
         return None
 
     def _draw_shape(self, shape_data):
-        """Dibuja una forma en el canvas."""
+        """
+        Dibuja una forma en el canvas.
+
+        Returns:
+            int: Id del item de canvas, o None si el tipo no es conocido
+        """
         shape_type = shape_data["type"]
         start = shape_data["start"]
         end = shape_data["end"]
         color = shape_data["color"]
         width = shape_data["width"]
 
-        x1, y1 = start
-        x2, y2 = end
+        # Las formas se guardan en mm; se dibujan con la escala de la vista
+        x1, y1 = self._mm_to_canvas(*start)
+        x2, y2 = self._mm_to_canvas(*end)
 
         if shape_type == "line":
-            self.canvas.create_line(x1, y1, x2, y2, fill=color, width=width)
+            item = self.canvas.create_line(x1, y1, x2, y2, fill=color, width=width)
         elif shape_type == "circle":
             radius = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
-            self.canvas.create_oval(x1 - radius, y1 - radius,
-                                   x1 + radius, y1 + radius,
-                                   outline=color, width=width)
+            item = self.canvas.create_oval(x1 - radius, y1 - radius,
+                                          x1 + radius, y1 + radius,
+                                          outline=color, width=width)
         elif shape_type == "rectangle":
-            self.canvas.create_rectangle(x1, y1, x2, y2, outline=color, width=width)
+            item = self.canvas.create_rectangle(x1, y1, x2, y2, outline=color, width=width)
         elif shape_type == "triangle":
             mid_x = (x1 + x2) / 2
             points = [mid_x, y1, x1, y2, x2, y2]
-            self.canvas.create_polygon(points, outline=color, fill="", width=width)
+            item = self.canvas.create_polygon(points, outline=color, fill="", width=width)
+        else:
+            return None
+
+        return item
 
-    def _save_json(self):
-        """Guarda los trazos y formas en un archivo JSON."""
+    def _save_project(self):
+        """
+        Guarda el dibujo como proyecto binario (ver proyecto.py).
+
+        Si se elige un nombre .json se exporta en el formato JSON del editor.
+        """
         filename = filedialog.asksaveasfilename(
-            defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.")]
+            defaultextension=PROJECT_SUFFIX,
+            filetypes=[("Proyecto del editor", "*" + PROJECT_SUFFIX),
+                       ("JSON files", "*.json"), ("All files", "*.")]
         )
+        if not filename:
+            return
+        if filename.lower().endswith(".json"):
+            self._save_json(filename)
+            return
+
+        try:
+            width_cm = float(self.canvas_width_var.get())
+            height_cm = float(self.canvas_height_var.get())
+        except ValueError as e:
+            messagebox.showerror("Error", f"Valores de tamaño de canvas inválidos: {str(e)}")
+            return
+
+        try:
+            t0 = time.perf_counter()
+            size = save_project(filename, self.strokes, self.shapes, (width_cm, height_cm))
+            messagebox.showinfo("Éxito", f"Proyecto guardado correctamente "
+                                         f"({size / 1e6:.1f} MB en {time.perf_counter() - t0:.2f} s).")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            messagebox.showerror("Error", f"Error al guardar el proyecto: {str(e)}")
+
+    def _load_project(self):
+        """
+        Abre un proyecto binario (ver proyecto.py) o un dibujo JSON.
+
+        El proyecto se mapea en memoria: los puntos de los trazos se usan
+        directamente desde el archivo, sin convertir texto.
+        """
+        filename = filedialog.askopenfilename(
+            filetypes=[("Proyecto del editor", "*" + PROJECT_SUFFIX),
+                       ("JSON files", "*.json"), ("All files", "*.")]
+        )
+        if not filename:
+            return
+        if filename.lower().endswith(".json"):
+            self._load_json(filename)
+            return
+
+        try:
+            strokes, shapes, canvas_size = load_project(filename)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            messagebox.showerror("Error", f"Error al abrir el proyecto: {str(e)}")
+            return
+
+        if self._show_drawing(strokes, shapes, canvas_size):
+            messagebox.showinfo("Éxito", "Proyecto abierto correctamente.")
+
+    def _show_drawing(self, strokes, shapes, canvas_size, confirm=True):
+        """
+        Reemplaza el dibujo actual por uno ya leído y validado.
+
+        El dibujo nuevo pasa a ser la instantánea del diario de la sesión.
+
+        Returns:
+            bool: True si se reemplazó, False si el usuario no confirmó
+            limpiar el dibujo actual (que queda intacto)
+        """
+        # Limpiar canvas actual
+        if not self._clear_canvas(confirm):
+            return False
+
+        # Restaurar tamaño del canvas
+        if canvas_size is not None:
+            width_cm, height_cm = canvas_size
+            self.canvas_width_var.set(str(width_cm))
+            self.canvas_height_var.set(str(height_cm))
+            self._update_canvas_size()
+
+        # Registrar trazos y formas (se dibujan si caen en la vista)
+        self.strokes = strokes
+        for stroke_data in strokes:
+            self._register_stroke(stroke_data)
+
+        self.shapes = shapes
+        for shape in shapes:
+            self._register_shape(shape)
+
+        # Otro dibujo: no se puede deshacer hacia el anterior
+        self._history.clear()
+        self._compact_journal()
+        return True
+
+    def _save_json(self, filename=None):
+        """
+        Guarda los trazos y formas en un archivo JSON.
+
+        Args:
+            filename: Ruta del archivo, o None para preguntarla
+        """
+        if filename is None:
+            filename = filedialog.asksaveasfilename(
+                defaultextension=".json",
+                filetypes=[("JSON files", "*.json"), ("All files", "*.")]
+            )
 
         if filename:
             try:
@@ -536,14 +1496,7 @@ class EditorTrazos:
                 width_cm = float(self.canvas_width_var.get())
                 height_cm = float(self.canvas_height_var.get())
 
-                data = {
-                    "canvas_size": {
-                        "width_cm": width_cm,
-                        "height_cm": height_cm
-                    },
-                    "strokes": self.strokes,
-                    "shapes": self.shapes
-                }
+                data = drawing_to_dict(self.strokes, self.shapes, (width_cm, height_cm))
 
                 with open(filename, 'w', encoding='utf-8') as f:
                     json.dump(data, f, indent=2, ensure_ascii=False)
@@ -555,69 +1508,27 @@ class EditorTrazos:
             except (TypeError, ValueError) as e:
                 messagebox.showerror("Error", f"Error al serializar datos: {str(e)}")
 
-    def _load_json(self):
-        """Carga trazos y formas desde un archivo JSON."""
-        filename = filedialog.askopenfilename(
-            filetypes=[("JSON files", "*.json"), ("All files", "*.")]
-        )
+    def _load_json(self, filename=None):
+        """
+        Carga trazos y formas desde un archivo JSON.
+
+        Args:
+            filename: Ruta del archivo, o None para preguntarla
+        """
+        if filename is None:
+            filename = filedialog.askopenfilename(
+                filetypes=[("JSON files", "*.json"), ("All files", "*.")]
+            )
 
         if filename:
             try:
                 with open(filename, 'r', encoding='utf-8') as f:
                     data = json.load(f)
 
-                # Validar estructura básica del JSON
-                if not isinstance(data, dict):
-                    raise ValueError("El archivo JSON debe contener un objeto")
-
-                # Limpiar canvas actual
-                self._clear_canvas()
-
-                # Restaurar tamaño del canvas
-                if "canvas_size" in data and isinstance(data["canvas_size"], dict):
-                    canvas_size = data["canvas_size"]
-                    if "width_cm" in canvas_size and "height_cm" in canvas_size:
-                        self.canvas_width_var.set(str(canvas_size["width_cm" ]))
-                        self.canvas_height_var.set(str(canvas_size["height_cm" ]))
-                        self._update_canvas_size()
-
-                # Cargar trazos con validación
-                self.strokes = []
-                for stroke in data.get("strokes", []):
-                    if not isinstance(stroke, dict):
-                        continue
-                    if not all(key in stroke for key in ["points", "color", "width"]):
-                        continue
-
-                    # Validar y agregar el trazo
-                    self.strokes.append(stroke)
-
-                    # Dibujar trazo en el canvas
-                    points = stroke["points"]
-                    color = stroke["color"]
-                    width = stroke["width"]
-
-                    for i in range(len(points) - 1):
-                        x1, y1 = points[i]
-                        x2, y2 = points[i + 1]
-                        self.canvas.create_line(x1, y1, x2, y2,
-                                              fill=color,
-                                              width=width,
-                                              capstyle=tk.ROUND,
-                                              smooth=True)
-
-                # Cargar formas con validación
-                self.shapes = []
-                for shape in data.get("shapes", []):
-                    if not isinstance(shape, dict):
-                        continue
-                    if not all(key in shape for key in ["type", "start", "end", "color", "width"]):
-                        continue
-
-                    self.shapes.append(shape)
-                    self._draw_shape(shape)
-
-                messagebox.showinfo("Éxito", "Archivo cargado correctamente.")
+                # Validar todo el archivo antes de tocar el dibujo actual
+                strokes, shapes, canvas_size = drawing_from_dict(data, self.PIXELS_PER_MM)
+                if self._show_drawing(strokes, shapes, canvas_size):
+                    messagebox.showinfo("Éxito", "Archivo cargado correctamente.")
             except (IOError, PermissionError) as e:
                 messagebox.showerror("Error", f"Error al leer archivo: {str(e)}")
             except json.JSONDecodeError as e:
@@ -626,341 +1537,888 @@ class EditorTrazos:
                 messagebox.showerror("Error", f"Formato de archivo inválido: {str(e)}")
 
     def _save_dxf(self):
-        """Guarda los trazos y formas en un archivo DXF compatible con CNC."""
+        """
+        Guarda los trazos y formas en un archivo DXF compatible con CNC.
+
+        La escritura corre en un hilo de trabajo (_export_dxf_worker) sobre
+        una copia de las listas de trazos y formas; la UI sólo sondea su cola
+        de mensajes para el progreso y el resultado. Con "Exportación rápida"
+        las entidades se escriben en flujo con r12writer en lugar de armar un
+        documento ezdxf completo en memoria. Con "Optimizar recorrido" los
+        trazos se reordenan (y se invierten si conviene) para acortar los
+        desplazamientos con la herramienta levantada. Con "Ajustar arcos"
+        los puntos de cada trazo se reemplazan por rectas y arcos (bulges)
+        dentro de FIT_TOLERANCE: archivos más chicos y movimientos más suaves.
+        """
+        if self._file_job_running():
+            messagebox.showwarning("Advertencia", "Ya hay una operación de archivo en curso.")
+            return
+
         filename = filedialog.asksaveasfilename(
             defaultextension=".dxf",
             filetypes=[("DXF files", "*.dxf"), ("All files", "*.")]
         )
 
         if filename:
+            self._export_queue = queue.Queue()
+            self._export_cancel = threading.Event()
+            self._export_report = None
+
+            self.file_progress["value"] = 0
+            self.file_status.set("Exportando DXF...")
+            self.file_cancel_btn.config(state=tk.NORMAL)
+
+            # Copias de las listas: el borrador reemplaza trazos y formas
+            # (no los modifica), así que el hilo ve un dibujo consistente
+            worker = threading.Thread(target=self._export_dxf_worker,
+                                      args=(filename, list(self.strokes), list(self.shapes),
+                                            self._get_simplify_tolerance(),
+                                            self.stream_export.get(),
+                                            self.optimize_order.get(),
+                                            self.FIT_TOLERANCE if self.fit_arcs.get() else None,
+                                            self._export_queue, self._export_cancel),
+                                      daemon=True)
+            worker.start()
+            self.root.after(self.FILE_POLL_MS, self._poll_export)
+
+    def _export_order(self, strokes_mm, shapes):
+        """
+        Calcula el orden de escritura que acorta los trayectos sin dibujar.
+
+        Returns:
+            tuple: (order, before, after, elapsed) como trabajo.drawing_order
+        """
+        return drawing_order(strokes_mm, shapes, self.ORDER_TIME_BUDGET)
+
+    def _export_dxf_worker(self, filename, strokes, shapes, tolerance, stream, optimize,
+                           fit_tolerance, results, cancel):
+        """
+        Exporta un DXF fuera del hilo de la UI.
+
+        No toca Tkinter: publica en results ("progress", porcentaje, texto),
+        ("simplified", puntos eliminados, segundos), ("ordered", distancia
+        antes, distancia después, segundos), ("fitted", puntos, vértices,
+        arcos, segundos) y finalmente ("done", mensaje),
+        ("cancelled",) o ("error", texto). Si no termina, borra el archivo
+        a medio escribir.
+
+        Args:
+            filename: Ruta del archivo DXF
+            strokes, shapes: Copias de las listas del editor
+            tolerance: Tolerancia de simplificación en mm, o None
+            stream: Escribir en flujo (R12) en lugar de armar el documento
+            optimize: Reordenar los trazos para acortar los trayectos sin dibujar
+            fit_tolerance: Tolerancia del ajuste con rectas y arcos en mm, o None
+            results: queue.Queue donde se publican los mensajes
+            cancel: threading.Event que solicita cancelar
+        """
+        partial = False  # El archivo quedó a medio escribir
+        try:
+            # El modelo ya está en mm (Y hacia arriba): no depende del zoom de la vista
+            brush_strokes = [stroke for stroke in strokes if stroke.type == 'brush']
+            strokes_mm = [stroke.points for stroke in brush_strokes]
+
+            # Simplificar antes de exportar (no modifica el dibujo)
+            if tolerance is not None:
+                simplified, removed, elapsed = simplify_polylines(strokes_mm, tolerance)
+                strokes_mm = simplified
+                results.put(("simplified", removed, elapsed))
+
+            order = None
+            if optimize:
+                results.put(("progress", 0, "Optimizando recorrido..."))
+                order, before, after, elapsed = self._export_order(strokes_mm, shapes)
+                results.put(("ordered", before, after, elapsed))
+                if cancel.is_set():
+                    raise OperationCancelled()
+
+            # Después de ordenar: el ajuste conserva los extremos de cada trazo
+            if fit_tolerance is not None:
+                results.put(("progress", 0, "Ajustando arcos..."))
+                strokes_mm, points, arcs, elapsed = fit_polylines(strokes_mm, fit_tolerance)
+                vertices = sum(len(vertices) for vertices in strokes_mm)
+                results.put(("fitted", points, vertices, arcs, elapsed))
+                if cancel.is_set():
+                    raise OperationCancelled()
+
+            total = len(brush_strokes) + len(shapes)
+
+            def tracked(entities):
+                for done, entity in enumerate(entities):
+                    if done % self.EXPORT_BATCH_SIZE == 0:
+                        if cancel.is_set():
+                            raise OperationCancelled()
+                        results.put(("progress", 100 * done / max(total, 1),
+                                     f"Exportando entidades: {done}/{total}"))
+                    yield entity
+
+            entities = tracked(dxf_export_entities(brush_strokes, strokes_mm, shapes, order))
+            partial = True
+            if stream:
+                write_dxf_stream(filename, entities)
+            else:
+                write_dxf_document(filename, entities)
+            partial = False
+
+            results.put(("done", "Archivo DXF guardado correctamente para CNC."))
+
+        except OperationCancelled:
+            results.put(("cancelled",))
+        except Exception as e:
+            results.put(("error", str(e)))
+        finally:
+            if partial and os.path.exists(filename):
+                os.remove(filename)
+
+    def _export_gcode(self):
+        """
+        Exporta el dibujo como G-code para el robot.
+
+        Usa la cadena de generadores de trabajo.py en un hilo de trabajo
+        (_export_gcode_worker): el texto se escribe a medida que se genera,
+        con memoria constante. Respeta "Optimizar recorrido" y la
+        simplificación, igual que la exportación DXF. El origen del G-code
+        es la esquina inferior izquierda del lienzo (ver trabajo.job_chunks).
+        """
+        if self._file_job_running():
+            messagebox.showwarning("Advertencia", "Ya hay una operación de archivo en curso.")
+            return
+
+        filename = filedialog.asksaveasfilename(
+            defaultextension=".gcode",
+            filetypes=[("G-code files", "*.gcode *.nc"), ("All files", "*.")]
+        )
+
+        if filename:
+            self._export_queue = queue.Queue()
+            self._export_cancel = threading.Event()
+            self._export_report = None
+
+            self.file_progress["value"] = 0
+            self.file_status.set("Exportando G-code...")
+            self.file_cancel_btn.config(state=tk.NORMAL)
+
+            worker = threading.Thread(target=self._export_gcode_worker,
+                                      args=(filename, list(self.strokes), list(self.shapes),
+                                            (self.canvas_width_cm, self.canvas_height_cm),
+                                            self._get_simplify_tolerance(),
+                                            self.optimize_order.get(),
+                                            self._export_queue, self._export_cancel),
+                                      daemon=True)
+            worker.start()
+            self.root.after(self.FILE_POLL_MS, self._poll_export)
+
+    def _export_gcode_worker(self, filename, strokes, shapes, canvas_size, tolerance, optimize,
+                             results, cancel):
+        """
+        Escribe el G-code fuera del hilo de la UI.
+
+        Publica los mismos mensajes que _export_dxf_worker (salvo
+        "simplified": la simplificación ocurre dentro de la cadena).
+
+        Args:
+            filename: Ruta del archivo G-code
+            strokes, shapes: Copias de las listas del editor
+            canvas_size: (ancho_cm, alto_cm) del lienzo, para el origen del G-code
+            tolerance: Tolerancia de simplificación en mm, o None
+            optimize: Reordenar los trazos para acortar los trayectos sin dibujar
+            results: queue.Queue donde se publican los mensajes
+            cancel: threading.Event que solicita cancelar
+        """
+        partial = False  # El archivo quedó a medio escribir
+        try:
+            paths = self._job_paths(strokes, shapes, optimize, results, cancel)
+
+            partial = True
+            write_job(job_chunks(paths, "gcode", tolerance=tolerance, canvas_size=canvas_size),
+                      filename)
+            partial = False
+
+            results.put(("done", "Archivo G-code guardado correctamente."))
+
+        except OperationCancelled:
+            results.put(("cancelled",))
+        except Exception as e:
+            results.put(("error", str(e)))
+        finally:
+            if partial and os.path.exists(filename):
+                os.remove(filename)
+
+    def _job_paths(self, strokes, shapes, optimize, results, cancel, label="Exportando trazos"):
+        """
+        Prepara las polilíneas de un trabajo para la cadena de trabajo.py.
+
+        Se ejecuta en el hilo de trabajo: optimiza el orden si se pidió
+        (publicando "ordered") y devuelve un generador que informa el
+        progreso y atiende la cancelación a medida que se consume.
+
+        Args:
+            strokes, shapes: Copias de las listas del editor
+            optimize: Reordenar los trazos para acortar los trayectos sin dibujar
+            results: queue.Queue donde se publican los mensajes
+            cancel: threading.Event que solicita cancelar
+            label: Texto del progreso
+
+        Returns:
+            generator: Arreglos (n, 2) en mm del modelo
+
+        Raises:
+            OperationCancelled: Al consumir el generador, si se canceló
+        """
+        if optimize:
+            results.put(("progress", 0, "Optimizando recorrido..."))
+            strokes_mm = [stroke.points for stroke in strokes if stroke.type == 'brush']
+            order, before, after, elapsed = self._export_order(strokes_mm, shapes)
+            results.put(("ordered", before, after, elapsed))
+            paths = ordered_paths(strokes_mm, shapes, order)
+        else:
+            paths = drawing_paths(strokes, shapes)
+
+        total = len(strokes) + len(shapes)
+
+        def tracked(paths):
+            for done, points in enumerate(paths):
+                if done % self.EXPORT_BATCH_SIZE == 0:
+                    if cancel.is_set():
+                        raise OperationCancelled()
+                    results.put(("progress", 100 * done / max(total, 1),
+                                 f"{label}: {done}/{total}"))
+                yield points
+
+        return tracked(paths)
+
+    def _send_to_robot(self):
+        """
+        Envía el dibujo como G-code al controlador del robot.
+
+        El envío (envio.py) corre en un bucle asyncio dentro de un hilo de
+        trabajo (_send_worker) y usa la misma cola de mensajes que las
+        exportaciones. Con el puerto vacío se envía a un controlador
+        simulado, para probar sin hardware. Durante el envío el botón
+        "Pausar" retiene y reanuda el movimiento.
+        """
+        if self._file_job_running():
+            messagebox.showwarning("Advertencia", "Ya hay una operación de archivo en curso.")
+            return
+
+        port = simpledialog.askstring(
+            "Enviar al robot", "Puerto serie (vacío: controlador simulado):",
+            initialvalue=self.SEND_PORT, parent=self.root)
+
+        if port is not None:
+            port = port.strip()
+            self._export_queue = queue.Queue()
+            self._export_cancel = threading.Event()
+            self._export_report = None
+            self._sender = ControllerSender(
+                progress=lambda stats, results=self._export_queue: self._send_progress(stats, results))
+
+            self.file_progress["value"] = 0
+            self.file_status.set("Conectando con el robot...")
+            self.file_cancel_btn.config(state=tk.NORMAL)
+            self.file_pause_btn.config(state=tk.NORMAL)
+
+            worker = threading.Thread(target=self._send_worker,
+                                      args=(port, list(self.strokes), list(self.shapes),
+                                            (self.canvas_width_cm, self.canvas_height_cm),
+                                            self._get_simplify_tolerance(),
+                                            self.optimize_order.get(), self._sender,
+                                            self._export_queue, self._export_cancel),
+                                      daemon=True)
+            worker.start()
+            self.root.after(self.FILE_POLL_MS, self._poll_export)
+
+    def _send_worker(self, port, strokes, shapes, canvas_size, tolerance, optimize, sender,
+                     results, cancel):
+        """
+        Genera el G-code y lo envía al controlador fuera del hilo de la UI.
+
+        El G-code se genera a medida que el controlador confirma líneas, sin
+        escribirlo antes a un archivo. Publica los mismos mensajes que
+        _export_gcode_worker; el progreso incluye el caudal del envío.
+
+        Args:
+            port: Ruta del puerto serie, o "" para el controlador simulado
+            strokes, shapes: Copias de las listas del editor
+            canvas_size: (ancho_cm, alto_cm) del lienzo, para el origen del G-code
+            tolerance: Tolerancia de simplificación en mm, o None
+            optimize: Reordenar los trazos para acortar los trayectos sin dibujar
+            sender: ControllerSender del envío
+            results: queue.Queue donde se publican los mensajes
+            cancel: threading.Event que solicita cancelar
+        """
+        simulator = None
+        try:
+            paths = self._job_paths(strokes, shapes, optimize, results, cancel,
+                                    "Enviando trazos")
+            if not port:
+                simulator = SimulatedController()
+                port = simulator.port
+
+            lines = command_lines(job_chunks(paths, "gcode", tolerance=tolerance,
+                                             canvas_size=canvas_size))
+            stats = asyncio.run(send_job(lines, port, sender=sender))
+            if stats.cancelled:
+                raise OperationCancelled()
+
+            message = f"Trabajo enviado al robot.\n{stats.summary()}"
+            if simulator is not None:
+                message += (f"\nControlador simulado: buffer máx. {simulator.max_rx} bytes, "
+                            f"{simulator.overflows} bytes desbordados")
+            results.put(("done", message))
+
+        except OperationCancelled:
+            results.put(("cancelled",))
+        except Exception as e:
+            results.put(("error", str(e)))
+        finally:
+            if simulator is not None:
+                simulator.close()
+
+    def _send_progress(self, stats, results):
+        """Publica las métricas del envío (llamada desde el hilo del envío)."""
+        lines_s, _ = stats.throughput()
+        _, _, p95, _ = stats.latency_ms()
+        results.put(("sending", f"Enviadas {stats.lines} líneas: {lines_s:.0f} líneas/s, "
+                                f"latencia p95 {p95:.0f} ms"))
+
+    def _toggle_send_pause(self):
+        """Retiene o reanuda el envío al robot en curso."""
+        if self._sender is None:
+            return
+        if self._sender.paused:
+            self._sender.resume()
+            self.file_pause_btn.config(text="Pausar")
+        else:
+            self._sender.pause()
+            self.file_pause_btn.config(text="Reanudar")
+            self.file_status.set("Envío en pausa")
+
+    def _poll_export(self):
+        """Procesa los mensajes pendientes de la exportación (DXF o G-code) en curso."""
+        if self._export_queue is None:
+            return
+
+        while True:
             try:
-                # Crear nuevo documento DXF (R2010 es compatible con la mayoría de CNCs)
-                doc = ezdxf.new('R2010', setup=True)
-                msp = doc.modelspace()
-
-                # Configurar unidades en milímetros (estándar para CNC)
-                doc.units = units.MM
-
-                # Crear capas para organización
-                doc.layers.add('STROKES', color=7)  # Blanco
-                doc.layers.add('SHAPES', color=1)   # Rojo
-
-                # Convertir trazos a polylines DXF
-                for stroke in self.strokes:
-                    if stroke['type'] == 'brush':
-                        # Convertir puntos de píxeles a milímetros
-                        points_mm = [(x / self.PIXELS_PER_MM, -y / self.PIXELS_PER_MM)
-                                    for x, y in stroke['points']]
-
-                        if len(points_mm) > 1:
-                            # Crear LWPOLYLINE para trazos
-                            msp.add_lwpolyline(points_mm, dxfattribs={
-                                'layer': 'STROKES',
-                                'color': self._color_to_aci(stroke['color'])
-                            })
-
-                # Convertir formas a entidades DXF
-                for shape in self.shapes:
-                    start_x, start_y = shape['start']
-                    end_x, end_y = shape['end']
-
-                    # Convertir a milímetros (invertir Y)
-                    start_mm = (start_x / self.PIXELS_PER_MM, -start_y / self.PIXELS_PER_MM)
-                    end_mm = (end_x / self.PIXELS_PER_MM, -end_y / self.PIXELS_PER_MM)
-
-                    color_aci = self._color_to_aci(shape['color'])
-
-                    if shape['type'] == 'line':
-                        msp.add_line(start_mm, end_mm, dxfattribs={
-                            'layer': 'SHAPES',
-                            'color': color_aci
-                        })
-
-                    elif shape['type'] == 'circle':
-                        # Calcular radio
-                        radius = math.sqrt((end_x - start_x)**2 + (end_y - start_y)**2) / self.PIXELS_PER_MM
-                        msp.add_circle(start_mm, radius, dxfattribs={
-                            'layer': 'SHAPES',
-                            'color': color_aci
-                        })
-
-                    elif shape['type'] == 'rectangle':
-                        # Crear rectángulo como polyline cerrada
-                        top_left = start_mm
-                        bottom_right = end_mm
-                        points = [
-                            top_left,
-                            (bottom_right[0], top_left[1]),
-                            bottom_right,
-                            (top_left[0], bottom_right[1]),
-                            top_left  # Cerrar
-                        ]
-                        msp.add_lwpolyline(points, close=True, dxfattribs={
-                            'layer': 'SHAPES',
-                            'color': color_aci
-                        })
-
-                    elif shape['type'] == 'triangle':
-                        # Calcular puntos del triángulo
-                        mid_x = (start_x + end_x) / 2
-                        points_mm = [
-                            (mid_x / self.PIXELS_PER_MM, -start_y / self.PIXELS_PER_MM),
-                            (start_x / self.PIXELS_PER_MM, -end_y / self.PIXELS_PER_MM),
-                            (end_x / self.PIXELS_PER_MM, -end_y / self.PIXELS_PER_MM),
-                            (mid_x / self.PIXELS_PER_MM, -start_y / self.PIXELS_PER_MM)  # Cerrar
-                        ]
-                        msp.add_lwpolyline(points_mm, close=True, dxfattribs={
-                            'layer': 'SHAPES',
-                            'color': color_aci
-                        })
-
-                # Guardar archivo DXF
-                doc.saveas(filename)
-                messagebox.showinfo("Éxito", "Archivo DXF guardado correctamente para CNC.")
-
-            except Exception as e:
-                messagebox.showerror("Error", f"Error al guardar archivo DXF: {str(e)}")
-
-    def _get_unit_scale_to_mm(self, doc):
-        """Convierte las unidades del DXF a milímetros."""
-        insunits = doc.header.get("$INSUNITS", doc.units)
-        unit_map = {
-            units.MM: 1.0,
-            units.CM: 10.0,
-            units.M: 1000.0,
-            units.IN: 25.4,
-            units.FT: 304.8,
-            0: 1.0,  # Unitless
-        }
-        return unit_map.get(insunits, 1.0)
-
-    def _iter_entity_points_mm(self, entity, unit_scale):
-        """Devuelve puntos (x,y) en mm para calcular bbox y dibujar curvas."""
-        points = []
-        dtype = entity.dxftype()
-
-        if dtype == "LWPOLYLINE":
-            for point in entity.get_points("xy"):
-                points.append((point[0] * unit_scale, point[1] * unit_scale))
-
-        elif dtype == "POLYLINE":
-            for vertex in entity.vertices:
-                loc = vertex.dxf.location
-                points.append((loc[0] * unit_scale, loc[1] * unit_scale))
-
-        elif dtype == "LINE":
-            start = entity.dxf.start
-            end = entity.dxf.end
-            points.append((start[0] * unit_scale, start[1] * unit_scale))
-            points.append((end[0] * unit_scale, end[1] * unit_scale))
-
-        elif dtype == "CIRCLE":
-            center = entity.dxf.center
-            radius = entity.dxf.radius * unit_scale
-            cx = center[0] * unit_scale
-            cy = center[1] * unit_scale
-            points.extend([
-                (cx - radius, cy - radius),
-                (cx + radius, cy + radius),
-                (cx - radius, cy + radius),
-                (cx + radius, cy - radius),
-            ])
-
-        elif dtype == "ARC":
-            center = entity.dxf.center
-            radius = entity.dxf.radius * unit_scale
-            start_angle = math.radians(entity.dxf.start_angle)
-            end_angle = math.radians(entity.dxf.end_angle)
-            if end_angle < start_angle:
-                end_angle += 2 * math.pi
-            for i in range(self.ARC_SEGMENTS + 1):
-                angle = start_angle + (end_angle - start_angle) * i / self.ARC_SEGMENTS
-                x = (center[0] * unit_scale) + radius * math.cos(angle)
-                y = (center[1] * unit_scale) + radius * math.sin(angle)
-                points.append((x, y))
-
-        elif dtype in ("SPLINE", "ELLIPSE"):
-            try:
-                for point in entity.flattening(distance=self.FLATTENING_DISTANCE):
-                    points.append((point.x * unit_scale, point.y * unit_scale))
-            except Exception:
-                pass
+                message = self._export_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            kind = message[0]
+            if kind == "progress":
+                _, percent, text = message
+                self.file_progress["value"] = percent
+                self.file_status.set(text)
+
+            elif kind == "simplified":
+                _, removed, elapsed = message
+                self._export_report = self._report_simplification("Exportación", removed, elapsed)
+
+            elif kind == "ordered":
+                _, before, after, elapsed = message
+                report = (f"Recorrido sin dibujar: {before:.0f} mm → {after:.0f} mm "
+                          f"({elapsed:.2f} s)")
+                self.file_status.set(report)
+                self._export_report = "\n".join(filter(None, (self._export_report, report)))
+
+            elif kind == "fitted":
+                _, points, vertices, arcs, elapsed = message
+                report = (f"Ajuste de arcos: {points} puntos → {vertices} vértices "
+                          f"({arcs} arcos, {elapsed:.2f} s)")
+                self.file_status.set(report)
+                self._export_report = "\n".join(filter(None, (self._export_report, report)))
+
+            elif kind == "sending":
+                if not self._sender.paused:
+                    self.file_status.set(message[1])
 
-        return points
+            else:
+                self._finish_export(message)
+                return
+
+        self.root.after(self.FILE_POLL_MS, self._poll_export)
+
+    def _finish_export(self, message):
+        """Cierra la exportación o el envío en curso y muestra su resultado."""
+        sending = self._sender is not None
+        self._export_queue = None
+        self._export_cancel = None
+        self._sender = None
+        self._reset_file_progress()
+
+        kind = message[0]
+        if kind == "done":
+            _, message = message
+            if self._export_report:
+                message += f"\n{self._export_report}"
+            messagebox.showinfo("Éxito", message)
+
+        elif kind == "cancelled" and sending:
+            messagebox.showinfo("Envío cancelado", "Se detuvo el robot y se canceló el envío.")
+
+        elif kind == "cancelled":
+            messagebox.showinfo("Exportación cancelada", "Se canceló la exportación del archivo.")
+
+        elif sending:
+            messagebox.showerror("Error", f"Error al enviar al robot: {message[1]}")
 
-    def _to_canvas(self, x_mm, y_mm, min_x, max_y, margin_x, margin_y):
-        """Convierte coordenadas en mm a coordenadas de canvas (px)."""
-        x_px = (x_mm - min_x + margin_x) * self.PIXELS_PER_MM
-        y_px = (max_y - y_mm + margin_y) * self.PIXELS_PER_MM
-        return x_px, y_px
+        else:
+            messagebox.showerror("Error", f"Error al guardar archivo: {message[1]}")
+
+    def _file_job_running(self):
+        """Indica si hay una importación o exportación DXF en curso."""
+        return self._import_queue is not None or self._export_queue is not None
+
+    def _reset_file_progress(self):
+        """Deja la barra de progreso de archivos en reposo."""
+        self.file_cancel_btn.config(state=tk.DISABLED)
+        self.file_pause_btn.config(state=tk.DISABLED, text="Pausar")
+        self.file_progress["value"] = 0
+        self.file_status.set("")
 
     def _load_dxf(self):
-        """Carga trazos y formas desde un archivo DXF."""
+        """
+        Carga trazos y formas desde un archivo DXF.
+
+        La lectura, el aplanado y la conversión al modelo corren en un hilo
+        de trabajo (_import_dxf_worker) que envía mensajes por una cola; la
+        UI la vacía con root.after (_poll_dxf_import), actualiza la barra de
+        progreso y registra la geometría por lotes, así que la ventana sigue
+        respondiendo y el dibujo aparece mientras se importa.
+        """
+        if self._file_job_running():
+            messagebox.showwarning("Advertencia", "Ya hay una operación de archivo en curso.")
+            return
+
         filename = filedialog.askopenfilename(
             filetypes=[("DXF files", "*.dxf"), ("All files", "*.")]
         )
 
         if filename:
+            self._import_queue = queue.Queue()
+            self._import_cancel = threading.Event()
+            self._import_previous = None
+            self._import_report = None
+            self._import_pending.clear()
+
+            self.file_progress["value"] = 0
+            self.file_status.set("Leyendo archivo DXF...")
+            self.file_cancel_btn.config(state=tk.NORMAL)
+
+            # Las variables de Tk sólo se leen desde el hilo de la UI
+            tolerance = self._get_simplify_tolerance()
+            chain_tolerance = CHAIN_TOLERANCE if self.chain_import.get() else None
+            worker = threading.Thread(target=self._import_dxf_worker,
+                                      args=(filename, tolerance, chain_tolerance,
+                                            self._import_queue, self._import_cancel),
+                                      daemon=True)
+
+            # Un documento ezdxf grande son millones de objetos: las pasadas
+            # completas del recolector de ciclos congelarían la UI durante la
+            # importación, así que se pausa hasta _finish_dxf_import (que
+            # también cierra una importación que no llegó a empezar)
+            gc.disable()
             try:
-                doc = ezdxf.readfile(filename)
-                msp = doc.modelspace()
-
-                unit_scale = self._get_unit_scale_to_mm(doc)
-
-                # 1) Bounding box robusto
-                min_x = min_y = float("inf")
-                max_x = max_y = float("-inf")
-
-                for entity in msp:
-                    for x, y in self._iter_entity_points_mm(entity, unit_scale):
-                        min_x = min(min_x, x)
-                        max_x = max(max_x, x)
-                        min_y = min(min_y, y)
-                        max_y = max(max_y, y)
-
-                # Fallback a EXTMIN/EXTMAX si no hubo puntos válidos
-                if min_x == float("inf"):
-                    extmin = doc.header.get("$EXTMIN")
-                    extmax = doc.header.get("$EXTMAX")
-                    if extmin and extmax:
-                        min_x = extmin.x * unit_scale
-                        min_y = extmin.y * unit_scale
-                        max_x = extmax.x * unit_scale
-                        max_y = extmax.y * unit_scale
-                    else:
-                        messagebox.showwarning("Advertencia", "El archivo DXF está vacío o no contiene entidades válidas.")
-                        return
-
-                # 2) Ajuste de canvas con margen
-                MARGIN_PERCENT = 0.1
-                width_mm = max_x - min_x
-                height_mm = max_y - min_y
-                margin_x = width_mm * MARGIN_PERCENT
-                margin_y = height_mm * MARGIN_PERCENT
-
-                new_width_cm = (width_mm + 2 * margin_x) / 10
-                new_height_cm = (height_mm + 2 * margin_y) / 10
-
-                self.canvas_width_var.set(str(int(new_width_cm)))
-                self.canvas_height_var.set(str(int(new_height_cm)))
+                worker.start()
+            except RuntimeError as e:
+                self._finish_dxf_import(("error", str(e)))
+                return
+            self.root.after(self.FILE_POLL_MS, self._poll_dxf_import)
+
+    def _import_dxf_worker(self, filename, tolerance, chain_tolerance, results, cancel):
+        """
+        Lee y aplana un DXF fuera del hilo de la UI.
+
+        No toca Tkinter: todo se comunica con mensajes en results.
+            ("progress", porcentaje, texto)
+            ("cached", acierto, resumen de la cache, segundos de lectura)
+            ("chained", piezas, trazos, cerrados, segundos)
+            ("simplified", puntos eliminados, segundos)
+            ("bounds", ancho_cm, alto_cm)
+            ("batch", trazos, formas, porcentaje)
+            ("done",), ("empty",), ("cancelled",) o ("error", texto)
+
+        Args:
+            filename: Ruta del archivo DXF
+            tolerance: Tolerancia de simplificación en mm, o None
+            chain_tolerance: Tolerancia para unir piezas contiguas en mm, o None
+            results: queue.Queue donde se publican los mensajes
+            cancel: threading.Event que solicita cancelar
+        """
+        try:
+            # 1) Aplanado en una sola pasada (cache en mm + bounding box), 0-50 %
+            def report_progress(done, total):
+                if cancel.is_set():
+                    raise OperationCancelled()
+                results.put(("progress", 50 * done / max(total, 1),
+                             f"Aplanando entidades: {done}/{total}"))
+
+            # Sin puntos válidos, el bbox sale de EXTMIN/EXTMAX (ver read_dxf).
+            # Un archivo ya abierto sale de la cache en disco, sin ezdxf
+            cache = self._import_cache
+            hits = cache.hits
+            t0 = time.perf_counter()
+            geometry, bbox = read_dxf(filename, report_progress, cache)
+            results.put(("cached", cache.hits > hits, cache.summary(),
+                         time.perf_counter() - t0))
+            if bbox is None:
+                results.put(("empty",))
+                return
+
+            # Unir piezas contiguas antes de simplificar, para que la
+            # simplificación también actúe sobre las uniones
+            if chain_tolerance is not None:
+                results.put(("progress", 50, "Uniendo trazos contiguos..."))
+                t0 = time.perf_counter()
+                geometry, pieces, chains, closed = chain_dxf_geometry(geometry, chain_tolerance)
+                results.put(("chained", pieces, chains, closed, time.perf_counter() - t0))
+                if cancel.is_set():
+                    raise OperationCancelled()
+
+            # Simplificar las curvas aplanadas (en mm)
+            if tolerance is not None:
+                removed, elapsed = simplify_dxf_geometry(geometry, tolerance)
+                results.put(("simplified", removed, elapsed))
+
+            # 2) Ajuste de canvas con margen
+            frame, (new_width_cm, new_height_cm) = import_frame(bbox)
+            results.put(("bounds", new_width_cm, new_height_cm))
+
+            # 3) Enviar la geometría al modelo por lotes, 50-100 %
+            for start in range(0, len(geometry), self.IMPORT_BATCH_SIZE):
+                if cancel.is_set():
+                    raise OperationCancelled()
+                chunk = geometry[start:start + self.IMPORT_BATCH_SIZE]
+                strokes, shapes = geometry_to_model(chunk, frame)
+                done = start + len(chunk)
+                results.put(("batch", strokes, shapes, 50 + 50 * done / len(geometry)))
+
+            results.put(("done",))
+
+        except OperationCancelled:
+            results.put(("cancelled",))
+        except Exception as e:
+            results.put(("error", str(e)))
+
+    def _poll_dxf_import(self):
+        """Procesa los mensajes pendientes de la importación DXF en curso."""
+        if self._import_queue is None:
+            return
+        if self._import_cancel.is_set():
+            self._finish_dxf_import(("cancelled",))
+            return
+
+        # Registrar geometría y procesar mensajes sin exceder el presupuesto
+        # de tiempo del tick; los lotes se registran objeto por objeto
+        deadline = time.perf_counter() + self.IMPORT_TICK_BUDGET
+        while time.perf_counter() < deadline:
+            if self._import_pending:
+                obj = self._import_pending.popleft()
+                if isinstance(obj, Stroke):
+                    self.strokes.append(obj)
+                    self._set_position(obj, len(self.strokes) - 1)
+                    self._register_stroke(obj)
+                else:
+                    self.shapes.append(obj)
+                    self._set_position(obj, len(self.shapes) - 1)
+                    self._register_shape(obj)
+                continue
+
+            try:
+                message = self._import_queue.get_nowait()
+            except queue.Empty:
+                break
+
+            kind = message[0]
+            if kind == "progress":
+                _, percent, text = message
+                self.file_progress["value"] = percent
+                self.file_status.set(text)
+
+            elif kind == "simplified":
+                _, removed, elapsed = message
+                report = self._report_simplification("Importación", removed, elapsed)
+                self._import_report = "\n".join(filter(None, (self._import_report, report)))
+
+            elif kind == "cached":
+                _, hit, summary, elapsed = message
+                source = "desde la cache" if hit else "con ezdxf"
+                report = f"Lectura {source} en {elapsed:.2f} s ({summary})"
+                self.file_status.set(report)
+                self._import_report = "\n".join(filter(None, (self._import_report, report)))
+
+            elif kind == "chained":
+                _, pieces, chains, closed, elapsed = message
+                report = (f"Unión de trazos: {pieces} piezas → {chains} trazos "
+                          f"({closed} cerrados) en {elapsed * 1000:.0f} ms")
+                self.file_status.set(report)
+                self._import_report = "\n".join(filter(None, (self._import_report, report)))
+
+            elif kind == "bounds":
+                _, width_cm, height_cm = message
+                canvas_size = (self.canvas_width_var.get(), self.canvas_height_var.get())
+                self.canvas_width_var.set(str(int(width_cm)))
+                self.canvas_height_var.set(str(int(height_cm)))
                 self._update_canvas_size()
 
-                # 3) Limpiar canvas sin confirmar
-                self._clear_canvas(confirm=False)
-
-                # 4) Dibujar entidades
-                for entity in msp:
-                    dtype = entity.dxftype()
-
-                    if dtype in ("LWPOLYLINE", "POLYLINE", "SPLINE", "ARC", "ELLIPSE"):
-                        points_mm = self._iter_entity_points_mm(entity, unit_scale)
-                        points_px = [
-                            self._to_canvas(x, y, min_x, max_y, margin_x, margin_y)
-                            for x, y in points_mm
-                        ]
-                        if len(points_px) > 1:
-                            color = self._aci_to_color(entity.dxf.color)
-                            stroke_data = {
-                                "type": "brush",
-                                "points": points_px,
-                                "color": color,
-                                "width": 2
-                            }
-                            self.strokes.append(stroke_data)
-                            for i in range(len(points_px) - 1):
-                                x1, y1 = points_px[i]
-                                x2, y2 = points_px[i + 1]
-                                self.canvas.create_line(
-                                    x1, y1, x2, y2,
-                                    fill=color,
-                                    width=2,
-                                    capstyle=tk.ROUND,
-                                    smooth=True
-                                )
-
-                    elif dtype == "LINE":
-                        start = entity.dxf.start
-                        end = entity.dxf.end
-                        start_mm = (start[0] * unit_scale, start[1] * unit_scale)
-                        end_mm = (end[0] * unit_scale, end[1] * unit_scale)
-
-                        start_px = self._to_canvas(*start_mm, min_x, max_y, margin_x, margin_y)
-                        end_px = self._to_canvas(*end_mm, min_x, max_y, margin_x, margin_y)
-
-                        color = self._aci_to_color(entity.dxf.color)
-                        shape_data = {
-                            "type": "line",
-                            "start": start_px,
-                            "end": end_px,
-                            "color": color,
-                            "width": 2
-                        }
-                        self.shapes.append(shape_data)
-                        self._draw_shape(shape_data)
-
-                    elif dtype == "CIRCLE":
-                        center = entity.dxf.center
-                        radius = entity.dxf.radius * unit_scale
-                        center_mm = (center[0] * unit_scale, center[1] * unit_scale)
-
-                        center_px = self._to_canvas(*center_mm, min_x, max_y, margin_x, margin_y)
-                        end_px = self._to_canvas(center_mm[0] + radius, center_mm[1], min_x, max_y, margin_x, margin_y)
-
-                        color = self._aci_to_color(entity.dxf.color)
-                        shape_data = {
-                            "type": "circle",
-                            "start": center_px,
-                            "end": end_px,
-                            "color": color,
-                            "width": 2
-                        }
-                        self.shapes.append(shape_data)
-                        self._draw_shape(shape_data)
-
-                messagebox.showinfo("Éxito", "Archivo DXF cargado correctamente.")
-
-            except Exception as e:
-                messagebox.showerror("Error", f"Error al cargar archivo DXF: {str(e)}")
-
-    def _color_to_aci(self, hex_color):
-        """Convierte color hexadecimal a AutoCAD Color Index (ACI)."""
-        # Mapeo básico de colores comunes
-        color_map = {
-            '#000000': 7,   # Blanco (en AutoCAD, negro se muestra como blanco)
-            '#FF0000': 1,   # Rojo
-            '#FFFF00': 2,   # Amarillo
-            '#00FF00': 3,   # Verde
-            '#00FFFF': 4,   # Cyan
-            '#0000FF': 5,   # Azul
-            '#FF00FF': 6,   # Magenta
-            '#FFFFFF': 7,   # Blanco
-        }
-        return color_map.get(hex_color.upper(), 7)  # Por defecto blanco
-
-    def _aci_to_color(self, aci):
-        """Convierte AutoCAD Color Index (ACI) a color hexadecimal."""
-        # Mapeo inverso
-        aci_map = {
-            1: '#FF0000',  # Rojo
-            2: '#FFFF00',  # Amarillo
-            3: '#00FF00',  # Verde
-            4: '#00FFFF',  # Cyan
-            5: '#0000FF',  # Azul
-            6: '#FF00FF',  # Magenta
-            7: '#000000',  # Negro (blanco en AutoCAD)
-        }
-        return aci_map.get(aci, '#000000')  # Por defecto negro
+                # Apartar el dibujo actual sin confirmar: vuelve si la
+                # importación se cancela o falla (ver _restore_import_previous)
+                self._import_previous = (self.strokes, self.shapes, canvas_size,
+                                         self._reset_index())
+                self.strokes = []
+                self.shapes = []
+
+            elif kind == "batch":
+                _, strokes, shapes, percent = message
+                self._import_pending.extend(strokes)
+                self._import_pending.extend(shapes)
+                self.file_progress["value"] = percent
+                self.file_status.set(f"Dibujando: {len(self.strokes) + len(self.shapes)} elementos")
+
+            else:
+                self._finish_dxf_import(message)
+                return
+
+        self.root.after(self.FILE_POLL_MS, self._poll_dxf_import)
+
+    def _cancel_file_job(self):
+        """Solicita cancelar la importación, exportación o envío en curso."""
+        for cancel in (self._import_cancel, self._export_cancel):
+            if cancel is not None:
+                cancel.set()
+                self.file_status.set("Cancelando...")
+        if self._sender is not None:
+            self._sender.cancel()
+
+    def _finish_dxf_import(self, message):
+        """Cierra la importación DXF en curso y muestra su resultado."""
+        self._import_queue = None
+        self._import_cancel = None
+        self._import_pending.clear()
+
+        # Pasar lo asignado durante la importación a la generación más vieja
+        # (freeze + unfreeze no lo recorre); si no, la primera recolección de
+        # la generación joven tras reactivar el recolector lo examinaría entero
+        gc.freeze()
+        gc.unfreeze()
+        gc.enable()
+        self._reset_file_progress()
+
+        kind = message[0]
+        if kind == "done":
+            # El dibujo importado empieza sin historial y pasa a ser la
+            # instantánea de la sesión
+            self._import_previous = None
+            self._history.clear()
+            self._compact_journal()
+            message = "Archivo DXF cargado correctamente."
+            if self._import_report:
+                message += f"\n{self._import_report}"
+            messagebox.showinfo("Éxito", message)
+
+        elif kind == "cancelled":
+            # No dejar un dibujo importado a medias
+            self._restore_import_previous()
+            messagebox.showinfo("Importación cancelada", "Se canceló la importación del archivo DXF.")
+
+        elif kind == "empty":
+            messagebox.showwarning("Advertencia", "El archivo DXF está vacío o no contiene entidades válidas.")
+
+        else:
+            self._restore_import_previous()
+            messagebox.showerror("Error", f"Error al cargar archivo DXF: {message[1]}")
+
+    def _restore_import_previous(self):
+        """
+        Vuelve al dibujo que reemplazó una importación cancelada o fallida.
+
+        El dibujo anterior no pasó por el historial ni por el diario: sus
+        listas y su índice se recuperan tal cual, junto con el tamaño del
+        lienzo, y se descarta lo importado hasta el momento.
+        """
+        if self._import_previous is None:
+            return
+        strokes, shapes, (width_cm, height_cm), index = self._import_previous
+        self._import_previous = None
+
+        self.canvas_width_var.set(width_cm)
+        self.canvas_height_var.set(height_cm)
+        self._update_canvas_size()
+
+        self._reset_index()
+        self.strokes = strokes
+        self.shapes = shapes
+        self._restore_index(index)
 
     def _clear_canvas(self, confirm=True):
-        """Limpia todos los trazos del canvas."""
+        """
+        Limpia todos los trazos del canvas (se puede deshacer).
+
+        Args:
+            confirm: Preguntar al usuario antes de limpiar
+
+        Returns:
+            bool: True si se limpió, False si el usuario no lo confirmó o
+            hay una importación en curso
+        """
+        # El dibujo no se edita mientras una importación lo reemplaza
+        if self._import_queue is not None:
+            return False
         if not confirm or messagebox.askyesno("Confirmar", "¿Está seguro de que desea limpiar todo el canvas?"):
-            self.canvas.delete("all")
+            # Los trazos quitados quedan en el historial (por referencia) junto
+            # con el índice del dibujo, para no reconstruirlo al deshacer
+            index = self._reset_index()
+            index_bytes = self.HISTORY_INDEX_FACTOR * sum(stroke.points.nbytes
+                                                          for stroke in self.strokes)
+            self._history.begin()
+            self._history.record(STROKES, 0, self.strokes, ())
+            self._history.record(SHAPES, 0, self.shapes, ())
+            self._history.end(index, index_bytes)
+
             self.strokes = []
             self.shapes = []
+            self._journal.clear()
+            self._schedule_journal_sync()
+            return True
+        return False
 
-            # Redibujar guías si están activadas
-            if self.show_guides.get():
-                self._draw_guides()
+    def _reset_index(self):
+        """
+        Vacía el canvas y reemplaza el índice espacial y la tabla de la vista por unos vacíos.
+
+        Returns:
+            tuple: Estado anterior, para _restore_index
+        """
+        state = (self.model_objects, self.spatial_index, self.view_bounds, self._lod_cache)
+        self.canvas.delete("all")
+        self.item_to_stroke = {}
+        self.item_to_shape = {}
+        self.model_objects = {}
+        self._positions = {}
+        self._position_shifts = []
+        self.key_to_item = {}
+        self.spatial_index = SegmentGrid(cell_size=self._index_cell_size())
+        self.view_bounds = BoundsTable()
+        self._lod_cache = {}
+        self._item_lod = {}
+
+        # Redibujar guías si están activadas
+        if self.show_guides.get():
+            self._draw_guides()
+        return state
+
+    def _restore_index(self, state):
+        """Vuelve al índice de _reset_index con el canvas vacío; la vista dibuja lo visible."""
+        self.model_objects, self.spatial_index, self.view_bounds, self._lod_cache = state
+        self._schedule_render()
+
+    def _undo(self, event=None):
+        """Deshace la última acción sobre el dibujo."""
+        if self._import_queue is None:
+            self._apply_history(self._history.undo(self.strokes, self.shapes))
+
+    def _redo(self, event=None):
+        """Rehace la última acción deshecha."""
+        if self._import_queue is None:
+            self._apply_history(self._history.redo(self.strokes, self.shapes))
+
+    def _apply_history(self, result):
+        """
+        Actualiza el canvas y el diario tras deshacer o rehacer.
+
+        Las listas del dibujo ya están actualizadas; sólo se quitan y se
+        registran los objetos de los empalmes, sin tocar el resto del canvas.
+        Una limpieza (la única acción con memo) intercambia el índice entero.
+
+        Args:
+            result: (splices, memo) de historial.History.undo o redo, o None
+        """
+        if result is None:
+            return
+        splices, memo = result
+        if memo is not None:
+            if self.strokes or self.shapes:
+                # Deshacer una limpieza devuelve el dibujo entero: en el diario
+                # va como instantánea en lugar de volver a escribir cada trazo
+                self._restore_index(memo)
+                self._compact_journal()
+                return
+            self._reset_index()
+        else:
+            # Un objeto puede salir de un empalme y entrar en otro o al revés
+            # (pieza intermedia de una pasada del borrador): se compara lo
+            # registrado con las listas
+            for target, index, removed, inserted in splices:
+                self._shift_positions(target, index, len(removed), len(inserted))
+                for offset, obj in enumerate(inserted):
+                    self._set_position(obj, index + offset)
+            self._reindex_positions(self.POSITION_SHIFTS_LIMIT)
+            objects = {id(obj): obj for _, _, removed, inserted in splices
+                       for obj in removed + inserted}
+            present = [obj for obj in objects.values() if self._in_model(obj)]
+            for key, obj in objects.items():
+                if key in self.model_objects and not self._in_model(obj):
+                    self._unregister(key)
+            added = [obj for obj in present if id(obj) not in self.model_objects]
+            draw = len(added) <= self.HISTORY_DRAW_LIMIT
+            for obj in added:
+                if isinstance(obj, Stroke):
+                    self._register_stroke(obj, draw=draw)
+                else:
+                    self._register_shape(obj, draw=draw)
+
+        for target, index, removed, inserted in splices:
+            self._journal.splice(target == SHAPES, index, len(removed), inserted)
+        self._schedule_journal_sync()
+
+    def _recover_session(self):
+        """Reconstruye el dibujo de la sesión anterior desde su diario, si el usuario lo pide."""
+        try:
+            strokes, shapes, canvas_size, _ = self._journal.recover()
+        except OSError as e:
+            messagebox.showwarning("Advertencia", f"No se pudo abrir el diario de la sesión: {str(e)}")
+            return
+        except (ValueError, KeyError) as e:
+            messagebox.showwarning("Advertencia", f"La sesión anterior está dañada y se descarta: {str(e)}")
+            strokes, shapes, canvas_size = [], [], None
+
+        if (strokes or shapes) and messagebox.askyesno(
+                "Recuperar sesión",
+                f"Se encontró un dibujo de la sesión anterior ({len(strokes)} trazos, "
+                f"{len(shapes)} formas). ¿Desea recuperarlo?"):
+            self._show_drawing(strokes, shapes, canvas_size, confirm=False)
+        else:
+            # Empezar una sesión nueva con el dibujo vacío
+            self._compact_journal()
+
+    def _schedule_journal_sync(self):
+        """Programa la escritura del diario: un fsync por intervalo, no por cambio."""
+        if not self._journal_sync_pending:
+            self._journal_sync_pending = True
+            self.root.after(self.JOURNAL_SYNC_MS, self._sync_journal)
+
+    def _sync_journal(self):
+        """Escribe los cambios pendientes del diario y lo compacta si creció demasiado."""
+        self._journal_sync_pending = False
+        self._journal.sync()
+        if self._journal.needs_compaction():
+            self._compact_journal()
+
+    def _compact_journal(self):
+        """Guarda el dibujo actual como instantánea de la sesión y vacía el diario."""
+        self._journal.compact(self.strokes, self.shapes,
+                              (self.canvas_width_cm, self.canvas_height_cm))
+
+    def _on_close(self):
+        """Cierra la ventana dejando el diario de la sesión al día."""
+        if self._import_queue is not None:
+            # El diario conserva el dibujo anterior a la importación; el
+            # recolector de ciclos vuelve a funcionar (ver _load_dxf)
+            self._import_cancel.set()
+            gc.enable()
+        self._journal.close()
+        self.root.destroy()
 
     def run(self):
         """Inicia el bucle principal de la aplicación."""
@@ -0,0 +1,535 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Envío de trabajos al controlador del robot
+Transmisión asíncrona (asyncio) de comandos por un enlace serie,
+independiente de Tkinter.
+
+Contenido:
+- Apertura de un puerto serie (o pseudo-terminal) como flujos asyncio
+- Emisor con ventana de confirmaciones: mantiene lleno el buffer de
+  recepción del controlador sin desbordarlo
+- Métricas de caudal y latencia, pausa y reanudación
+- Controlador simulado sobre un pseudo-terminal, para probar sin hardware
+
+Protocolo (el de grbl con conteo de caracteres): el controlador responde
+"ok" o "error:<código>", en orden, por cada línea que saca de su buffer de
+recepción. El emisor suma los bytes enviados y todavía no confirmados y
+sólo escribe una línea si cabe entera en el espacio libre. "!" (retención
+de avance), "~" (reanudar) y Ctrl-X (reinicio) son comandos de tiempo real
+que no ocupan el buffer.
+
+Los puertos se abren con termios: sólo funciona en sistemas POSIX.
+
+Uso sin interfaz:
+    python envio.py dibujo.gcode --puerto /dev/ttyUSB0
+    python envio.py dibujo.gcode --simulado
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import select
+import sys
+import threading
+import time
+
+try:
+    import termios
+    import tty
+except ImportError:  # Windows
+    termios = tty = None
+
+
+# Bytes del buffer de recepción de un controlador grbl
+RX_BUFFER_SIZE = 128
+
+FEED_HOLD = b"!"
+CYCLE_START = b"~"
+SOFT_RESET = b"\x18"
+
+
+def command_lines(chunks):
+    """
+    Separa en líneas de comando los trozos de texto de un emisor.
+
+    Los comentarios (";" hasta el final de la línea) y las líneas vacías
+    no se envían: ocuparían el buffer del controlador sin mover nada.
+
+    Args:
+        chunks: Iterable de trozos de texto (ver trabajo.job_chunks)
+
+    Yields:
+        str: Líneas sin salto final
+    """
+    for chunk in chunks:
+        for line in chunk.splitlines():
+            line = line.split(";", 1)[0].strip()
+            if line:
+                yield line
+
+
+async def open_serial(path, baudrate=115200):
+    """
+    Abre un puerto serie en modo crudo como flujos asyncio.
+
+    Args:
+        path: Ruta del dispositivo (por ejemplo /dev/ttyUSB0 o un pty)
+        baudrate: Velocidad en baudios
+
+    Returns:
+        tuple: (reader, writer) de asyncio
+
+    Raises:
+        OSError: Si no se puede abrir el puerto o el sistema no es POSIX
+        ValueError: Si la velocidad no es válida
+    """
+    if termios is None:
+        raise OSError("El envío por puerto serie requiere un sistema POSIX")
+    speed = getattr(termios, f"B{baudrate}", None)
+    if speed is None:
+        raise ValueError(f"Velocidad no válida: {baudrate}")
+
+    fd = os.open(path, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+    try:
+        tty.setraw(fd)
+        attrs = termios.tcgetattr(fd)
+        attrs[4] = attrs[5] = speed
+        termios.tcsetattr(fd, termios.TCSANOW, attrs)
+        write_fd = os.dup(fd)
+    except Exception:
+        os.close(fd)
+        raise
+
+    # Lectura y escritura van por descriptores separados: cada transporte
+    # cierra el suyo
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader()
+    await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader),
+                                 os.fdopen(fd, "rb", buffering=0))
+    transport, protocol = await loop.connect_write_pipe(
+        asyncio.streams.FlowControlMixin, os.fdopen(write_fd, "wb", buffering=0))
+    return reader, asyncio.StreamWriter(transport, protocol, reader, loop)
+
+
+class SendStats:
+    """Métricas de un envío: caudal, latencia de confirmación y ocupación."""
+
+    __slots__ = ("lines", "bytes", "errors", "last_error", "elapsed", "cancelled",
+                 "max_in_flight", "_latency_sum", "_latency_max", "_recent")
+
+    # Latencias recientes con las que se estiman los percentiles
+    RECENT = 10000
+
+    def __init__(self):
+        self.lines = 0  # Líneas confirmadas
+        self.bytes = 0  # Bytes confirmados
+        self.errors = 0
+        self.last_error = None
+        self.elapsed = 0.0
+        self.cancelled = False
+        self.max_in_flight = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+        self._recent = collections.deque(maxlen=self.RECENT)
+
+    def record(self, size, latency, error=None):
+        """Registra la confirmación de una línea de size bytes."""
+        self.lines += 1
+        self.bytes += size
+        self._latency_sum += latency
+        self._latency_max = max(self._latency_max, latency)
+        self._recent.append(latency)
+        if error is not None:
+            self.errors += 1
+            self.last_error = error
+
+    def throughput(self):
+        """Caudal medio como (líneas/s, bytes/s)."""
+        if self.elapsed <= 0:
+            return 0.0, 0.0
+        return self.lines / self.elapsed, self.bytes / self.elapsed
+
+    def latency_ms(self):
+        """
+        Latencia entre el envío de una línea y su confirmación.
+
+        Returns:
+            tuple: (media, p50, p95, máxima) en ms; p50 y p95 sobre las
+            últimas RECENT líneas
+        """
+        if not self.lines:
+            return 0.0, 0.0, 0.0, 0.0
+        recent = sorted(self._recent)
+        p50 = recent[(len(recent) - 1) // 2]
+        p95 = recent[int(0.95 * (len(recent) - 1))]
+        mean = self._latency_sum / self.lines
+        return mean * 1000, p50 * 1000, p95 * 1000, self._latency_max * 1000
+
+    def summary(self):
+        """Resumen de una línea para mostrar al usuario."""
+        lines_s, bytes_s = self.throughput()
+        mean, _, p95, peak = self.latency_ms()
+        text = (f"{self.lines} líneas en {self.elapsed:.1f} s "
+                f"({lines_s:.0f} líneas/s, {bytes_s / 1024:.1f} KiB/s); "
+                f"latencia media {mean:.1f} ms, p95 {p95:.1f} ms, máx. {peak:.1f} ms")
+        if self.errors:
+            text += f"; {self.errors} errores (último: {self.last_error})"
+        return text
+
+
+class ControllerSender:
+    """
+    Emisor de comandos con ventana de confirmaciones por conteo de caracteres.
+
+    run() escribe líneas mientras quepan en el buffer de recepción del
+    controlador y las da por procesadas con cada "ok"/"error" que llega.
+    pause(), resume() y cancel() se pueden llamar desde cualquier hilo.
+    """
+
+    def __init__(self, buffer_size=RX_BUFFER_SIZE, progress=None, progress_interval=0.25):
+        """
+        Crea un emisor.
+
+        Args:
+            buffer_size: Bytes del buffer de recepción del controlador
+            progress: Función opcional que recibe las SendStats durante el envío
+            progress_interval: Segundos mínimos entre llamadas a progress
+        """
+        self.buffer_size = buffer_size
+        self.progress = progress
+        self.progress_interval = progress_interval
+        self.stats = SendStats()
+        self.paused = False
+        self._cancelled = False
+        self._in_flight = 0
+        self._loop = None
+        self._writer = None
+        self._changed = None
+
+    def pause(self):
+        """Deja de enviar líneas y detiene el movimiento (retención de avance)."""
+        self._call(self._set_paused, True)
+
+    def resume(self):
+        """Reanuda el movimiento y el envío."""
+        self._call(self._set_paused, False)
+
+    def cancel(self):
+        """Detiene el robot, reinicia el controlador y termina el envío."""
+        self._call(self._cancel)
+
+    async def run(self, lines, reader, writer):
+        """
+        Envía las líneas y espera la confirmación de todas.
+
+        Las líneas se piden al iterable a medida que hay lugar en el buffer,
+        así que puede ser un generador de un trabajo de cualquier tamaño.
+
+        Args:
+            lines: Iterable de líneas de comando sin salto final
+            reader, writer: Flujos asyncio del puerto (ver open_serial)
+
+        Returns:
+            SendStats: Métricas del envío (cancelled indica si se canceló)
+
+        Raises:
+            ValueError: Si una línea no cabe en el buffer del controlador
+            ConnectionError: Si el controlador cierra la conexión
+        """
+        self._loop = asyncio.get_running_loop()
+        self._writer = writer
+        self._changed = asyncio.Condition()
+        pending = collections.deque()
+        started = time.perf_counter()
+        acks = asyncio.ensure_future(self._read_acks(reader, pending))
+        last_report = started
+
+        try:
+            for line in lines:
+                data = line.encode("ascii") + b"\n"
+                if len(data) > self.buffer_size:
+                    raise ValueError(f"La línea no cabe en el buffer del controlador: {line!r}")
+
+                async with self._changed:
+                    await self._changed.wait_for(lambda: (
+                        self._cancelled or acks.done() or
+                        (not self.paused and self._in_flight + len(data) <= self.buffer_size)))
+                if self._cancelled or acks.done():
+                    break
+
+                writer.write(data)
+                pending.append((len(data), time.perf_counter()))
+                self._in_flight += len(data)
+                self.stats.max_in_flight = max(self.stats.max_in_flight, self._in_flight)
+                await writer.drain()
+
+                now = time.perf_counter()
+                if self.progress is not None and now - last_report >= self.progress_interval:
+                    last_report = now
+                    self.stats.elapsed = now - started
+                    self.progress(self.stats)
+
+            async with self._changed:
+                await self._changed.wait_for(
+                    lambda: self._cancelled or acks.done() or not pending)
+            if acks.done() and not self._cancelled:
+                acks.result()
+        finally:
+            acks.cancel()
+            self.stats.elapsed = time.perf_counter() - started
+            self.stats.cancelled = self._cancelled
+            # El bucle se cierra al terminar el envío: desde aquí pause(),
+            # resume() y cancel() sólo actualizan el estado
+            self._loop = None
+            self._writer = None
+            self._changed = None
+
+        return self.stats
+
+    async def _read_acks(self, reader, pending):
+        """Libera el espacio de la línea más antigua con cada respuesta."""
+        try:
+            while True:
+                raw = await reader.readline()
+                if not raw:
+                    raise ConnectionError("El controlador cerró la conexión")
+                reply = raw.decode("ascii", "replace").strip()
+                if reply != "ok" and not reply.startswith("error"):
+                    continue  # Mensajes de estado o de arranque
+                if not pending:
+                    continue
+                size, sent = pending.popleft()
+                self._in_flight -= size
+                self.stats.record(size, time.perf_counter() - sent,
+                                  None if reply == "ok" else reply)
+                async with self._changed:
+                    self._changed.notify_all()
+        finally:
+            # Despierta a run() también si la lectura termina con un error
+            async with self._changed:
+                self._changed.notify_all()
+
+    def _call(self, function, *args):
+        """Ejecuta function en el bucle del envío, desde cualquier hilo."""
+        loop = self._loop
+        if loop is not None:
+            try:
+                loop.call_soon_threadsafe(function, *args)
+                return
+            except RuntimeError:
+                pass  # El envío terminó y su bucle se cerró entre tanto
+        function(*args)
+
+    def _set_paused(self, paused):
+        if paused == self.paused:
+            return
+        self.paused = paused
+        if self._writer is not None:
+            self._writer.write(FEED_HOLD if paused else CYCLE_START)
+        self._notify()
+
+    def _cancel(self):
+        if self._cancelled:
+            return
+        self._cancelled = True
+        if self._writer is not None:
+            self._writer.write(FEED_HOLD + SOFT_RESET)
+        self._notify()
+
+    def _notify(self):
+        """Despierta a run() después de un cambio de estado."""
+        if self._changed is None:
+            return
+
+        async def notify():
+            async with self._changed:
+                self._changed.notify_all()
+        asyncio.ensure_future(notify())
+
+
+class SimulatedController:
+    """
+    Controlador grbl simulado sobre un pseudo-terminal (POSIX).
+
+    Un hilo atiende el lado maestro del pty: guarda lo recibido en un buffer
+    de recepción de rx_buffer bytes, pasa cada línea completa a una cola de
+    planificación de planner_slots movimientos (respondiendo "ok" en ese
+    momento) y ejecuta los movimientos de a uno, move_time segundos cada
+    uno. Los bytes que llegan con el buffer lleno se descartan y se cuentan
+    en overflows. El emisor se conecta a la ruta port.
+    """
+
+    # Comandos que se aceptan (el resto responde "error:20")
+    COMMANDS = ("G", "M", "F", "$")
+
+    def __init__(self, rx_buffer=RX_BUFFER_SIZE, planner_slots=16, move_time=0.002):
+        """
+        Crea el pseudo-terminal y arranca el hilo del controlador.
+
+        Args:
+            rx_buffer: Bytes del buffer de recepción
+            planner_slots: Movimientos que caben en la cola de planificación
+            move_time: Segundos que tarda cada movimiento
+
+        Raises:
+            OSError: Si el sistema no tiene pseudo-terminales
+        """
+        if tty is None:
+            raise OSError("El controlador simulado requiere un sistema POSIX")
+        self.rx_buffer = rx_buffer
+        self.planner_slots = planner_slots
+        self.move_time = move_time
+
+        self.received = 0  # Líneas recibidas
+        self.executed = 0  # Movimientos terminados
+        self.overflows = 0  # Bytes descartados por buffer lleno
+        self.max_rx = 0  # Ocupación máxima del buffer de recepción
+        self.holding = False
+
+        # El lado esclavo queda abierto para que el maestro no reciba EIO
+        # mientras no haya un emisor conectado
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Detiene el hilo y cierra el pseudo-terminal."""
+        if self._running:
+            self._running = False
+            self._thread.join()
+            os.close(self._master)
+            os.close(self._slave)
+
+    def _run(self):
+        """Bucle del controlador: recepción, planificación y ejecución."""
+        rx = bytearray()
+        planner = collections.deque()
+        remaining = 0.0  # Tiempo que le falta al movimiento en curso
+        last = time.perf_counter()
+
+        while self._running:
+            timeout = min(self.move_time, 0.005) if planner else 0.01
+            ready, _, _ = select.select([self._master], [], [], timeout)
+            if ready:
+                for byte in os.read(self._master, 4096):
+                    if byte == FEED_HOLD[0]:
+                        self.holding = True
+                    elif byte == CYCLE_START[0]:
+                        self.holding = False
+                    elif byte == SOFT_RESET[0]:
+                        rx.clear()
+                        planner.clear()
+                        self.holding = False
+                    elif len(rx) < self.rx_buffer:
+                        rx.append(byte)
+                    else:
+                        self.overflows += 1
+                self.max_rx = max(self.max_rx, len(rx))
+
+            now = time.perf_counter()
+            if not self.holding:
+                budget = now - last
+                while planner and budget > 0:
+                    step = min(remaining, budget)
+                    remaining -= step
+                    budget -= step
+                    if remaining <= 0:
+                        planner.popleft()
+                        self.executed += 1
+                        remaining = self.move_time
+            last = now
+
+            replies = []
+            while len(planner) < self.planner_slots and b"\n" in rx:
+                end = rx.index(b"\n")
+                line = rx[:end].strip().decode("ascii", "replace")
+                del rx[:end + 1]
+                self.received += 1
+                if not line.startswith(self.COMMANDS):
+                    replies.append(b"error:20\r\n")
+                    continue
+                if line.startswith(("G", "M")):
+                    if not planner:
+                        remaining = self.move_time
+                    planner.append(line)
+                replies.append(b"ok\r\n")
+            if replies:
+                os.write(self._master, b"".join(replies))
+
+
+async def send_job(lines, port, baudrate=115200, sender=None):
+    """
+    Abre el puerto, envía las líneas y lo cierra.
+
+    Args:
+        lines: Iterable de líneas de comando (ver command_lines)
+        port: Ruta del puerto serie
+        baudrate: Velocidad en baudios
+        sender: ControllerSender a usar, o None para uno con valores por defecto
+
+    Returns:
+        SendStats: Métricas del envío
+    """
+    sender = sender or ControllerSender()
+    reader, writer = await open_serial(port, baudrate)
+    try:
+        return await sender.run(lines, reader, writer)
+    finally:
+        writer.close()
+
+
+def main(argv=None):
+    """Envía un archivo de G-code al controlador desde la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Envía un archivo de G-code al controlador del robot con control de flujo.")
+    parser.add_argument("gcode", help="archivo de G-code (por ejemplo, exportado con trabajo.py)")
+    port = parser.add_mutually_exclusive_group(required=True)
+    port.add_argument("--puerto", help="puerto serie del controlador")
+    port.add_argument("--simulado", action="store_true",
+                      help="enviar a un controlador simulado sobre un pseudo-terminal")
+    parser.add_argument("--baudios", type=int, default=115200)
+    parser.add_argument("--buffer", type=int, default=RX_BUFFER_SIZE,
+                        help="bytes del buffer de recepción del controlador")
+    args = parser.parse_args(argv)
+
+    def report(stats):
+        print(f"\r{stats.lines} líneas confirmadas", end="", file=sys.stderr)
+
+    simulator = None
+    try:
+        if args.simulado:
+            simulator = SimulatedController(args.buffer)
+        with open(args.gcode, "r", encoding="utf-8") as f:
+            sender = ControllerSender(args.buffer, report)
+            stats = asyncio.run(send_job(command_lines(f), simulator.port if simulator else args.puerto,
+                                         args.baudios, sender))
+    except (OSError, ValueError, UnicodeError) as e:
+        print(f"\nError: {e}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        print("\nEnvío interrumpido", file=sys.stderr)
+        return 1
+    finally:
+        if simulator is not None:
+            simulator.close()
+
+    print(f"\n{stats.summary()}", file=sys.stderr)
+    if simulator is not None:
+        print(f"Simulador: {simulator.executed} movimientos, buffer máx. {simulator.max_rx} bytes, "
+              f"{simulator.overflows} bytes desbordados", file=sys.stderr)
+    return 1 if stats.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,932 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Geometría de trazos
+Utilidades geométricas independientes de Tkinter para el editor de trazos.
+
+Contenido:
+- Índice espacial de rejilla uniforme sobre segmentos de polilíneas
+- Tabla de bounding boxes para recortar el dibujo a la vista
+- Recorte de polilíneas contra el círculo del borrador
+- Simplificación de polilíneas (Ramer–Douglas–Peucker vectorizado)
+- Decimación por rejilla para dibujar con nivel de detalle
+- Unión de polilíneas cuyos extremos coinciden (cadenas y contornos cerrados)
+- Aproximación de arcos por polilíneas con un error de cuerda máximo
+- Ajuste de polilíneas con tramos rectos y arcos (bulges de DXF)
+"""
+
+import math
+import time
+
+import numpy as np
+
+
+# Desviación máxima (mm) entre una curva y la polilínea que la aproxima
+FLATTENING_DISTANCE = 0.5
+
+# Segmentos mínimos y máximos por vuelta completa al aproximar un arco: un
+# círculo diminuto sigue pareciendo un círculo y uno enorme no se dispara
+ARC_MIN_SEGMENTS = 8
+ARC_MAX_SEGMENTS = 4096
+
+
+class SegmentGrid:
+    """
+    Índice espacial de rejilla uniforme sobre los segmentos de polilíneas.
+
+    Cada polilínea se registra con una clave (por ejemplo, el id de su item
+    de canvas) y cada uno de sus segmentos se guarda sólo en las celdas que
+    atraviesa (ver _segment_cells), no en todo su bounding box. Las consultas
+    sólo visitan las celdas que toca el círculo buscado, por lo que su costo
+    no depende del tamaño del dibujo.
+    """
+
+    def __init__(self, cell_size=32.0):
+        """
+        Inicializa un índice vacío.
+
+        Args:
+            cell_size: Lado de cada celda de la rejilla (en unidades del dibujo)
+        """
+        self.cell_size = float(cell_size)
+        self._cells = {}  # (ix, iy) -> {clave: [índices de segmento]}
+        self._owner_cells = {}  # clave -> celdas ocupadas
+        self._points = {}  # clave -> puntos de la polilínea
+
+    def __len__(self):
+        return len(self._points)
+
+    def __contains__(self, key):
+        return key in self._points
+
+    def clear(self, cell_size=None):
+        """
+        Elimina todas las polilíneas del índice.
+
+        Args:
+            cell_size: Nuevo lado de celda (por defecto se conserva el actual)
+        """
+        if cell_size is not None:
+            self.cell_size = float(cell_size)
+        self._cells = {}
+        self._owner_cells = {}
+        self._points = {}
+
+    def insert(self, key, points):
+        """
+        Registra los segmentos de una polilínea.
+
+        Args:
+            key: Clave hashable que identifica la polilínea
+            points: Secuencia de puntos (x, y) o arreglo (n, 2); los arreglos
+                float64 se guardan sin copiar
+        """
+        if key in self._points:
+            self.remove(key)
+
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        size = self.cell_size
+        cells = self._cells
+        owned = set()
+
+        def add(cell, indices):
+            bucket = cells.get(cell)
+            if bucket is None:
+                bucket = cells[cell] = {}
+            segments = bucket.get(key)
+            if segments is None:
+                segments = bucket[key] = []
+            segments.extend(indices)
+            owned.add(cell)
+
+        if len(points) > 1:
+            # La mayoría de segmentos cae dentro de una sola celda: se agrupan
+            # por celda en bloque y sólo los que cruzan celdas se recorren
+            cell_ids = np.floor(points / size).astype(np.int64)
+            same = (cell_ids[:-1] == cell_ids[1:]).all(axis=1)
+            single = np.flatnonzero(same)
+            if len(single):
+                codes = cell_ids[single]
+                order = np.lexsort((codes[:, 1], codes[:, 0]))
+                codes = codes[order]
+                bounds = np.flatnonzero((codes[1:] != codes[:-1]).any(axis=1)) + 1
+                groups = np.split(single[order], bounds)
+                for (ix, iy), group in zip(codes[np.r_[0, bounds]].tolist(), groups):
+                    add((ix, iy), group.tolist())
+            for i in np.flatnonzero(~same).tolist():
+                for cell in _segment_cells(points[i].tolist(), points[i + 1].tolist(), size):
+                    add(cell, (i,))
+
+        self._points[key] = points
+        self._owner_cells[key] = owned
+
+    def remove(self, key):
+        """
+        Elimina una polilínea del índice (no hace nada si no existe).
+
+        Args:
+            key: Clave usada al registrar la polilínea
+        """
+        for cell in self._owner_cells.pop(key, ()):
+            bucket = self._cells.get(cell)
+            if bucket is None:
+                continue
+            bucket.pop(key, None)
+            if not bucket:
+                del self._cells[cell]
+        self._points.pop(key, None)
+
+    def query(self, x, y, radius):
+        """
+        Busca los segmentos a una distancia menor o igual a radius de (x, y).
+
+        Args:
+            x, y: Centro de la búsqueda
+            radius: Radio de la búsqueda
+
+        Returns:
+            dict: clave -> lista ordenada de índices de segmento alcanzados
+        """
+        size = self.cell_size
+        ix0 = math.floor((x - radius) / size)
+        ix1 = math.floor((x + radius) / size)
+        iy0 = math.floor((y - radius) / size)
+        iy1 = math.floor((y + radius) / size)
+
+        candidates = {}
+        for ix in range(ix0, ix1 + 1):
+            for iy in range(iy0, iy1 + 1):
+                bucket = self._cells.get((ix, iy))
+                if not bucket:
+                    continue
+                for key, segments in bucket.items():
+                    candidates.setdefault(key, set()).update(segments)
+
+        hits = {}
+        radius_sq = radius * radius
+        for key, segments in candidates.items():
+            points = self._points[key]
+            index = np.fromiter(sorted(segments), dtype=np.intp, count=len(segments))
+            dist_sq = _segment_distance_sq(x, y, points[index], points[index + 1])
+            found = index[dist_sq <= radius_sq]
+            if len(found):
+                hits[key] = found.tolist()
+        return hits
+
+
+class BoundsTable:
+    """
+    Tabla de bounding boxes consultable de forma vectorizada.
+
+    Las cajas viven en un arreglo (n, 4) que crece por duplicación; las
+    bajas sólo marcan su fila como libre y la tabla se compacta cuando más
+    de la mitad de las filas están libres. Una consulta de rectángulo es una
+    única comparación vectorizada sobre todas las filas.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Inicializa una tabla vacía.
+
+        Args:
+            capacity: Número inicial de filas reservadas
+        """
+        self._boxes = np.empty((capacity, 4), dtype=np.float64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._slot_keys = [None] * capacity
+        self._slots = {}  # clave -> fila
+        self._size = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def clear(self):
+        """Elimina todas las cajas."""
+        self.__init__(len(self._slot_keys))
+
+    def add(self, key, bbox):
+        """
+        Agrega o actualiza la caja de una clave.
+
+        Args:
+            key: Clave hashable
+            bbox: (min_x, min_y, max_x, max_y)
+        """
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._size == len(self._slot_keys):
+                self._grow()
+            slot = self._size
+            self._size += 1
+            self._slots[key] = slot
+            self._slot_keys[slot] = key
+            self._alive[slot] = True
+        self._boxes[slot] = bbox
+
+    def remove(self, key):
+        """Elimina la caja de una clave (no hace nada si no existe)."""
+        slot = self._slots.pop(key, None)
+        if slot is None:
+            return
+        self._alive[slot] = False
+        self._slot_keys[slot] = None
+        if self._size > 1024 and len(self._slots) < self._size // 2:
+            self._compact()
+
+    def query(self, min_x, min_y, max_x, max_y):
+        """
+        Busca las cajas que se solapan con un rectángulo.
+
+        Returns:
+            tuple: (keys, sizes) con la lista de claves y un arreglo con el
+            lado mayor de cada caja (útil para priorizar las más visibles)
+        """
+        boxes = self._boxes[:self._size]
+        mask = (self._alive[:self._size]
+                & (boxes[:, 0] <= max_x) & (boxes[:, 2] >= min_x)
+                & (boxes[:, 1] <= max_y) & (boxes[:, 3] >= min_y))
+        slots = np.flatnonzero(mask)
+        found = boxes[slots]
+        sizes = np.maximum(found[:, 2] - found[:, 0], found[:, 3] - found[:, 1])
+        return [self._slot_keys[slot] for slot in slots.tolist()], sizes
+
+    def _grow(self):
+        """Duplica la capacidad de la tabla."""
+        capacity = 2 * len(self._slot_keys)
+        boxes = np.empty((capacity, 4), dtype=np.float64)
+        boxes[:self._size] = self._boxes[:self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._boxes = boxes
+        self._alive = alive
+        self._slot_keys.extend([None] * (capacity - len(self._slot_keys)))
+
+    def _compact(self):
+        """Reubica las filas vivas al principio de la tabla."""
+        live = np.flatnonzero(self._alive[:self._size])
+        count = len(live)
+        self._boxes[:count] = self._boxes[live]
+        self._alive[:count] = True
+        self._alive[count:self._size] = False
+        keys = [self._slot_keys[slot] for slot in live.tolist()]
+        self._slot_keys[:self._size] = keys + [None] * (self._size - count)
+        self._slots = {key: slot for slot, key in enumerate(keys)}
+        self._size = count
+
+
+def _segment_cells(a, b, size):
+    """
+    Enumera las celdas de la rejilla que atraviesa el segmento a-b.
+
+    Recorre las columnas que cubre el segmento y, en cada una, sólo las filas
+    comprendidas entre sus ordenadas de entrada y salida; así un segmento
+    diagonal largo ocupa O(columnas + filas) celdas y no todo su bounding box.
+    """
+    x1, y1 = a
+    x2, y2 = b
+    if x1 > x2:
+        x1, y1, x2, y2 = x2, y2, x1, y1
+
+    ix0 = math.floor(x1 / size)
+    ix1 = math.floor(x2 / size)
+    if ix0 == ix1:
+        iy0 = math.floor(min(y1, y2) / size)
+        iy1 = math.floor(max(y1, y2) / size)
+        return [(ix0, iy) for iy in range(iy0, iy1 + 1)]
+
+    slope = (y2 - y1) / (x2 - x1)
+    cells = []
+    for ix in range(ix0, ix1 + 1):
+        xa = max(x1, ix * size)
+        xb = min(x2, (ix + 1) * size)
+        ya = y1 + (xa - x1) * slope
+        yb = y1 + (xb - x1) * slope
+        iy0 = math.floor(min(ya, yb) / size)
+        iy1 = math.floor(max(ya, yb) / size)
+        cells.extend((ix, iy) for iy in range(iy0, iy1 + 1))
+    return cells
+
+
+def _segment_distance_sq(px, py, a, b):
+    """Distancias al cuadrado del punto (px, py) a los segmentos a[i]-b[i]."""
+    d = b - a
+    f = a - (px, py)
+    length_sq = np.einsum("ij,ij->i", d, d)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = np.where(length_sq > 0, -np.einsum("ij,ij->i", f, d) / length_sq, 0.0)
+    q = f + np.clip(t, 0.0, 1.0)[:, None] * d
+    return np.einsum("ij,ij->i", q, q)
+
+
+def _circle_clip(a, b, cx, cy, radius):
+    """
+    Calcula el intervalo paramétrico del segmento a-b dentro de un círculo.
+
+    Returns:
+        tuple: (t0, t1) con 0 <= t0 <= t1 <= 1, o None si no hay intersección
+    """
+    ax, ay = a
+    dx = b[0] - ax
+    dy = b[1] - ay
+    fx = ax - cx
+    fy = ay - cy
+
+    qa = dx * dx + dy * dy
+    qc = fx * fx + fy * fy - radius * radius
+    if qa == 0:
+        return (0.0, 1.0) if qc <= 0 else None
+
+    qb = 2 * (fx * dx + fy * dy)
+    disc = qb * qb - 4 * qa * qc
+    if disc < 0:
+        return None
+
+    root = math.sqrt(disc)
+    t0 = max(0.0, (-qb - root) / (2 * qa))
+    t1 = min(1.0, (-qb + root) / (2 * qa))
+    if t0 >= t1:
+        return None
+    return t0, t1
+
+
+def cut_polyline(points, segments, cx, cy, radius):
+    """
+    Recorta una polilínea eliminando la parte que cae dentro de un círculo.
+
+    Sólo se recortan los segmentos indicados (normalmente los devueltos por
+    SegmentGrid.query); cada uno se corta exactamente en el borde del
+    círculo, por lo que el resto del segmento se conserva. Los tramos no
+    afectados se copian en bloque desde el arreglo original.
+
+    Args:
+        points: Puntos (x, y) de la polilínea o arreglo (n, 2)
+        segments: Índices de los segmentos alcanzados por el círculo
+        cx, cy: Centro del círculo
+        radius: Radio del círculo
+
+    Returns:
+        list: Piezas resultantes (arreglos (m, 2) con m >= 2), o None si
+        ningún segmento quedó realmente dentro del círculo
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    cuts = []
+    for i in sorted(set(segments)):
+        interval = _circle_clip(pts[i].tolist(), pts[i + 1].tolist(), cx, cy, radius)
+        if interval is not None:
+            cuts.append((i, interval))
+    if not cuts:
+        return None
+
+    pieces = []
+    start_index = 0
+    start_point = None  # Punto de salida del círculo que abre la pieza actual
+
+    for i, (t0, t1) in cuts:
+        a = pts[i]
+        d = pts[i + 1] - a
+        parts = [pts[start_index:i + 1]]
+        if start_point is not None:
+            parts.insert(0, start_point[None])
+        if t0 > 0:
+            parts.append((a + t0 * d)[None])
+        pieces.append(np.concatenate(parts))
+        start_point = a + t1 * d if t1 < 1 else None
+        start_index = i + 1
+
+    parts = [pts[start_index:]]
+    if start_point is not None:
+        parts.insert(0, start_point[None])
+    pieces.append(np.concatenate(parts))
+
+    pieces = [piece for piece in pieces
+              if len(piece) > 2 or (len(piece) == 2 and not np.array_equal(piece[0], piece[1]))]
+
+    # En polilíneas cerradas, las piezas que tocan la costura se unen en una
+    closed = np.array_equal(pts[0], pts[-1])
+    if (closed and len(pieces) > 1 and np.array_equal(pieces[0][0], pts[0])
+            and np.array_equal(pieces[-1][-1], pts[-1])):
+        pieces[0] = np.concatenate((pieces.pop(), pieces[0][1:]))
+    return pieces
+
+
+def arc_segment_count(radius, sweep, tolerance=FLATTENING_DISTANCE):
+    """
+    Segmentos necesarios para aproximar un arco con un error de cuerda dado.
+
+    Una cuerda que abarca un ángulo φ se aleja del arco, en su punto medio,
+    r·(1 − cos(φ/2)) (la sagita); el ángulo máximo por segmento es entonces
+    2·acos(1 − tolerance/r).
+
+    Args:
+        radius: Radio del arco
+        sweep: Ángulo abarcado en radianes (el signo no importa)
+        tolerance: Sagita máxima, en las mismas unidades que el radio
+
+    Returns:
+        int: Número de segmentos, entre ARC_MIN_SEGMENTS y ARC_MAX_SEGMENTS
+        por vuelta completa (al menos 1)
+    """
+    turns = abs(sweep) / (2 * math.pi)
+    ratio = 1.0 - tolerance / radius if radius > 0 else -1.0
+    step = 2 * math.acos(ratio) if ratio > -1.0 else 2 * math.pi
+    count = math.ceil(abs(sweep) / step - 1e-9)
+    count = max(count, math.ceil(ARC_MIN_SEGMENTS * turns - 1e-9), 1)
+    return min(count, max(1, math.ceil(ARC_MAX_SEGMENTS * turns)))
+
+
+def arc_points(center, radius, start_angle, sweep, tolerance=FLATTENING_DISTANCE):
+    """
+    Aproxima un arco de circunferencia con una polilínea.
+
+    Args:
+        center: Centro (x, y)
+        radius: Radio
+        start_angle: Ángulo inicial en radianes
+        sweep: Ángulo abarcado en radianes (negativo en sentido horario)
+        tolerance: Error de cuerda máximo (ver arc_segment_count)
+
+    Returns:
+        numpy.ndarray: Puntos (n + 1, 2) desde el inicio hasta el final del arco
+    """
+    count = arc_segment_count(radius, sweep, tolerance)
+    # np.arange es varias veces más rápido que np.linspace en arreglos cortos
+    angles = start_angle + np.arange(count + 1) * (sweep / count)
+    angles[-1] = start_angle + sweep
+    points = np.empty((count + 1, 2))
+    points[:, 0] = center[0] + radius * np.cos(angles)
+    points[:, 1] = center[1] + radius * np.sin(angles)
+    return points
+
+
+def bulge_polyline_points(vertices, tolerance=FLATTENING_DISTANCE):
+    """
+    Aplana una polilínea con bulges (como las LWPOLYLINE de DXF).
+
+    El bulge de cada vértice describe el tramo que empieza en él: 0 es
+    recto y tan(φ/4) un arco de ángulo φ (positivo en sentido antihorario).
+
+    Args:
+        vertices: Arreglo (n, 3) de vértices (x, y, bulge)
+        tolerance: Error de cuerda máximo de los arcos (ver arc_segment_count)
+
+    Returns:
+        numpy.ndarray: Puntos (m, 2) que pasan por todos los vértices
+    """
+    vertices = np.asarray(vertices, dtype=float).reshape(-1, 3)
+    pts = vertices[:, :2]
+    arcs = np.flatnonzero(vertices[:-1, 2])
+    if not len(arcs):
+        return pts.copy()
+
+    pieces = []
+    previous = 0
+    for index, (x0, y0, bulge), (x1, y1) in zip(arcs.tolist(), vertices[arcs].tolist(),
+                                                 pts[arcs + 1].tolist()):
+        pieces.append(pts[previous:index])
+        sweep = 4 * math.atan(bulge)
+        dx, dy = x1 - x0, y1 - y0
+        chord = math.hypot(dx, dy)
+        if chord == 0:
+            previous = index + 1
+            continue
+        # El centro está sobre la mediatriz de la cuerda
+        offset = 0.5 / math.tan(sweep / 2)
+        cx = (x0 + x1) / 2 - dy * offset
+        cy = (y0 + y1) / 2 + dx * offset
+        radius = chord / (2 * abs(math.sin(sweep / 2)))
+        arc = arc_points((cx, cy), radius, math.atan2(y0 - cy, x0 - cx), sweep, tolerance)
+        arc[0] = (x0, y0)
+        pieces.append(arc[:-1])
+        previous = index + 1
+    pieces.append(pts[previous:])
+    return np.concatenate(pieces)
+
+
+def reverse_bulge_polyline(vertices):
+    """
+    Invierte el sentido de una polilínea con bulges.
+
+    Cada tramo se recorre al revés, así que su bulge cambia de signo y pasa
+    al vértice que ahora lo empieza.
+
+    Args:
+        vertices: Arreglo (n, 3) de vértices (x, y, bulge)
+
+    Returns:
+        numpy.ndarray: Nuevo arreglo (n, 3)
+    """
+    reversed_vertices = vertices[::-1].copy()
+    reversed_vertices[:-1, 2] = 0.0 - vertices[-2::-1, 2]
+    reversed_vertices[-1, 2] = 0.0
+    return reversed_vertices
+
+
+def fit_arcs(points, tolerance, flattening=FLATTENING_DISTANCE):
+    """
+    Reemplaza los puntos de una polilínea por tramos rectos y arcos.
+
+    Desde cada vértice se busca el tramo más largo de puntos consecutivos
+    que queda a menos de tolerance de una recta o de un arco (el que pasa
+    por el primer punto, el del medio y el último). Los largos se prueban
+    duplicándose y luego por bisección, así que cada tramo cuesta
+    O(k log k) en operaciones vectorizadas sobre sus k puntos. Los arcos
+    se representan como bulges de DXF.
+
+    Los puntos quedan a menos de tolerance del ajuste. Los segmentos
+    originales se tratan como cuerdas de la curva: un arco los reemplaza
+    si se aleja de ellos menos de max(tolerance, flattening), la misma
+    desviación con la que se aplanan las curvas al importar; así un arco
+    ya aplanado vuelve a ser un arco.
+
+    Args:
+        points: Arreglo (n, 2) de puntos
+        tolerance: Desviación máxima entre los puntos originales y el
+            ajuste (en las unidades de points)
+        flattening: Desviación máxima entre los segmentos originales y los
+            arcos que los reemplazan
+
+    Returns:
+        numpy.ndarray: Vértices (m, 3) con x, y y el bulge del tramo que
+        empieza en cada uno (0 en los rectos y en el último vértice); los
+        extremos se conservan
+    """
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(pts)
+    if n < 3 or tolerance <= 0:
+        return np.column_stack((pts, np.zeros(n)))
+
+    chord_tolerance = max(tolerance, flattening)
+    indices = [0]
+    bulges = []
+    first = 0
+    while first < n - 1:
+        line_end = _longest_fit(lambda last: _fits_line(pts, first, last, tolerance),
+                                first + 1, n - 1)
+        # Un arco sólo sirve si llega más lejos que la recta
+        arc_end = -1
+        arc_start = max(first + 2, line_end + 1)
+        if arc_start < n:
+            arc_end = _longest_fit(
+                lambda last: _fit_arc(pts, first, last, tolerance, chord_tolerance) is not None,
+                arc_start, n - 1)
+        if arc_end > line_end:
+            bulges.append(_fit_arc(pts, first, arc_end, tolerance, chord_tolerance))
+            first = arc_end
+        else:
+            bulges.append(0.0)
+            first = line_end
+        indices.append(first)
+
+    bulges.append(0.0)
+    return np.column_stack((pts[indices], bulges))
+
+
+def fit_polylines(polylines, tolerance, flattening=FLATTENING_DISTANCE):
+    """
+    Ajusta un lote de polilíneas con fit_arcs e informa del resultado.
+
+    Args:
+        polylines: Iterable de arreglos (n, 2)
+        tolerance, flattening: Desviaciones máximas (ver fit_arcs)
+
+    Returns:
+        tuple: (fitted, points, arcs, elapsed) con la lista de vértices
+        (m, 3) de cada polilínea, los puntos originales y los arcos en total
+        y el tiempo empleado en segundos
+    """
+    start = time.perf_counter()
+    fitted = []
+    points = arcs = 0
+    for polyline in polylines:
+        vertices = fit_arcs(polyline, tolerance, flattening)
+        points += len(polyline)
+        arcs += int(np.count_nonzero(vertices[:, 2]))
+        fitted.append(vertices)
+    return fitted, points, arcs, time.perf_counter() - start
+
+
+def _longest_fit(fits, first, limit):
+    """
+    Mayor last en [first, limit] con fits(last), o first - 1 si no hay.
+
+    Supone que si un tramo no se ajusta tampoco se ajustan los más largos
+    (no siempre es cierto, pero basta para buscar con saltos y bisección).
+    """
+    good = first - 1
+    last = first
+    step = 1
+    while fits(last):
+        good = last
+        if last == limit:
+            return good
+        last = min(last + step, limit)
+        step *= 2
+
+    bad = last
+    while bad - good > 1:
+        middle = (good + bad) // 2
+        if fits(middle):
+            good = middle
+        else:
+            bad = middle
+    return good
+
+
+def _fits_line(pts, first, last, tolerance):
+    """Indica si pts[first:last + 1] queda a menos de tolerance del segmento entre sus extremos."""
+    if last - first < 2:
+        return True
+    a = pts[first]
+    d = pts[last] - a
+    inner = pts[first + 1:last] - a
+    length_sq = d[0] * d[0] + d[1] * d[1]
+    if length_sq > 0:
+        t = np.clip((inner @ d) / length_sq, 0.0, 1.0)
+        inner = inner - t[:, None] * d
+    return np.einsum("ij,ij->i", inner, inner).max() <= tolerance * tolerance
+
+
+def _fit_arc(pts, first, last, tolerance, chord_tolerance):
+    """
+    Ajusta un arco a pts[first:last + 1].
+
+    Returns:
+        float: Bulge del arco que pasa por el primer punto, el del medio y
+        el último, o None si algún punto se aleja más de tolerance, algún
+        segmento más de chord_tolerance o los puntos no avanzan siempre en
+        el mismo sentido
+    """
+    # Con listas: la aritmética con escalares de NumPy es mucho más lenta
+    (ax, ay), (bx, by), (cx, cy) = pts[[first, (first + last) // 2, last]].tolist()
+    # Circuncentro del triángulo (a, b, c)
+    bx, by, cx, cy = bx - ax, by - ay, cx - ax, cy - ay
+    d = 2 * (bx * cy - by * cx)
+    b_sq, c_sq = bx * bx + by * by, cx * cx + cy * cy
+    if abs(d) <= 1e-12 * max(b_sq, c_sq):
+        return None
+    center = (ax + (cy * b_sq - by * c_sq) / d, ay + (bx * c_sq - cx * b_sq) / d)
+    radius = math.hypot(ax - center[0], ay - center[1])
+
+    span = pts[first:last + 1] - center
+    distances = np.hypot(span[:, 0], span[:, 1])
+    if np.abs(distances - radius).max() > tolerance:
+        return None
+
+    # Cada tramo original es una cuerda: su punto medio no debe alejarse del arco
+    middles = (span[1:] + span[:-1]) / 2
+    if (radius - np.hypot(middles[:, 0], middles[:, 1])).max() > chord_tolerance:
+        return None
+
+    # Ángulo de cada tramo visto desde el centro, con signo
+    before, after = span[:-1], span[1:]
+    steps = np.arctan2(before[:, 0] * after[:, 1] - before[:, 1] * after[:, 0],
+                       before[:, 0] * after[:, 0] + before[:, 1] * after[:, 1])
+    if not ((steps >= 0).all() or (steps <= 0).all()):
+        return None
+    sweep = float(steps.sum())
+    if sweep == 0 or abs(sweep) >= 2 * math.pi - 1e-6:
+        return None
+    return math.tan(sweep / 4)
+
+
+def simplify_polyline(points, tolerance):
+    """
+    Simplifica una polilínea con el algoritmo de Ramer–Douglas–Peucker.
+
+    Las distancias de cada tramo se calculan de forma vectorizada con NumPy
+    (distancia al segmento, no a la recta, para tolerar trazos que vuelven
+    sobre sí mismos). Los extremos siempre se conservan.
+
+    Args:
+        points: Secuencia de puntos (x, y) o arreglo de forma (n, 2)
+        tolerance: Desviación máxima permitida (en las unidades de points)
+
+    Returns:
+        numpy.ndarray: Puntos conservados, de forma (m, 2)
+    """
+    pts = np.asarray(points, dtype=float).reshape(-1, 2)
+    n = len(pts)
+    if n < 3 or tolerance <= 0:
+        return pts
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    tolerance_sq = tolerance * tolerance
+    stack = [(0, n - 1)]
+
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+
+        a = pts[first]
+        d = pts[last] - a
+        inner = pts[first + 1:last] - a
+        length_sq = d[0] * d[0] + d[1] * d[1]
+        if length_sq > 0:
+            t = np.clip((inner @ d) / length_sq, 0.0, 1.0)
+            inner = inner - t[:, None] * d
+        dist_sq = np.einsum("ij,ij->i", inner, inner)
+
+        k = int(np.argmax(dist_sq))
+        if dist_sq[k] > tolerance_sq:
+            split = first + 1 + k
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+
+    return pts[keep]
+
+
+def decimate_polyline(points, tolerance):
+    """
+    Decima una polilínea cuantizando sus puntos a una rejilla.
+
+    Conserva un punto sólo cuando cae en una celda distinta a la del punto
+    anterior (además del primero y el último). Las celdas miden
+    tolerance / sqrt(2), por lo que cada punto eliminado queda a menos de
+    tolerance de uno conservado. Es una sola pasada vectorizada, mucho más
+    barata que simplify_polyline, pensada para dibujar a bajo zoom.
+
+    Args:
+        points: Arreglo (n, 2) de puntos
+        tolerance: Distancia máxima a un punto conservado
+
+    Returns:
+        numpy.ndarray: Arreglo (m, 2) con los puntos conservados
+    """
+    pts = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+    if len(pts) < 3 or tolerance <= 0:
+        return pts
+
+    cells = np.floor(pts * (math.sqrt(2) / tolerance))
+    keep = np.empty(len(pts), dtype=bool)
+    keep[0] = keep[-1] = True
+    np.any(cells[1:-1] != cells[:-2], axis=1, out=keep[1:-1])
+    return pts[keep]
+
+
+def simplify_polylines(polylines, tolerance):
+    """
+    Simplifica un lote de polilíneas e informa del resultado.
+
+    Args:
+        polylines: Iterable de polilíneas (secuencias de puntos)
+        tolerance: Desviación máxima permitida
+
+    Returns:
+        tuple: (simplified, removed, elapsed) con la lista de polilíneas
+        simplificadas (numpy.ndarray), el número de puntos eliminados y el
+        tiempo empleado en segundos
+    """
+    start = time.perf_counter()
+    simplified = []
+    removed = 0
+    for points in polylines:
+        result = simplify_polyline(points, tolerance)
+        removed += len(points) - len(result)
+        simplified.append(result)
+    return simplified, removed, time.perf_counter() - start
+
+
+def chain_polylines(polylines, tolerance):
+    """
+    Une en cadenas las polilíneas cuyos extremos coinciden.
+
+    Los extremos se agrupan en una rejilla hash de celdas de lado
+    tolerance. Primero se emparejan de forma vectorizada los pares que
+    comparten celda (el caso habitual: extremos idénticos en el archivo);
+    los extremos restantes buscan en las 3 × 3 celdas vecinas el extremo
+    libre más cercano a menos de tolerance. Cada extremo se une a lo sumo
+    a otro, así que en un cruce de tres o más piezas alguna queda como
+    extremo libre. El costo es casi lineal en el número de piezas.
+
+    Las piezas cuyos propios extremos coinciden ya son cerradas y no se
+    unen a otras.
+
+    Args:
+        polylines: Lista de arreglos (n, 2) con n >= 2
+        tolerance: Distancia máxima entre extremos que se consideran unidos
+
+    Returns:
+        list: (points, indices, closed) por cadena, ordenadas por su primer
+        índice: los puntos unidos (sin repetir los de cada unión; la misma
+        pieza si la cadena tiene una sola), los índices de las piezas que
+        la forman en orden de recorrido y si la cadena es un contorno cerrado
+
+    Raises:
+        ValueError: Si tolerance no es positiva (la rejilla no tendría celdas)
+    """
+    if not tolerance > 0:
+        raise ValueError(f"La tolerancia de unión debe ser positiva: {tolerance!r}")
+    m = len(polylines)
+    if m == 0:
+        return []
+
+    # Extremos sacados de una sola concatenación (indexar pieza por pieza es lento)
+    offsets = np.zeros(m + 1, dtype=np.int64)
+    np.cumsum([len(points) for points in polylines], out=offsets[1:])
+    all_points = np.concatenate(polylines).reshape(-1, 2)
+    ends = np.empty((2 * m, 2))
+    ends[0::2] = all_points[offsets[:-1]]
+    ends[1::2] = all_points[offsets[1:] - 1]
+
+    gaps = ends[0::2] - ends[1::2]
+    self_closed = np.hypot(gaps[:, 0], gaps[:, 1]) <= tolerance
+    mate = np.full(2 * m, -1, dtype=np.int64)
+
+    # Extremo 2i = inicio de la pieza i, 2i + 1 = su fin
+    free = np.flatnonzero(~np.repeat(self_closed, 2))
+    cells = np.floor(ends[free] / tolerance).astype(np.int64)
+
+    # 1) Pares que comparten celda
+    order = np.lexsort((cells[:, 1], cells[:, 0]))
+    sorted_cells = cells[order]
+    boundary = np.ones(len(order) + 1, dtype=bool)
+    boundary[1:-1] = np.any(sorted_cells[1:] != sorted_cells[:-1], axis=1)
+    group_starts = np.flatnonzero(boundary[:-1])
+    group_sizes = np.diff(np.flatnonzero(boundary))
+
+    pairs = group_starts[group_sizes == 2]
+    a = free[order[pairs]]
+    b = free[order[pairs + 1]]
+    gaps = ends[a] - ends[b]
+    close = np.hypot(gaps[:, 0], gaps[:, 1]) <= tolerance
+    mate[a[close]] = b[close]
+    mate[b[close]] = a[close]
+
+    # 2) Extremos sin pareja: búsqueda en las celdas vecinas
+    leftover = free[mate[free] < 0]
+    if len(leftover):
+        leftover_cells = np.floor(ends[leftover] / tolerance).astype(np.int64).tolist()
+        grid = {}
+        for endpoint, cell in zip(leftover.tolist(), leftover_cells):
+            grid.setdefault(tuple(cell), []).append(endpoint)
+
+        mate_list = mate.tolist()
+        end_list = ends.tolist()
+        tolerance_sq = tolerance * tolerance
+        for endpoint, (cx, cy) in zip(leftover.tolist(), leftover_cells):
+            if mate_list[endpoint] >= 0:
+                continue
+            x, y = end_list[endpoint]
+            best = -1
+            best_sq = tolerance_sq
+            for dx in (-1, 0, 1):
+                for dy in (-1, 0, 1):
+                    for other in grid.get((cx + dx, cy + dy), ()):
+                        if mate_list[other] >= 0 or other // 2 == endpoint // 2:
+                            continue
+                        ox, oy = end_list[other]
+                        dist_sq = (ox - x) ** 2 + (oy - y) ** 2
+                        if dist_sq <= best_sq:
+                            best, best_sq = other, dist_sq
+            if best >= 0:
+                mate_list[endpoint] = best
+                mate_list[best] = endpoint
+    else:
+        mate_list = mate.tolist()
+
+    # Recorrer las cadenas: primero las abiertas (desde un extremo libre),
+    # luego las cerradas sobre sí mismas y por último los ciclos
+    visited = bytearray(m)
+
+    def walk(endpoint):
+        route = []
+        while True:
+            piece = endpoint // 2
+            visited[piece] = 1
+            route.append((piece, endpoint % 2 == 1))
+            nxt = mate_list[endpoint ^ 1]
+            if nxt < 0:
+                return route, False
+            if visited[nxt // 2]:
+                return route, True
+            endpoint = nxt
+
+    routes = []
+    for endpoint in free.tolist():
+        if mate_list[endpoint] < 0 and not visited[endpoint // 2]:
+            routes.append(walk(endpoint))
+    for piece in np.flatnonzero(self_closed).tolist():
+        visited[piece] = 1
+        routes.append(([(piece, False)], True))
+    for piece in range(m):
+        if not visited[piece]:
+            routes.append(walk(2 * piece))
+
+    chains = []
+    for route, closed in routes:
+        indices = [piece for piece, _ in route]
+        if len(route) == 1:
+            points = polylines[indices[0]]
+        else:
+            parts = [polylines[piece][::-1] if reverse else polylines[piece]
+                     for piece, reverse in route]
+            points = np.concatenate([parts[0]] + [part[1:] for part in parts[1:]])
+            if closed:
+                points[-1] = points[0]
+        chains.append((points, indices, closed))
+
+    chains.sort(key=lambda chain: min(chain[1]))
+    return chains
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Historial de deshacer/rehacer del editor de trazos
+Guarda cada acción sobre el dibujo como una lista de empalmes, independiente
+de Tkinter:
+
+    (lista, índice, quitados, agregados)
+
+con lista STROKES o SHAPES: la acción reemplazó lista[índice:índice +
+len(quitados)] por agregados. Deshacer aplica los empalmes inversos en
+orden contrario; rehacer los vuelve a aplicar.
+
+Los trazos y formas se guardan por referencia: el historial comparte los
+arreglos de puntos con el dibujo y nunca los copia (los trazos no se
+modifican en el lugar, se reemplazan), así que limpiar un dibujo enorme
+cuesta una tupla de referencias, no una copia de sus puntos.
+
+Una acción puede llevar además un dato opaco (memo) del editor, que se le
+devuelve al deshacerla o rehacerla: por ejemplo, el índice espacial del
+dibujo limpiado, para no reconstruirlo al deshacer.
+
+El historial tiene un tope de memoria: cada acción cuenta los bytes de los
+puntos que referencia más un costo fijo por objeto (una cota superior de lo
+que mantiene vivo fuera del dibujo) y los bytes declarados de su memo. Al
+superarlo se olvidan las acciones más viejas; la última siempre se conserva.
+"""
+
+from collections import deque
+
+from modelo import Stroke
+
+
+# Listas del dibujo a las que apunta un empalme
+STROKES = "strokes"
+SHAPES = "shapes"
+
+# Tope de memoria por defecto del historial
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Costo fijo estimado de cada trazo o forma referenciado (objeto, diccionario
+# o arreglo vacío y la referencia en la tupla)
+ITEM_BYTES = 256
+
+
+class History:
+    """
+    Pilas de deshacer y rehacer con tope de memoria.
+
+    Las acciones se anotan con record() después de aplicarlas al dibujo;
+    entre begin() y end() todos los empalmes forman una sola acción (por
+    ejemplo, una pasada del borrador).
+    """
+
+    __slots__ = ("max_bytes", "bytes", "_undo", "_redo", "_group")
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        Args:
+            max_bytes: Memoria máxima estimada de las acciones guardadas
+        """
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._undo = deque()  # (empalmes, memo, costo), la más reciente al final
+        self._redo = []  # (empalmes, memo, costo), la próxima a rehacer al final
+        self._group = None  # Empalmes de la acción en curso, o None
+
+    @property
+    def can_undo(self):
+        """True si hay una acción para deshacer."""
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        """True si hay una acción para rehacer."""
+        return bool(self._redo)
+
+    def record(self, target, index, removed, inserted):
+        """
+        Anota un empalme ya aplicado al dibujo.
+
+        Fuera de begin()/end() forma una acción por sí solo. Anotar una
+        acción descarta lo que se podía rehacer.
+
+        Args:
+            target: STROKES o SHAPES
+            index: Posición del empalme en la lista
+            removed: Objetos que se quitaron de la lista
+            inserted: Objetos que se pusieron en su lugar
+        """
+        splice = (target, index, tuple(removed), tuple(inserted))
+        if not splice[2] and not splice[3]:
+            return
+        if self._group is not None:
+            self._group.append(splice)
+        else:
+            self._push([splice])
+
+    def begin(self):
+        """Empieza una acción compuesta por varios empalmes."""
+        if self._group is None:
+            self._group = []
+
+    def end(self, memo=None, memo_bytes=0):
+        """
+        Cierra la acción compuesta en curso (nada si quedó vacía).
+
+        Args:
+            memo: Dato del editor que se devuelve al deshacer o rehacer la acción
+            memo_bytes: Memoria estimada del memo, para el tope
+        """
+        group, self._group = self._group, None
+        if group:
+            self._push(group, memo, memo_bytes)
+
+    def undo(self, strokes, shapes):
+        """
+        Deshace la última acción sobre las listas del dibujo.
+
+        Args:
+            strokes: Lista de trazos del dibujo, que se modifica en el lugar
+            shapes: Lista de formas del dibujo, que se modifica en el lugar
+
+        Returns:
+            tuple: (splices, memo) con los empalmes aplicados (lista, índice,
+            quitados, agregados) y el memo de la acción, o None si no había
+            nada que deshacer
+        """
+        self.end()
+        if not self._undo:
+            return None
+        action = self._undo.pop()
+        self._redo.append(action)
+        splices, memo, _ = action
+        splices = [(target, index, inserted, removed)
+                   for target, index, removed, inserted in reversed(splices)]
+        _apply(splices, strokes, shapes)
+        return splices, memo
+
+    def redo(self, strokes, shapes):
+        """
+        Rehace la última acción deshecha (ver undo).
+
+        Returns:
+            tuple: (splices, memo), o None si no había nada que rehacer
+        """
+        self.end()
+        if not self._redo:
+            return None
+        action = self._redo.pop()
+        self._undo.append(action)
+        splices, memo, _ = action
+        _apply(splices, strokes, shapes)
+        return splices, memo
+
+    def clear(self):
+        """Olvida todas las acciones (por ejemplo, al abrir otro dibujo)."""
+        self._undo.clear()
+        self._redo.clear()
+        self._group = None
+        self.bytes = 0
+
+    def _push(self, splices, memo=None, memo_bytes=0):
+        """Guarda una acción nueva y respeta el tope de memoria."""
+        for _, _, cost in self._redo:
+            self.bytes -= cost
+        self._redo.clear()
+
+        cost = memo_bytes + sum(_item_bytes(item)
+                                for _, _, removed, inserted in splices
+                                for item in removed + inserted)
+        self._undo.append((splices, memo, cost))
+        self.bytes += cost
+        while self.bytes > self.max_bytes and len(self._undo) > 1:
+            _, _, oldest = self._undo.popleft()
+            self.bytes -= oldest
+
+
+def _apply(splices, strokes, shapes):
+    """Aplica empalmes (lista, índice, quitados, agregados) a las listas del dibujo."""
+    for target, index, removed, inserted in splices:
+        items = strokes if target == STROKES else shapes
+        items[index:index + len(removed)] = inserted
+
+
+def _item_bytes(item):
+    """Memoria estimada de un trazo o forma referenciado por el historial."""
+    if isinstance(item, Stroke):
+        return ITEM_BYTES + item.points.nbytes
+    return ITEM_BYTES
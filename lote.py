@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Conversión de dibujos por lotes
+Convierte directorios completos de dibujos (DXF, proyectos o JSON del editor) sin
+interfaz, repartiendo los archivos entre procesos: uno por núcleo.
+
+Cada archivo se lee (uniendo las piezas contiguas de los DXF), se
+simplifica y se ordena el recorrido si se pide, y se escribe en el formato
+elegido: G-code, ángulos de articulación, DXF, proyecto o JSON del editor. Un
+archivo con errores no detiene el lote.
+
+Uso:
+    python lote.py dibujos/ -o salida/ --formato gcode --optimizar
+    python lote.py a.dxf b.json -o salida/ --formato json --tolerancia 0.05
+    python lote.py dibujos/ -o salida/ --formato dxf --ajustar-arcos
+    python lote.py viejos/ -o proyectos/ --formato proyecto
+"""
+
+import argparse
+import concurrent.futures
+import functools
+import json
+import os
+import sys
+import time
+
+from archivo_dxf import CHAIN_TOLERANCE, FIT_TOLERANCE, load_dxf, save_dxf
+from cache_dxf import ImportCache, default_cache_dir
+from geometria import simplify_polyline
+from modelo import drawing_from_dict, drawing_to_dict
+from proyecto import PROJECT_SUFFIX, load_project, save_project
+from trabajo import (DEFAULT_CANVAS_SIZE, add_arm_arguments, arm_planner, drawing_order,
+                     drawing_paths, job_chunks, ordered_paths, write_job)
+
+
+# Extensión de salida de cada formato
+OUTPUT_SUFFIXES = {
+    "gcode": ".gcode",
+    "articulaciones": ".csv",
+    "dxf": ".dxf",
+    "json": ".json",
+    "proyecto": PROJECT_SUFFIX,
+}
+FORMATS = tuple(OUTPUT_SUFFIXES)
+
+# Archivos de entrada reconocidos
+INPUT_SUFFIXES = (".dxf", ".json", PROJECT_SUFFIX)
+
+# Tiempo máximo para optimizar el orden de los trazos de cada archivo
+ORDER_TIME_BUDGET = 2.0  # s
+
+
+def find_drawings(inputs, recursive=False):
+    """
+    Busca los dibujos a convertir.
+
+    Args:
+        inputs: Rutas de archivos o directorios
+        recursive: Recorrer también los subdirectorios
+
+    Returns:
+        list: Pares (ruta, relativa) con la ruta relativa al directorio de
+        entrada (o el nombre, para archivos sueltos), ordenados por ruta
+    """
+    found = []
+    for path in inputs:
+        if not os.path.isdir(path):
+            found.append((path, os.path.basename(path)))
+            continue
+
+        for folder, subfolders, files in os.walk(path):
+            if not recursive:
+                subfolders.clear()
+            for name in files:
+                if name.lower().endswith(INPUT_SUFFIXES):
+                    full = os.path.join(folder, name)
+                    found.append((full, os.path.relpath(full, path)))
+
+    return sorted(found)
+
+
+def load_drawing(filename, tolerance=None, chain_tolerance=CHAIN_TOLERANCE, cache=None):
+    """
+    Lee un dibujo DXF, proyecto o JSON del editor.
+
+    Args:
+        filename: Ruta del archivo (.dxf, .trazos o .json)
+        tolerance: Tolerancia de simplificación de los trazos en mm, o None
+        chain_tolerance: Tolerancia para unir piezas contiguas de un DXF, o None
+        cache: cache_dxf.ImportCache para los DXF, o None
+
+    Returns:
+        tuple: (strokes, shapes, canvas_size) con canvas_size (ancho, alto) en cm
+
+    Raises:
+        ValueError: Si el formato no se reconoce o el archivo no es válido
+    """
+    if filename.lower().endswith(".dxf"):
+        return load_dxf(filename, tolerance, chain_tolerance, cache)
+    if filename.lower().endswith(PROJECT_SUFFIX):
+        strokes, shapes, canvas_size = load_project(filename)
+    elif filename.lower().endswith(".json"):
+        with open(filename, "r", encoding="utf-8") as f:
+            strokes, shapes, canvas_size = drawing_from_dict(json.load(f))
+    else:
+        raise ValueError(f"Formato de entrada no reconocido: {filename}")
+    if tolerance is not None:
+        strokes = [stroke.copy_with(simplify_polyline(stroke.points, tolerance))
+                   for stroke in strokes]
+    return strokes, shapes, canvas_size or DEFAULT_CANVAS_SIZE
+
+
+def convert_file(source, target, fmt="gcode", tolerance=None, optimize=False,
+                 chain_tolerance=CHAIN_TOLERANCE, offset=(0.0, 0.0), scale=1.0, feed=1500.0,
+                 planner=None, time_budget=ORDER_TIME_BUDGET, fit_tolerance=None,
+                 cache_dir=None):
+    """
+    Convierte un dibujo a otro formato.
+
+    Args:
+        source: Archivo de entrada (.dxf, .trazos o .json)
+        target: Archivo de salida
+        fmt: Uno de FORMATS
+        tolerance: Tolerancia de simplificación en mm, o None
+        optimize: Reordenar los trazos para acortar los trayectos sin dibujar
+            (no cambia el orden de los JSON ni de los proyectos)
+        chain_tolerance: Tolerancia para unir piezas contiguas de un DXF, o None
+        offset, scale, feed: Transformación y avance del G-code (ver trabajo.job_chunks)
+        planner: TrajectoryPlanner, requerido para "articulaciones"
+        time_budget: Segundos para optimizar el recorrido
+        fit_tolerance: Ajustar los trazos del DXF con rectas y arcos con esta
+            desviación máxima en mm, o None
+        cache_dir: Directorio de la cache de importación (ver
+            cache_dxf.ImportCache), o None para no usarla
+
+    Returns:
+        tuple: (before, after) con el recorrido sin dibujar en mm antes y
+        después de optimizar, o None si no se optimizó
+
+    Raises:
+        ValueError: Si el formato no es válido o el dibujo no se puede leer
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no válido: {fmt!r}")
+
+    cache = ImportCache(cache_dir) if cache_dir is not None else None
+    strokes, shapes, canvas_size = load_drawing(source, tolerance, chain_tolerance, cache)
+    strokes_mm = [stroke.points for stroke in strokes if stroke.type == 'brush']
+
+    order = travel = None
+    if optimize and fmt not in ("json", "proyecto"):
+        order, before, after, _ = drawing_order(strokes_mm, shapes, time_budget)
+        travel = (before, after)
+
+    try:
+        if fmt == "json":
+            with open(target, "w", encoding="utf-8") as f:
+                json.dump(drawing_to_dict(strokes, shapes, canvas_size), f,
+                          indent=2, ensure_ascii=False)
+        elif fmt == "proyecto":
+            save_project(target, strokes, shapes, canvas_size)
+        elif fmt == "dxf":
+            save_dxf(target, strokes, shapes, order=order, fit_tolerance=fit_tolerance)
+        else:
+            if order is None:
+                paths = drawing_paths(strokes, shapes)
+            else:
+                paths = ordered_paths(strokes_mm, shapes, order)
+            write_job(job_chunks(paths, fmt, offset, scale, None, feed, planner, canvas_size),
+                      target)
+    except BaseException:
+        # No dejar un archivo a medio escribir
+        if os.path.exists(target):
+            os.remove(target)
+        raise
+
+    return travel
+
+
+def convert_all(jobs, workers=None, **options):
+    """
+    Convierte muchos dibujos en paralelo con un pool de procesos.
+
+    Cada archivo es una tarea independiente; el trabajo (lectura,
+    aplanado, simplificación, orden y escritura) es de CPU, así que los
+    procesos escalan con los núcleos sin competir por el GIL.
+
+    Args:
+        jobs: Iterable de pares (origen, destino)
+        workers: Procesos a usar; None para uno por núcleo y 1 para
+            convertir en este mismo proceso
+        **options: Argumentos de convert_file
+
+    Yields:
+        tuple: (source, target, travel, error, elapsed) a medida que termina
+        cada archivo, con error None o el texto del error
+    """
+    convert = functools.partial(_timed_convert, **options)
+    if workers == 1:
+        for source, target in jobs:
+            yield convert(source, target)
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(convert, source, target) for source, target in jobs]
+        for future in concurrent.futures.as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    """Convierte dibujos por lotes desde la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Convierte directorios de dibujos (DXF, proyectos o JSON del editor) en paralelo.")
+    parser.add_argument("entradas", nargs="+", help="archivos o directorios de entrada")
+    parser.add_argument("-o", "--salida", required=True, help="directorio de salida")
+    parser.add_argument("--formato", choices=FORMATS, default="gcode")
+    parser.add_argument("-r", "--recursivo", action="store_true",
+                        help="incluir los subdirectorios de las entradas")
+    parser.add_argument("--procesos", type=int, default=None,
+                        help="procesos en paralelo (por defecto, uno por núcleo)")
+    parser.add_argument("--tolerancia", type=float, default=None,
+                        help="simplificar los trazos con esta tolerancia (mm)")
+    parser.add_argument("--optimizar", action="store_true",
+                        help="ordenar los trazos para acortar los trayectos sin dibujar")
+    parser.add_argument("--ajustar-arcos", type=float, nargs="?", const=FIT_TOLERANCE,
+                        default=None, metavar="TOL",
+                        help="DXF: reemplazar los puntos de los trazos por rectas y arcos "
+                             f"(desviación máxima en mm, por defecto {FIT_TOLERANCE})")
+    parser.add_argument("--cache", nargs="?", const="", default=None, metavar="DIR",
+                        help="guardar y reutilizar los DXF ya aplanados "
+                             "(por defecto en el directorio de cache del usuario)")
+    parser.add_argument("--sin-unir", action="store_true",
+                        help="no unir las piezas contiguas de los DXF")
+    parser.add_argument("--origen", type=float, nargs=2, default=(0.0, 0.0), metavar=("X", "Y"),
+                        help="posición de la máquina para la esquina inferior izquierda "
+                             "de la hoja (mm)")
+    parser.add_argument("--escala", type=float, default=1.0)
+    parser.add_argument("--avance", type=float, default=1500.0,
+                        help="velocidad de dibujo del G-code (mm/min)")
+    add_arm_arguments(parser)
+    args = parser.parse_args(argv)
+
+    drawings = find_drawings(args.entradas, args.recursivo)
+    if not drawings:
+        print("No se encontraron dibujos", file=sys.stderr)
+        return 1
+
+    suffix = OUTPUT_SUFFIXES[args.formato]
+    jobs = []
+    for source, relative in drawings:
+        target = os.path.join(args.salida, os.path.splitext(relative)[0] + suffix)
+        os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+        jobs.append((source, target))
+
+    planner = arm_planner(args) if args.formato == "articulaciones" else None
+    t0 = time.perf_counter()
+    failed = 0
+    results = convert_all(jobs, args.procesos, fmt=args.formato, tolerance=args.tolerancia,
+                          optimize=args.optimizar,
+                          chain_tolerance=None if args.sin_unir else CHAIN_TOLERANCE,
+                          offset=args.origen, scale=args.escala, feed=args.avance,
+                          planner=planner, fit_tolerance=args.ajustar_arcos,
+                          cache_dir=None if args.cache is None else args.cache or default_cache_dir())
+    for done, (source, target, travel, error, elapsed) in enumerate(results, start=1):
+        prefix = f"[{done}/{len(jobs)}] {source}"
+        if error is not None:
+            failed += 1
+            print(f"{prefix}: error: {error}", file=sys.stderr)
+            continue
+        line = f"{prefix} → {target} ({elapsed:.2f} s"
+        if travel is not None:
+            line += f", recorrido sin dibujar {travel[0]:.0f} → {travel[1]:.0f} mm"
+        print(line + ")", file=sys.stderr)
+
+    print(f"{len(jobs) - failed} convertidos, {failed} con errores "
+          f"en {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+    return 1 if failed else 0
+
+
+def _timed_convert(source, target, **options):
+    """Convierte un archivo para convert_all, capturando su error y su tiempo."""
+    t0 = time.perf_counter()
+    if os.path.abspath(source) == os.path.abspath(target):
+        return source, target, None, "la salida reemplazaría a la entrada", 0.0
+    try:
+        travel = convert_file(source, target, **options)
+    except Exception as e:
+        return source, target, None, str(e) or type(e).__name__, time.perf_counter() - t0
+    return source, target, travel, None, time.perf_counter() - t0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Modelo de datos del editor de trazos
+Contenedores compactos para la geometría del dibujo, independientes de Tkinter.
+
+Los puntos de cada trazo se guardan en un arreglo contiguo de NumPy de forma
+(n, 2) y tipo float64 (16 bytes por punto, frente a más de 100 bytes de una
+lista de tuplas). Las conversiones de unidades, la inversión del eje Y y el
+cálculo de bounding boxes son operaciones vectorizadas sobre esos arreglos.
+"""
+
+import math
+
+import numpy as np
+
+from geometria import FLATTENING_DISTANCE, arc_points
+
+
+def as_points_array(points):
+    """
+    Convierte una secuencia de puntos en un arreglo contiguo (n, 2) float64.
+
+    No copia los datos si points ya es un arreglo con ese formato.
+    """
+    return np.ascontiguousarray(points, dtype=np.float64).reshape(-1, 2)
+
+
+def points_bbox(points):
+    """
+    Calcula el bounding box de un arreglo de puntos.
+
+    Returns:
+        tuple: (min_x, min_y, max_x, max_y), o None si no hay puntos
+    """
+    if len(points) == 0:
+        return None
+    min_x, min_y = points.min(axis=0)
+    max_x, max_y = points.max(axis=0)
+    return float(min_x), float(min_y), float(max_x), float(max_y)
+
+
+def px_to_mm(points, pixels_per_mm):
+    """
+    Convierte puntos de canvas (px, Y hacia abajo) a mm con Y hacia arriba.
+
+    Args:
+        points: Arreglo (n, 2) en píxeles
+        pixels_per_mm: Factor de conversión px/mm
+
+    Returns:
+        numpy.ndarray: Nuevo arreglo (n, 2) en mm
+    """
+    result = points / pixels_per_mm
+    result[:, 1] *= -1
+    return result
+
+
+def shape_outline(shape_data, tolerance=FLATTENING_DISTANCE):
+    """
+    Calcula el contorno de una forma como polilínea.
+
+    Args:
+        shape_data: Forma con "type", "start" y "end"
+        tolerance: Error de cuerda máximo (mm) al aproximar un círculo
+
+    Returns:
+        list: Puntos (x, y) del contorno (vacío si el tipo no es conocido)
+    """
+    x1, y1 = shape_data["start"]
+    x2, y2 = shape_data["end"]
+    shape_type = shape_data["type"]
+
+    if shape_type == "line":
+        return [(x1, y1), (x2, y2)]
+    elif shape_type == "rectangle":
+        return [(x1, y1), (x2, y1), (x2, y2), (x1, y2), (x1, y1)]
+    elif shape_type == "triangle":
+        mid_x = (x1 + x2) / 2
+        return [(mid_x, y1), (x1, y2), (x2, y2), (mid_x, y1)]
+    elif shape_type == "circle":
+        radius = math.sqrt((x2 - x1)**2 + (y2 - y1)**2)
+        return [tuple(point) for point in
+                arc_points((x1, y1), radius, 0.0, 2 * math.pi, tolerance).tolist()]
+    return []
+
+
+def drawing_from_dict(data, pixels_per_mm=None):
+    """
+    Lee un dibujo en el formato JSON del editor.
+
+    Los trazos y formas a los que les faltan claves se omiten. Los archivos
+    sin "units" son del formato antiguo, con coordenadas de canvas en px.
+
+    Args:
+        data: Objeto JSON ya decodificado
+        pixels_per_mm: Factor para convertir archivos antiguos, o None para
+            rechazarlos
+
+    Returns:
+        tuple: (strokes, shapes, canvas_size) con canvas_size como
+        (ancho_cm, alto_cm) o None si el archivo no lo indica
+
+    Raises:
+        ValueError: Si data no es un objeto, si los puntos no son pares de
+            números o si el archivo está en px y no se indicó pixels_per_mm
+    """
+    if not isinstance(data, dict):
+        raise ValueError("El archivo JSON debe contener un objeto")
+
+    canvas_size = None
+    size = data.get("canvas_size")
+    if isinstance(size, dict) and "width_cm" in size and "height_cm" in size:
+        canvas_size = (size["width_cm"], size["height_cm"])
+
+    legacy_px = data.get("units") != "mm"
+    if legacy_px and pixels_per_mm is None:
+        raise ValueError("El archivo está en píxeles (formato antiguo); "
+                         "ábralo y guárdelo de nuevo con el editor")
+
+    strokes = []
+    for stroke in data.get("strokes", []):
+        if not isinstance(stroke, dict):
+            continue
+        if not all(key in stroke for key in ["points", "color", "width"]):
+            continue
+
+        stroke_data = Stroke.from_dict(stroke)
+        if legacy_px:
+            stroke_data.points = px_to_mm(stroke_data.points, pixels_per_mm)
+        strokes.append(stroke_data)
+
+    shapes = []
+    for shape in data.get("shapes", []):
+        if not isinstance(shape, dict):
+            continue
+        if not all(key in shape for key in ["type", "start", "end", "color", "width"]):
+            continue
+
+        # Copia por forma: el objeto decodificado no se modifica
+        if legacy_px:
+            (x1, y1), (x2, y2) = shape["start"], shape["end"]
+            shape = dict(shape, start=(x1 / pixels_per_mm, -y1 / pixels_per_mm),
+                         end=(x2 / pixels_per_mm, -y2 / pixels_per_mm))
+        else:
+            shape = dict(shape)
+        shapes.append(shape)
+
+    return strokes, shapes, canvas_size
+
+
+def drawing_to_dict(strokes, shapes, canvas_size):
+    """
+    Arma el objeto JSON del editor para un dibujo (inverso de drawing_from_dict).
+
+    Args:
+        strokes: Trazos del dibujo
+        shapes: Formas del dibujo
+        canvas_size: (ancho_cm, alto_cm) del lienzo
+
+    Returns:
+        dict: Objeto listo para json.dump
+    """
+    width_cm, height_cm = canvas_size
+    return {
+        "canvas_size": {
+            "width_cm": width_cm,
+            "height_cm": height_cm
+        },
+        "units": "mm",
+        "strokes": [stroke.to_dict() for stroke in strokes],
+        "shapes": shapes
+    }
+
+
+class Stroke:
+    """Trazo libre cuyos puntos viven en un arreglo contiguo de NumPy."""
+
+    __slots__ = ("type", "points", "color", "width")
+
+    def __init__(self, points, color, width, type="brush"):
+        """
+        Crea un trazo.
+
+        Args:
+            points: Secuencia de puntos (x, y) o arreglo (n, 2)
+            color: Color hexadecimal del trazo
+            width: Grosor del trazo en píxeles
+            type: Tipo de trazo (por compatibilidad con el formato JSON)
+        """
+        self.type = type
+        self.points = as_points_array(points)
+        self.color = color
+        self.width = width
+
+    def __len__(self):
+        return len(self.points)
+
+    def __repr__(self):
+        return f"Stroke({len(self.points)} puntos, color={self.color!r}, width={self.width!r})"
+
+    def copy_with(self, points):
+        """Devuelve un trazo con el mismo estilo y otros puntos."""
+        return Stroke(points, self.color, self.width, self.type)
+
+    def bbox(self):
+        """Bounding box del trazo (min_x, min_y, max_x, max_y) o None."""
+        return points_bbox(self.points)
+
+    def to_dict(self):
+        """Serializa el trazo al formato JSON del editor."""
+        return {
+            "type": self.type,
+            "points": self.points.tolist(),
+            "color": self.color,
+            "width": self.width
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Crea un trazo desde el formato JSON del editor.
+
+        Raises:
+            KeyError: Si faltan las claves "points", "color" o "width"
+            ValueError: Si los puntos no son pares de números
+        """
+        return cls(data["points"], data["color"], data["width"],
+                   data.get("type", "brush"))
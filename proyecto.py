@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Formato binario de proyecto del editor de trazos
+Guarda y abre dibujos completos sin pasar por texto, independiente de
+Tkinter. Un proyecto es un único archivo:
+
+    MAGIC | largo de la cabecera (uint32) | cabecera JSON | relleno
+    | tabla de trazos | tabla de formas | relleno
+    | coordenadas (float64 o float32, N × 2)
+
+La cabecera lleva el tamaño del lienzo, el tipo de las coordenadas, los
+contadores y las tablas de textos (colores y tipos) a las que apuntan los
+índices de las tablas. Todas las secciones están alineadas a 8 bytes.
+
+Al abrir, el archivo se mapea con mmap: con coordenadas float64 los
+puntos de cada trazo son vistas de sólo lectura sobre el mapa, sin copias
+ni conversión de texto. El formato JSON sigue disponible para importar y
+exportar (ver modelo.drawing_from_dict).
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from modelo import Stroke
+
+
+# Identificador y versión del formato
+MAGIC = b"TRAZOS\0\1"
+FORMAT_VERSION = 1
+
+# Extensión de los proyectos
+PROJECT_SUFFIX = ".trazos"
+
+# Tipos de coordenadas admitidos: float64 se abre sin copias, float32
+# ocupa la mitad (con unos 7 dígitos significativos: 0,01 µm a 100 m)
+COORDINATE_TYPES = {"float64": "<f8", "float32": "<f4"}
+
+_HEADER_SIZE = struct.Struct("<I")
+
+_STROKE_TABLE = np.dtype([("offset", "<i8"), ("count", "<i8"), ("width", "<f8"),
+                          ("color", "<u2"), ("type", "<u2"), ("_pad", "<u4")])
+_SHAPE_TABLE = np.dtype([("start", "<f8", 2), ("end", "<f8", 2), ("width", "<f8"),
+                         ("color", "<u2"), ("type", "<u2"), ("_pad", "<u4")])
+
+
+def save_project(filename, strokes, shapes, canvas_size, coordinates="float64"):
+    """
+    Guarda un dibujo en el formato de proyecto.
+
+    Se escribe en un archivo temporal que luego reemplaza al definitivo:
+    un proyecto abierto (mapeado en memoria) no se trunca al guardarlo
+    encima.
+
+    Args:
+        filename: Ruta del proyecto
+        strokes: Trazos del dibujo
+        shapes: Formas del dibujo (diccionarios con "type", "start",
+            "end", "color" y "width")
+        canvas_size: (ancho_cm, alto_cm) del lienzo
+        coordinates: "float64" o "float32"
+
+    Returns:
+        int: Bytes escritos
+
+    Raises:
+        ValueError: Si coordinates no es un tipo admitido
+    """
+    if coordinates not in COORDINATE_TYPES:
+        raise ValueError(f"Tipo de coordenadas no válido: {coordinates!r}")
+    dtype = np.dtype(COORDINATE_TYPES[coordinates])
+
+    colors = {}
+    types = {}
+    stroke_table = np.zeros(len(strokes), dtype=_STROKE_TABLE)
+    counts = [len(stroke.points) for stroke in strokes]
+    offsets = np.zeros(len(strokes) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    stroke_table["offset"] = offsets[:-1]
+    stroke_table["count"] = counts
+    stroke_table["width"] = [stroke.width for stroke in strokes]
+    stroke_table["color"] = [colors.setdefault(stroke.color, len(colors)) for stroke in strokes]
+    stroke_table["type"] = [types.setdefault(stroke.type, len(types)) for stroke in strokes]
+
+    shape_table = np.zeros(len(shapes), dtype=_SHAPE_TABLE)
+    shape_table["start"] = [shape["start"] for shape in shapes] if shapes else np.empty((0, 2))
+    shape_table["end"] = [shape["end"] for shape in shapes] if shapes else np.empty((0, 2))
+    shape_table["width"] = [shape["width"] for shape in shapes]
+    shape_table["color"] = [colors.setdefault(shape["color"], len(colors)) for shape in shapes]
+    shape_table["type"] = [types.setdefault(shape["type"], len(types)) for shape in shapes]
+
+    width_cm, height_cm = canvas_size
+    header = json.dumps({
+        "version": FORMAT_VERSION,
+        "canvas_size": {"width_cm": width_cm, "height_cm": height_cm},
+        "units": "mm",
+        "coordinates": coordinates,
+        "strokes": len(strokes),
+        "shapes": len(shapes),
+        "points": int(offsets[-1]),
+        "colors": list(colors),
+        "types": list(types),
+    }, ensure_ascii=False).encode("utf-8")
+
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, temp = tempfile.mkstemp(suffix=".tmp", dir=directory)
+    try:
+        # mkstemp crea el archivo sólo para el usuario; el proyecto lleva
+        # los permisos habituales (según la umask)
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp, 0o666 & ~umask)
+        with os.fdopen(fd, "wb") as f:
+            f.write(MAGIC)
+            f.write(_HEADER_SIZE.pack(len(header)))
+            f.write(header)
+            _pad(f)
+            f.write(stroke_table.tobytes())
+            f.write(shape_table.tobytes())
+            for stroke in strokes:
+                f.write(np.ascontiguousarray(stroke.points, dtype=dtype).tobytes())
+            size = f.tell()
+        os.replace(temp, filename)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+    return size
+
+
+def load_project(filename):
+    """
+    Abre un proyecto mapeándolo en memoria.
+
+    Args:
+        filename: Ruta del proyecto
+
+    Returns:
+        tuple: (strokes, shapes, canvas_size) como modelo.drawing_from_dict;
+        con coordenadas float64 los puntos de los trazos son vistas de sólo
+        lectura sobre el archivo (los trazos se reemplazan al editarlos,
+        nunca se modifican en el lugar)
+
+    Raises:
+        ValueError: Si el archivo no es un proyecto válido
+    """
+    with open(filename, "rb") as f:
+        try:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise ValueError(f"El proyecto está vacío: {filename}") from None
+
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"No es un proyecto del editor: {filename}")
+    position = len(MAGIC)
+    (header_size,) = _HEADER_SIZE.unpack_from(data, position)
+    position += _HEADER_SIZE.size
+    header = json.loads(bytes(data[position:position + header_size]))
+    if header.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Versión de proyecto no soportada: {header.get('version')!r}")
+    position = _aligned(position + header_size)
+
+    stroke_table = np.frombuffer(data, _STROKE_TABLE, header["strokes"], position)
+    position += stroke_table.nbytes
+    shape_table = np.frombuffer(data, _SHAPE_TABLE, header["shapes"], position)
+    position += shape_table.nbytes
+    dtype = np.dtype(COORDINATE_TYPES[header["coordinates"]])
+    points = np.frombuffer(data, dtype, 2 * header["points"], position).reshape(-1, 2)
+
+    colors = header["colors"]
+    types = header["types"]
+    strokes = []
+    for offset, count, width, color, kind in zip(
+            stroke_table["offset"].tolist(), stroke_table["count"].tolist(),
+            stroke_table["width"].tolist(), stroke_table["color"].tolist(),
+            stroke_table["type"].tolist()):
+        strokes.append(Stroke(points[offset:offset + count], colors[color],
+                              _number(width), types[kind]))
+
+    shapes = [{"type": types[kind], "start": tuple(start), "end": tuple(end),
+               "color": colors[color], "width": _number(width)}
+              for start, end, width, color, kind in zip(
+                  shape_table["start"].tolist(), shape_table["end"].tolist(),
+                  shape_table["width"].tolist(), shape_table["color"].tolist(),
+                  shape_table["type"].tolist())]
+
+    size = header["canvas_size"]
+    return strokes, shapes, (size["width_cm"], size["height_cm"])
+
+
+def _number(value):
+    """Devuelve los anchos enteros como int, igual que en el JSON del editor."""
+    return int(value) if value.is_integer() else value
+
+
+def _aligned(position, alignment=8):
+    """Siguiente posición múltiplo de alignment."""
+    return -(-position // alignment) * alignment
+
+
+def _pad(f, alignment=8):
+    """Rellena con ceros hasta la siguiente posición múltiplo de alignment."""
+    position = f.tell()
+    f.write(b"\0" * (_aligned(position, alignment) - position))
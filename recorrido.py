@@ -0,0 +1,431 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Orden de recorrido de trazos
+Optimización del orden y sentido en que se dibujan los trazos para reducir
+los desplazamientos con la herramienta levantada, independiente de Tkinter.
+
+Contenido:
+- Rejilla uniforme de puntos con bajas, para vecinos más cercanos
+- Distancia total con la herramienta levantada de un recorrido
+- Ordenamiento: vecino más cercano + mejoras 2-opt y Or-opt con tiempo límite
+
+Cada trazo se reduce a sus extremos (inicio, fin) y puede recorrerse en
+cualquier sentido. Un recorrido es una lista de índices de trazo más un
+indicador por posición de si ese trazo se recorre invertido.
+"""
+
+import math
+import time
+
+import numpy as np
+
+
+# Largo máximo (en trazos) de un tramo invertido por 2-opt: invertir cuesta
+# O(largo) en Python y los tramos largos casi nunca son los que mejoran
+MAX_REVERSAL = 1000
+
+
+class PointGrid:
+    """
+    Rejilla uniforme sobre un conjunto fijo de puntos, con bajas.
+
+    Las consultas recorren anillos de celdas alrededor del punto buscado y
+    se detienen cuando ningún anillo sin visitar puede tener un punto más
+    cercano; si el vecindario está vacío (quedan pocos puntos y lejanos) se
+    recurre a una búsqueda vectorizada sobre los puntos restantes.
+    """
+
+    MAX_RINGS = 3  # Anillos a recorrer antes de la búsqueda exhaustiva
+
+    # Desplazamientos (dx, dy) de las celdas de cada anillo
+    RING_OFFSETS = [
+        [(dx, dy) for dx in range(-ring, ring + 1) for dy in range(-ring, ring + 1)
+         if max(abs(dx), abs(dy)) == ring]
+        for ring in range(MAX_RINGS + 1)
+    ]
+
+    def __init__(self, points, cell_size=None):
+        """
+        Indexa los puntos.
+
+        Args:
+            points: Arreglo (n, 2) de puntos
+            cell_size: Lado de celda; por defecto, el que deja ~2 puntos por celda
+        """
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        n = len(self.points)
+        if cell_size is None:
+            if n:
+                span = self.points.max(axis=0) - self.points.min(axis=0)
+                cell_size = math.sqrt(max(span[0] * span[1], 1e-12) * 2 / n)
+                cell_size = max(cell_size, float(span.max()) / 4096, 1e-6)
+            else:
+                cell_size = 1.0
+        self.cell_size = float(cell_size)
+        self._xs = self.points[:, 0].tolist()  # Acceso escalar rápido
+        self._ys = self.points[:, 1].tolist()
+        self._alive = np.ones(n, dtype=bool)
+        self._alive_index = np.arange(n)  # Superconjunto de los vigentes, se compacta al vaciarse
+        self._count = n
+
+        self._cells = {}
+        self._cell_of = list(map(tuple, np.floor(self.points / self.cell_size).astype(np.int64).tolist()))
+        for index, cell in enumerate(self._cell_of):
+            self._cells.setdefault(cell, []).append(index)
+
+    def __len__(self):
+        return self._count
+
+    def remove(self, index):
+        """Da de baja un punto (no hace nada si ya estaba dado de baja)."""
+        if not self._alive[index]:
+            return
+        self._alive[index] = False
+        self._count -= 1
+        self._cells[self._cell_of[index]].remove(index)
+
+    def nearest(self, x, y, k=1):
+        """
+        Busca los k puntos vigentes más cercanos a (x, y).
+
+        Returns:
+            list: Índices ordenados por distancia (menos de k si no hay tantos)
+        """
+        if self._count == 0:
+            return []
+
+        size = self.cell_size
+        cx = math.floor(x / size)
+        cy = math.floor(y / size)
+        xs = self._xs
+        ys = self._ys
+        cells = self._cells
+        found = []  # (distancia², índice)
+        best = None  # (distancia², índice) para k = 1, sin ordenar
+
+        for ring, offsets in enumerate(self.RING_OFFSETS):
+            for dx, dy in offsets:
+                bucket = cells.get((cx + dx, cy + dy))
+                if not bucket:
+                    continue
+                for index in bucket:
+                    ddx = xs[index] - x
+                    ddy = ys[index] - y
+                    dist_sq = ddx * ddx + ddy * ddy
+                    if k == 1:
+                        if best is None or dist_sq < best[0]:
+                            best = (dist_sq, index)
+                    else:
+                        found.append((dist_sq, index))
+
+            # Lo no visitado está a más de ring * size del punto
+            bound_sq = (ring * size) ** 2
+            if k == 1:
+                if best is not None and best[0] <= bound_sq:
+                    return [best[1]]
+            elif len(found) >= k:
+                found.sort()
+                if found[k - 1][0] <= bound_sq:
+                    return [index for _, index in found[:k]]
+
+        # Vecindario insuficiente: búsqueda vectorizada sobre lo que queda
+        alive = self._alive_index[self._alive[self._alive_index]]
+        if len(alive) < len(self._alive_index) // 2:
+            self._alive_index = alive
+        delta = self.points[alive] - (x, y)
+        dist_sq = np.einsum("ij,ij->i", delta, delta)
+        if len(alive) > k:
+            nearest = np.argpartition(dist_sq, k - 1)[:k]
+            nearest = nearest[np.argsort(dist_sq[nearest])]
+        else:
+            nearest = np.argsort(dist_sq)
+        return alive[nearest].tolist()
+
+
+def path_endpoints(paths):
+    """
+    Extrae los extremos de una lista de polilíneas.
+
+    Returns:
+        tuple: (starts, ends) como arreglos (m, 2)
+    """
+    starts = np.array([np.asarray(path, dtype=np.float64).reshape(-1, 2)[0] for path in paths]).reshape(-1, 2)
+    ends = np.array([np.asarray(path, dtype=np.float64).reshape(-1, 2)[-1] for path in paths]).reshape(-1, 2)
+    return starts, ends
+
+
+def pen_up_distance(starts, ends, order, reversed_flags, start=(0.0, 0.0)):
+    """
+    Distancia total recorrida con la herramienta levantada.
+
+    Args:
+        starts, ends: Extremos (m, 2) de cada trazo
+        order: Índices de trazo en el orden del recorrido
+        reversed_flags: Por posición, True si el trazo se recorre invertido
+        start: Posición inicial de la herramienta
+
+    Returns:
+        float: Suma de las distancias desde start al primer trazo y del
+        final de cada trazo al comienzo del siguiente
+    """
+    if len(order) == 0:
+        return 0.0
+    order = np.asarray(order, dtype=np.int64)
+    flags = np.asarray(reversed_flags, dtype=bool)[:, None]
+    entries = np.where(flags, ends[order], starts[order])
+    exits = np.where(flags, starts[order], ends[order])
+    jumps = entries - np.vstack((np.asarray(start, dtype=np.float64).reshape(1, 2), exits[:-1]))
+    return float(np.hypot(jumps[:, 0], jumps[:, 1]).sum())
+
+
+def order_paths(starts, ends, start=(0.0, 0.0), time_budget=2.0, neighbors=8):
+    """
+    Ordena trazos para minimizar los desplazamientos con la herramienta levantada.
+
+    1. Vecino más cercano desde start sobre una PointGrid de extremos: el
+       siguiente trazo es el que tiene un extremo más cerca de la posición
+       actual, recorrido desde ese extremo.
+    2. Mejora local hasta agotar time_budget o no encontrar mejoras: 2-opt
+       (invertir un tramo del recorrido, lo que también invierte el sentido
+       de cada trazo del tramo) y Or-opt (mover 1 a 3 trazos seguidos a otra
+       posición, en cualquier sentido). Los candidatos salen de listas de
+       vecinos cercanos, así que cada pasada es lineal en el número de trazos.
+
+    Args:
+        starts, ends: Extremos (m, 2) de cada trazo
+        start: Posición inicial de la herramienta
+        time_budget: Tiempo máximo en segundos; la mejora local se corta al
+            agotarlo (el vecino más cercano siempre se completa)
+        neighbors: Vecinos por trazo considerados en la mejora local
+
+    Returns:
+        tuple: (order, reversed_flags, before, after) con la lista de
+        índices en el nuevo orden, la lista de indicadores de inversión por
+        posición y la distancia con la herramienta levantada del orden
+        original y del optimizado
+    """
+    deadline = time.perf_counter() + time_budget
+    starts = np.asarray(starts, dtype=np.float64).reshape(-1, 2)
+    ends = np.asarray(ends, dtype=np.float64).reshape(-1, 2)
+    m = len(starts)
+    before = pen_up_distance(starts, ends, np.arange(m), np.zeros(m, dtype=bool), start)
+    if m == 0:
+        return [], [], before, before
+
+    # Extremo 2p = inicio del trazo p, 2p + 1 = su fin
+    endpoints = np.empty((2 * m, 2))
+    endpoints[0::2] = starts
+    endpoints[1::2] = ends
+
+    endpoint_list = endpoints.tolist()
+
+    # 1) Vecino más cercano
+    grid = PointGrid(endpoints)
+    tour = []
+    flip = [False] * m
+    x, y = float(start[0]), float(start[1])
+    for _ in range(m):
+        endpoint = grid.nearest(x, y)[0]
+        path = endpoint // 2
+        grid.remove(2 * path)
+        grid.remove(2 * path + 1)
+        tour.append(path)
+        flip[path] = endpoint % 2 == 1
+        x, y = endpoint_list[endpoint ^ 1]
+
+    # 2) Mejora local con listas de vecinos
+    if time.perf_counter() < deadline:
+        near = _neighbor_lists(endpoints, grid.cell_size, neighbors)
+        start_grid = PointGrid(endpoints, grid.cell_size)
+        start_near = list({endpoint // 2 for endpoint in start_grid.nearest(*start, k=neighbors)})
+
+        _improve(tour, flip, near, start_near, starts.tolist(), ends.tolist(),
+                 (float(start[0]), float(start[1])), deadline)
+
+    reversed_flags = [flip[path] for path in tour]
+    after = pen_up_distance(starts, ends, tour, reversed_flags, start)
+    return tour, reversed_flags, before, after
+
+
+def _neighbor_lists(endpoints, cell_size, k, per_cell=8):
+    """
+    Calcula, para cada trazo, trazos cercanos (aproximados) de forma vectorizada.
+
+    Cada extremo busca sus k extremos más cercanos entre los de su celda y
+    las 8 vecinas, tomando a lo sumo per_cell puntos por celda.
+
+    Args:
+        endpoints: Arreglo (2m, 2); 2p y 2p + 1 son los extremos del trazo p
+        cell_size: Lado de celda
+        k: Vecinos por extremo
+
+    Returns:
+        list: Por trazo, lista de índices de trazos vecinos
+    """
+    cells = np.floor(endpoints / cell_size).astype(np.int64)
+    cells -= cells.min(axis=0) - 1  # Margen para las celdas vecinas
+    width = int(cells[:, 1].max()) + 2
+    keys = cells[:, 0] * width + cells[:, 1]
+
+    # Tabla densa celda -> hasta per_cell puntos (-1 = vacío)
+    order = np.argsort(keys, kind="stable")
+    sorted_keys = keys[order]
+    unique_keys, first = np.unique(sorted_keys, return_index=True)
+    rank = np.arange(len(keys)) - np.repeat(first, np.diff(np.append(first, len(keys))))
+    table = np.full((len(unique_keys), per_cell), -1, dtype=np.int64)
+    fits = rank < per_cell
+    table[np.searchsorted(unique_keys, sorted_keys[fits]), rank[fits]] = order[fits]
+
+    blocks = []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            target = keys + dx * width + dy
+            row = np.minimum(np.searchsorted(unique_keys, target), len(unique_keys) - 1)
+            blocks.append(np.where((unique_keys[row] == target)[:, None], table[row], -1))
+    candidates = np.hstack(blocks)
+
+    delta = endpoints[candidates] - endpoints[:, None, :]
+    dist_sq = np.einsum("ijk,ijk->ij", delta, delta)
+    own_path = np.arange(len(endpoints))[:, None] // 2
+    dist_sq[(candidates < 0) | (candidates // 2 == own_path)] = np.inf
+
+    k = min(k, candidates.shape[1])
+    best = np.argpartition(dist_sq, k - 1, axis=1)[:, :k]
+    rows = np.arange(len(endpoints))[:, None]
+    paths = np.where(np.isfinite(dist_sq[rows, best]), candidates[rows, best] // 2, -1)
+
+    # Unir las listas de los dos extremos de cada trazo, sin repetidos
+    paths = np.sort(paths.reshape(-1, 2 * k), axis=1)
+    paths[:, 1:][paths[:, 1:] == paths[:, :-1]] = -1
+    return [[path for path in row if path >= 0] for row in paths.tolist()]
+
+
+def _improve(tour, flip, near, start_near, starts, ends, start, deadline):
+    """
+    Aplica movimientos 2-opt y Or-opt que acortan el recorrido (in situ).
+
+    Args:
+        tour: Lista de trazos en orden (se modifica)
+        flip: Por trazo, True si se recorre invertido (se modifica)
+        near: Por trazo, lista de trazos vecinos
+        start_near: Trazos vecinos de la posición inicial
+        starts, ends: Extremos de cada trazo como listas de [x, y]
+        start: Posición inicial de la herramienta
+        deadline: Instante (time.perf_counter) en que se debe terminar
+    """
+    m = len(tour)
+    pos = [0] * m
+    for k, path in enumerate(tour):
+        pos[path] = k
+    hypot = math.hypot
+    eps = 1e-9
+
+    def entry(k):
+        path = tour[k]
+        return ends[path] if flip[path] else starts[path]
+
+    def exit_(k):
+        if k < 0:
+            return start
+        path = tour[k]
+        return starts[path] if flip[path] else ends[path]
+
+    def link(k):
+        # Desplazamiento desde la posición k a la k + 1 (k = -1 es el inicio)
+        if k + 1 >= m:
+            return 0.0
+        a = exit_(k)
+        b = entry(k + 1)
+        return hypot(a[0] - b[0], a[1] - b[1])
+
+    def dist(a, b):
+        return hypot(a[0] - b[0], a[1] - b[1])
+
+    def try_two_opt(lo, hi):
+        # Invertir el tramo lo+1..hi: nuevas uniones exit(lo)-exit(hi) y entry(lo+1)-entry(hi+1)
+        if lo > hi:
+            lo, hi = hi, lo
+        if lo < -1 or hi >= m or hi <= lo or hi - lo > MAX_REVERSAL:
+            return False
+        old = link(lo) + link(hi)
+        new = dist(exit_(lo), exit_(hi))
+        if hi + 1 < m:
+            new += dist(entry(lo + 1), entry(hi + 1))
+        if new + eps >= old:
+            return False
+
+        segment = tour[lo + 1:hi + 1]
+        segment.reverse()
+        tour[lo + 1:hi + 1] = segment
+        for k in range(lo + 1, hi + 1):
+            path = tour[k]
+            pos[path] = k
+            flip[path] = not flip[path]
+        return True
+
+    def try_or_opt(i, length, j):
+        # Mover el tramo i..i+length-1 para que quede después de la posición j
+        last = i + length - 1
+        if last >= m or i - 1 <= j <= last or j < -1 or j >= m:
+            return False
+
+        removed = link(i - 1) + link(last)
+        if last + 1 < m:
+            removed -= dist(exit_(i - 1), entry(last + 1))
+        inserted_old = link(j)
+        first_pt, last_pt = entry(i), exit_(last)
+        after_j = entry(j + 1) if j + 1 < m else None
+        before_j = exit_(j)
+
+        best = None
+        for reverse, (head, tail) in ((False, (first_pt, last_pt)), (True, (last_pt, first_pt))):
+            cost = dist(before_j, head) - inserted_old
+            if after_j is not None:
+                cost += dist(tail, after_j)
+            if cost + eps < removed and (best is None or cost < best[0]):
+                best = (cost, reverse)
+        if best is None:
+            return False
+
+        reverse = best[1]
+        segment = tour[i:last + 1]
+        del tour[i:last + 1]
+        if j > last:
+            j -= length
+        if reverse:
+            segment.reverse()
+            for path in segment:
+                flip[path] = not flip[path]
+        tour[j + 1:j + 1] = segment
+
+        for k in range(min(i, j + 1), max(last, j + length) + 1):
+            pos[tour[k]] = k
+        return True
+
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+
+        for path in start_near:
+            if try_two_opt(-1, pos[path]) or try_two_opt(-1, pos[path] - 1):
+                improved = True
+
+        for count, path in enumerate(range(m)):
+            if count % 256 == 0 and time.perf_counter() >= deadline:
+                return
+
+            for other in near[path]:
+                i = pos[path]
+                j = pos[other]
+                # Uniones nuevas entre salidas (i, j) o entre entradas (i-1, j-1)
+                if try_two_opt(i, j) or try_two_opt(i - 1, j - 1):
+                    improved = True
+                    continue
+
+                for length in (1, 2, 3):
+                    i = pos[path]
+                    j = pos[other]
+                    if try_or_opt(i, length, j) or try_or_opt(i, length, j - 1):
+                        improved = True
+                        break
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""Ida y vuelta de dibujos por los dos escritores DXF (documento y flujo R12)."""
+
+import numpy as np
+import pytest
+
+from archivo_dxf import FIT_TOLERANCE, load_dxf, read_dxf, save_dxf
+from modelo import Stroke
+
+# Tolerancia de la comparación de vértices (mm)
+TOLERANCE = 1e-6
+
+
+def make_drawing():
+    """Dibujo con trazos a mano alzada de varios colores y una forma de cada tipo."""
+    rng = np.random.default_rng(7)
+    t = np.linspace(0.0, 2 * np.pi, 200)
+    strokes = [
+        Stroke(np.column_stack([50 + 30 * np.cos(t), -60 + 20 * np.sin(t)]), "#000000", 2),
+        Stroke(np.cumsum(rng.normal(0.0, 0.5, (300, 2)), axis=0) + (120.0, -80.0), "#FF0000", 3),
+        Stroke([(10.0, -10.0), (12.5, -11.25)], "#0000FF", 1),
+    ]
+    shapes = [
+        {"type": "line", "start": (5.0, -5.0), "end": (40.0, -25.0), "color": "#00FF00", "width": 2},
+        {"type": "circle", "start": (80.0, -40.0), "end": (95.0, -40.0), "color": "#FF0000", "width": 2},
+        {"type": "rectangle", "start": (150.0, -10.0), "end": (190.0, -35.0), "color": "#000000",
+         "width": 2},
+        {"type": "triangle", "start": (20.0, -100.0), "end": (60.0, -140.0), "color": "#FF00FF",
+         "width": 2},
+    ]
+    return strokes, shapes
+
+
+def write_both(tmp_path, strokes, shapes, **options):
+    """Guarda el dibujo con los dos escritores y devuelve (documento, flujo)."""
+    document = tmp_path / "documento.dxf"
+    stream = tmp_path / "flujo.dxf"
+    save_dxf(str(document), strokes, shapes, **options)
+    save_dxf(str(stream), strokes, shapes, stream=True, **options)
+    return str(document), str(stream)
+
+
+def assert_same_geometry(a, b):
+    """Compara dos listas (dxftype, points_mm, color) de read_dxf, sin mirar el tipo de polilínea."""
+    assert len(a) == len(b)
+    for (type_a, points_a, color_a), (type_b, points_b, color_b) in zip(a, b):
+        polylines = ("LWPOLYLINE", "POLYLINE")
+        assert type_a == type_b or (type_a in polylines and type_b in polylines)
+        assert color_a == color_b
+        assert points_a.shape == points_b.shape
+        np.testing.assert_allclose(points_a, points_b, rtol=0, atol=TOLERANCE)
+
+
+def test_writers_read_back_the_drawing_vertices(tmp_path):
+    strokes, shapes = make_drawing()
+    document, stream = write_both(tmp_path, strokes, shapes)
+
+    for filename in (document, stream):
+        geometry, _ = read_dxf(filename)
+        assert len(geometry) == len(strokes) + len(shapes)
+        for stroke, (_, points_mm, color) in zip(strokes, geometry):
+            assert color == stroke.color
+            np.testing.assert_allclose(points_mm, stroke.points, rtol=0, atol=TOLERANCE)
+
+
+@pytest.mark.parametrize("fit_tolerance", [None, FIT_TOLERANCE])
+def test_stream_and_document_writers_agree(tmp_path, fit_tolerance):
+    strokes, shapes = make_drawing()
+    document, stream = write_both(tmp_path, strokes, shapes, fit_tolerance=fit_tolerance)
+
+    geometry_document, bbox_document = read_dxf(document)
+    geometry_stream, bbox_stream = read_dxf(stream)
+    assert_same_geometry(geometry_document, geometry_stream)
+    np.testing.assert_allclose(bbox_document, bbox_stream, rtol=0, atol=TOLERANCE)
+
+
+def test_load_dxf_round_trip_matches_between_writers(tmp_path):
+    strokes, shapes = make_drawing()
+    document, stream = write_both(tmp_path, strokes, shapes)
+
+    strokes_document, shapes_document, size_document = load_dxf(document, chain_tolerance=None)
+    strokes_stream, shapes_stream, size_stream = load_dxf(stream, chain_tolerance=None)
+
+    assert len(strokes_document) == len(strokes_stream) == len(strokes) + 2
+    for a, b in zip(strokes_document, strokes_stream):
+        assert a.color == b.color
+        np.testing.assert_allclose(a.points, b.points, rtol=0, atol=TOLERANCE)
+
+    assert [shape["type"] for shape in shapes_document] == ["line", "circle"]
+    assert len(shapes_document) == len(shapes_stream)
+    for a, b in zip(shapes_document, shapes_stream):
+        assert a["type"] == b["type"] and a["color"] == b["color"]
+        np.testing.assert_allclose(a["start"] + a["end"], b["start"] + b["end"],
+                                   rtol=0, atol=TOLERANCE)
+    np.testing.assert_allclose(size_document, size_stream, rtol=0, atol=TOLERANCE)
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Cinemática inversa y directa del brazo SCARA y detección de discontinuidades."""
+
+import numpy as np
+import pytest
+
+from cinematica import ELBOW_NEGATIVE, ELBOW_POSITIVE, ScaraArm, joint_discontinuities
+
+
+def annulus_points(arm, count, seed=0):
+    """Puntos al azar dentro del anillo alcanzable, lejos de sus bordes."""
+    rng = np.random.default_rng(seed)
+    low, high = arm.reach()
+    radius = rng.uniform(low + 1.0, high - 1.0, count)
+    angle = rng.uniform(-np.pi, np.pi, count)
+    return np.column_stack([arm.base[0] + radius * np.cos(angle),
+                            arm.base[1] + radius * np.sin(angle)])
+
+
+@pytest.mark.parametrize("elbow", [ELBOW_POSITIVE, ELBOW_NEGATIVE])
+def test_inverse_forward_round_trip(elbow):
+    arm = ScaraArm(200.0, 150.0, base=(30.0, -40.0), elbow=elbow)
+    points = annulus_points(arm, 500)
+    angles, reachable, elbows = arm.inverse(points)
+
+    assert reachable.all()
+    assert (elbows == elbow).all()
+    assert (elbow * angles[:, 1] >= 0).all()
+    np.testing.assert_allclose(arm.forward(angles), points, atol=1e-9)
+
+
+def test_points_outside_the_annulus_are_unreachable():
+    arm = ScaraArm(200.0, 150.0)
+    points = [(0.0, 0.0), (49.0, 0.0), (0.0, 351.0), (-250.0, 250.0), (100.0, 100.0)]
+    angles, reachable, elbows = arm.inverse(points)
+
+    assert reachable.tolist() == [False, False, False, False, True]
+    assert np.isnan(angles[:4]).all()
+    assert (elbows[:4] == 0).all()
+    assert not np.isnan(angles[4]).any()
+
+
+def test_joint_discontinuities_flag_elbow_flip():
+    arm = ScaraArm(200.0, 150.0)
+    points = np.column_stack([np.linspace(100.0, 110.0, 6), np.full(6, 150.0)])
+    angles, _, elbows = arm.inverse(points)
+    negative, _, _ = ScaraArm(200.0, 150.0, elbow=ELBOW_NEGATIVE).inverse(points)
+    angles[3:] = negative[3:]
+    elbows[3:] = ELBOW_NEGATIVE
+
+    assert joint_discontinuities(angles, elbows).tolist() == [3]
+
+
+def test_jump_at_polyline_start_is_ignored():
+    arm = ScaraArm(200.0, 150.0)
+    first = np.column_stack([np.linspace(200.0, 210.0, 5), np.zeros(5)])
+    second = np.column_stack([np.zeros(5), np.linspace(-200.0, -210.0, 5)])
+    angles, reachable, elbows, offsets, jumps = arm.inverse_polylines([first, second])
+
+    assert reachable.all()
+    assert offsets.tolist() == [0, 5, 10]
+    assert jumps.tolist() == []
+    # Sin los inicios de polilínea, el desplazamiento cuenta como salto
+    assert joint_discontinuities(angles, elbows).tolist() == [5]
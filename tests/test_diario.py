@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""Bloqueo de la sesión del diario entre editores abiertos a la vez."""
+
+import os
+
+import numpy as np
+import pytest
+
+from diario import SessionJournal
+from modelo import Stroke
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="el bloqueo usa fcntl.flock")
+
+
+def stroke():
+    """Un trazo corto cualquiera."""
+    return Stroke(np.array([(0.0, 0.0), (10.0, -5.0)]), "#000000", 2)
+
+
+def test_explicit_directory_is_not_shared(tmp_path):
+    first = SessionJournal(str(tmp_path))
+    first.recover()
+    second = SessionJournal(str(tmp_path))
+    try:
+        with pytest.raises(OSError):
+            second.recover()
+        # Sin la sesión tomada no escribe en la del otro editor
+        assert second.compact([stroke()], [], (30, 20)) == 0
+        assert second.directory == str(tmp_path)
+    finally:
+        first.close()
+
+    second.recover()
+    second.close()
+
+
+def test_second_editor_gets_its_own_session(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_STATE_HOME", str(tmp_path))
+    first = SessionJournal()
+    first.recover()
+    first.compact([], [], (30, 20))
+    first.add_stroke(stroke())
+    first.sync()
+
+    second = SessionJournal()
+    strokes, shapes, _, _ = second.recover()
+    # La sesión abierta del primer editor no se ofrece para recuperar
+    assert (strokes, shapes) == ([], [])
+    assert second.directory == first.directory + "-1"
+    second.close()
+    first.close()
+
+    # Cerrado el primer editor, su sesión se recupera
+    third = SessionJournal()
+    strokes, _, _, _ = third.recover()
+    assert third.directory == first.directory
+    assert len(strokes) == 1
+    np.testing.assert_allclose(strokes[0].points, stroke().points)
+    third.close()
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Envío de trabajos con ControllerSender a un controlador simulado sobre un pty."""
+
+import asyncio
+import itertools
+import os
+
+import numpy as np
+import pytest
+
+from envio import (CYCLE_START, FEED_HOLD, RX_BUFFER_SIZE, ControllerSender, SimulatedController,
+                   command_lines, open_serial, send_job)
+from trabajo import job_chunks
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="el controlador simulado usa un pty")
+
+
+def job_lines():
+    """Líneas de G-code de un trabajo generado con trabajo.job_chunks."""
+    t = np.linspace(0.0, 2 * np.pi, 60)
+    paths = [np.column_stack([20 * k + 10 * np.cos(t), 10 * np.sin(t)]) for k in range(8)]
+    return list(command_lines(job_chunks(paths, "gcode")))
+
+
+async def wait_until(condition, timeout=5.0):
+    """Espera a que condition() sea verdadera, sin bloquear el bucle."""
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "tiempo de espera agotado"
+        await asyncio.sleep(0.005)
+
+
+class RecordingWriter:
+    """Envuelve un StreamWriter y anota cada escritura."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.written = []
+
+    def write(self, data):
+        self.written.append(bytes(data))
+        self.writer.write(data)
+
+    async def drain(self):
+        await self.writer.drain()
+
+
+def test_job_streams_without_overflow():
+    lines = job_lines()
+    with SimulatedController(planner_slots=8, move_time=0.0005) as controller:
+        sender = ControllerSender()
+        stats = asyncio.run(send_job(iter(lines), controller.port, sender=sender))
+        assert controller.received == len(lines)
+
+    assert not stats.cancelled
+    assert stats.lines == len(lines)
+    assert stats.bytes == sum(len(line) + 1 for line in lines)
+    assert stats.errors == 0
+    assert stats.max_in_flight <= RX_BUFFER_SIZE
+    assert controller.max_rx <= RX_BUFFER_SIZE
+    assert controller.overflows == 0
+
+
+def test_pause_and_resume_send_realtime_commands():
+    lines = job_lines()
+
+    async def scenario(controller):
+        sender = ControllerSender()
+        reader, writer = await open_serial(controller.port)
+        recording = RecordingWriter(writer)
+        try:
+            task = asyncio.ensure_future(sender.run(iter(lines), reader, recording))
+            await wait_until(lambda: sender.stats.lines >= 20)
+
+            sender.pause()
+            await wait_until(lambda: controller.holding)
+            executed = controller.executed
+            await asyncio.sleep(0.05)
+            assert controller.executed == executed
+            assert sender.paused
+
+            sender.resume()
+            await wait_until(lambda: not controller.holding)
+            stats = await asyncio.wait_for(task, 10)
+        finally:
+            writer.close()
+        return stats, recording.written
+
+    with SimulatedController(planner_slots=8, move_time=0.002) as controller:
+        stats, written = asyncio.run(scenario(controller))
+
+    assert FEED_HOLD in written and CYCLE_START in written
+    assert written.index(FEED_HOLD) < written.index(CYCLE_START)
+    assert not stats.cancelled
+    assert stats.lines == len(lines)
+    assert controller.overflows == 0
+
+
+def test_cancel_ends_run():
+    # Un trabajo sin fin: sólo la cancelación puede terminar el envío
+    lines = itertools.cycle(job_lines())
+
+    async def scenario(controller, sender):
+        task = asyncio.ensure_future(send_job(lines, controller.port, sender=sender))
+        await wait_until(lambda: sender.stats.lines >= 50)
+        sender.cancel()
+        return await asyncio.wait_for(task, 5)
+
+    with SimulatedController(planner_slots=8, move_time=0.0005) as controller:
+        sender = ControllerSender()
+        stats = asyncio.run(scenario(controller, sender))
+
+    assert stats.cancelled
+    assert stats.lines >= 50
+
+
+def test_controls_after_the_job_do_not_raise():
+    with SimulatedController(move_time=0.0) as controller:
+        sender = ControllerSender()
+        asyncio.run(send_job(iter(job_lines()[:10]), controller.port, sender=sender))
+
+    # El bucle del envío ya está cerrado
+    sender.pause()
+    assert sender.paused
+    sender.resume()
+    sender.cancel()
+    assert not sender.paused
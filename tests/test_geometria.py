@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""Unión en cadenas de las piezas sueltas de un DXF."""
+
+import numpy as np
+import pytest
+
+from geometria import chain_polylines
+
+
+def test_pieces_with_shared_ends_form_a_closed_chain():
+    square = [np.array([(0.0, 0.0), (10.0, 0.0)]), np.array([(10.0, 10.0), (10.0, 0.0)]),
+              np.array([(10.0, 10.0), (0.0, 10.0)]), np.array([(0.0, 10.0), (0.0, 0.005)])]
+    loose = np.array([(50.0, 50.0), (60.0, 50.0)])
+    chains = chain_polylines(square + [loose], 0.01)
+
+    assert len(chains) == 2
+    points, indices, closed = chains[0]
+    assert sorted(indices) == [0, 1, 2, 3] and closed
+    assert len(points) == 5
+    np.testing.assert_array_equal(chains[1][0], loose)
+    assert chains[1][1:] == ([4], False)
+
+
+@pytest.mark.parametrize("tolerance", [0.0, -1.0, float("nan")])
+def test_tolerance_must_be_positive(tolerance):
+    with pytest.raises(ValueError):
+        chain_polylines([np.array([(0.0, 0.0), (1.0, 0.0)])], tolerance)
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""Lectura del formato JSON del editor."""
+
+import copy
+
+import pytest
+
+from modelo import drawing_from_dict, drawing_to_dict
+
+
+@pytest.mark.parametrize("legacy", [False, True])
+def test_loading_does_not_modify_the_json_object(legacy):
+    data = {
+        "canvas_size": {"width_cm": 30, "height_cm": 20},
+        "strokes": [{"points": [[0, 0], [10, -5]], "color": "#000000", "width": 2}],
+        "shapes": [{"type": "line", "start": [20, 40], "end": [60, 80], "color": "#FF0000", "width": 3}],
+    }
+    if not legacy:
+        data["units"] = "mm"
+    original = copy.deepcopy(data)
+
+    strokes, shapes, canvas_size = drawing_from_dict(data, pixels_per_mm=4.0)
+
+    assert data == original
+    assert shapes[0] is not data["shapes"][0]
+    assert canvas_size == (30, 20)
+    if legacy:
+        assert shapes[0]["start"] == (5.0, -10.0) and shapes[0]["end"] == (15.0, -20.0)
+    else:
+        assert drawing_to_dict(strokes, shapes, canvas_size)["shapes"] == original["shapes"]
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+"""Orden de recorrido de trazos con la herramienta levantada."""
+
+import numpy as np
+import pytest
+
+from recorrido import order_paths, path_endpoints, pen_up_distance
+
+
+def random_paths(count, seed):
+    """Trazos cortos al azar en una hoja de 400 x 300 mm."""
+    rng = np.random.default_rng(seed)
+    starts = rng.uniform((0.0, 0.0), (400.0, 300.0), (count, 2))
+    return [np.vstack([start, start + rng.normal(0.0, 10.0, 2)]) for start in starts]
+
+
+@pytest.mark.parametrize("count, seed", [(1, 0), (2, 1), (50, 2), (2000, 3)])
+def test_order_is_a_permutation_and_never_longer(count, seed):
+    starts, ends = path_endpoints(random_paths(count, seed))
+    order, flags, before, after = order_paths(starts, ends, start=(10.0, 10.0))
+
+    assert sorted(order) == list(range(count))
+    assert len(flags) == count
+    assert after <= before + 1e-9
+    assert after == pytest.approx(pen_up_distance(starts, ends, order, flags, (10.0, 10.0)))
+
+
+def test_reversal_flags_match_the_route():
+    # Cuatro trazos en fila, cada uno en sentido contrario al anterior
+    paths = [np.array([(0.0, 0.0), (10.0, 0.0)]), np.array([(30.0, 0.0), (20.0, 0.0)]),
+             np.array([(40.0, 0.0), (50.0, 0.0)]), np.array([(70.0, 0.0), (60.0, 0.0)])]
+    starts, ends = path_endpoints(paths)
+    order, flags, before, after = order_paths(starts, ends)
+
+    assert order == [0, 1, 2, 3]
+    assert flags == [False, True, False, True]
+    assert after == pytest.approx(30.0)
+    assert before == pytest.approx(60.0)
+
+
+def test_empty_drawing():
+    starts, ends = path_endpoints([])
+    assert order_paths(starts, ends) == ([], [], 0.0, 0.0)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+"""Origen de coordenadas del G-code exportado."""
+
+import re
+
+import numpy as np
+
+from trabajo import job_chunks
+
+MOVE = re.compile(r"G[01] X(\S+) Y(\S+)")
+
+
+def moves(chunks):
+    """Coordenadas (x, y) de los movimientos G0/G1 del texto generado."""
+    text = "".join(chunks)
+    return text, np.array([(float(x), float(y)) for x, y in MOVE.findall(text)])
+
+
+def test_gcode_origin_is_sheet_bottom_left():
+    # Modelo: origen en la esquina superior izquierda de un lienzo de 30 x 20 cm, Y hacia arriba
+    paths = [np.array([(0.0, 0.0), (300.0, -200.0)]), np.array([(10.0, -190.0), (20.0, -195.0)])]
+    text, points = moves(job_chunks(paths, "gcode", canvas_size=(30, 20)))
+
+    assert "; Origen: esquina inferior izquierda de la hoja (300 x 200 mm)" in text
+    np.testing.assert_allclose(points, [(0, 200), (300, 0), (10, 10), (20, 5)])
+
+
+def test_gcode_origin_offset_and_scale():
+    paths = [np.array([(0.0, 0.0), (300.0, -200.0)])]
+    _, points = moves(job_chunks(paths, "gcode", offset=(50.0, 20.0), scale=0.5,
+                                 canvas_size=(30, 20)))
+
+    np.testing.assert_allclose(points, [(50, 120), (200, 20)])
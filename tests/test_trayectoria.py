@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""Límites por articulación de la trayectoria muestreada del planificador."""
+
+import numpy as np
+import pytest
+
+from cinematica import ScaraArm
+from trayectoria import SAMPLE_COLUMNS, TrajectoryPlanner
+
+VELOCITY = (2.0, 3.0)  # rad/s
+ACCELERATION = (20.0, 30.0)  # rad/s²
+JERK = (400.0, 600.0)  # rad/s³
+
+
+def drawing():
+    """Un cuadrado, una espiral densa y un zigzag de esquinas agudas."""
+    t = np.linspace(0.0, 6 * np.pi, 400)
+    spiral = np.column_stack([200 + (5 + 2 * t) * np.cos(t), 100 + (5 + 2 * t) * np.sin(t)])
+    square = np.array([(120.0, -50.0), (180.0, -50.0), (180.0, 10.0), (120.0, 10.0), (120.0, -50.0)])
+    zigzag = np.column_stack([np.linspace(60.0, 160.0, 11), 200 + 15 * (np.arange(11) % 2)])
+    return [square, spiral, zigzag]
+
+
+@pytest.fixture
+def planner():
+    arm = ScaraArm(200.0, 150.0)
+    return TrajectoryPlanner(arm, VELOCITY, ACCELERATION, JERK, feed=150.0, travel_feed=300.0)
+
+
+def test_samples_respect_joint_limits(planner):
+    samples = np.vstack(list(planner.samples(drawing(), start=(250.0, 0.0), block_size=1000)))
+    dt = planner.sample_period
+    angles = np.unwrap(samples[:, [SAMPLE_COLUMNS.index("theta1"), SAMPLE_COLUMNS.index("theta2")]],
+                       axis=0)
+
+    np.testing.assert_allclose(np.diff(samples[:, 0]), dt)
+    velocity = np.abs(np.diff(angles, axis=0)) / dt
+    acceleration = np.abs(np.diff(angles, n=2, axis=0)) / dt ** 2
+    # Margen por las diferencias finitas sobre muestras discretas
+    assert (velocity <= np.array(VELOCITY) * 1.01).all()
+    assert (acceleration <= np.array(ACCELERATION) * 1.05).all()
+
+    # La trayectoria empieza y termina detenida en los extremos del dibujo
+    np.testing.assert_allclose(samples[0, 1:3], (250.0, 0.0), atol=1e-6)
+    np.testing.assert_allclose(samples[-1, 1:3], drawing()[-1][-1], atol=1e-6)
+
+
+def test_estimate_time_matches_sample_count(planner):
+    blocks = list(planner.samples(drawing(), start=(250.0, 0.0)))
+    samples = np.vstack(blocks)
+    pen = samples[:, SAMPLE_COLUMNS.index("pen")] == 1.0
+
+    total, drawing_time, travel = planner.estimate_time(drawing(), start=(250.0, 0.0))
+    dt = planner.sample_period
+    assert total == pytest.approx(len(samples) * dt)
+    assert drawing_time == pytest.approx(pen.sum() * dt)
+    assert travel == pytest.approx((~pen).sum() * dt)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Exportación de trabajos para el robot
+Cadena de generadores que convierte el dibujo en comandos para la máquina,
+independiente de Tkinter:
+
+    trazos y formas → transformación en mm → simplificación opcional
+    → emisor (G-code o ángulos de articulación) → archivo
+
+Cada etapa consume y produce un trazo a la vez y el texto se escribe a
+medida que se genera, así que la memoria no depende del tamaño del dibujo
+ni de la longitud del programa.
+
+Uso sin interfaz:
+    python trabajo.py dibujo.json -o dibujo.gcode
+    python trabajo.py dibujo.json -o dibujo.csv --formato articulaciones --l1 200 --l2 150
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from cinematica import ScaraArm
+from geometria import FLATTENING_DISTANCE, simplify_polyline
+from modelo import as_points_array, drawing_from_dict, shape_outline
+from recorrido import order_paths
+from trayectoria import TrajectoryPlanner
+
+
+FORMATS = ("gcode", "articulaciones")
+
+# Lienzo de los JSON que no indican su tamaño (el del editor, en cm)
+DEFAULT_CANVAS_SIZE = (30, 20)
+
+
+def drawing_paths(strokes, shapes, arc_tolerance=FLATTENING_DISTANCE):
+    """
+    Recorre el dibujo como polilíneas en mm del modelo.
+
+    Args:
+        strokes: Trazos del editor (sólo se exportan los de tipo "brush")
+        shapes: Formas del editor
+        arc_tolerance: Error de cuerda máximo (mm) al aproximar un círculo
+
+    Yields:
+        numpy.ndarray: Puntos (n, 2) de cada trazo y del contorno de cada forma
+    """
+    for stroke in strokes:
+        if stroke.type == "brush" and len(stroke.points) > 1:
+            yield stroke.points
+    for shape in shapes:
+        outline = shape_outline(shape, arc_tolerance)
+        if outline:
+            yield as_points_array(outline)
+
+
+def drawing_order(strokes_mm, shapes, time_budget=2.0, arc_tolerance=FLATTENING_DISTANCE):
+    """
+    Calcula el orden de los trazos que acorta los trayectos sin dibujar.
+
+    Los trazos con menos de dos puntos no se exportan y quedan fuera
+    del recorrido. La herramienta parte del origen del modelo.
+
+    Args:
+        strokes_mm: Puntos (n, 2) de cada trazo "brush", en mm del modelo
+        shapes: Formas del dibujo
+        time_budget: Segundos para mejorar el recorrido (ver recorrido.order_paths)
+        arc_tolerance: Error de cuerda máximo (mm) al aproximar un círculo
+
+    Returns:
+        tuple: (order, before, after, elapsed) con los pares (índice,
+        invertido) sobre strokes_mm + shapes, las distancias en mm con la
+        herramienta levantada antes y después y los segundos usados
+    """
+    t0 = time.perf_counter()
+    indices = [index for index, points in enumerate(strokes_mm) if len(points) > 1]
+    starts = [strokes_mm[index][0] for index in indices]
+    ends = [strokes_mm[index][-1] for index in indices]
+
+    # Las formas empiezan y terminan donde empieza y termina su contorno
+    for index, shape in enumerate(shapes, start=len(strokes_mm)):
+        outline = shape_outline(shape, arc_tolerance)
+        if outline:
+            indices.append(index)
+            starts.append(outline[0])
+            ends.append(outline[-1])
+
+    tour, reversed_flags, before, after = order_paths(starts, ends, time_budget=time_budget)
+    order = [(indices[path], reverse) for path, reverse in zip(tour, reversed_flags)]
+    return order, before, after, time.perf_counter() - t0
+
+
+def ordered_paths(strokes_mm, shapes, order, arc_tolerance=FLATTENING_DISTANCE):
+    """
+    Recorre trazos y contornos de formas en el orden de drawing_order.
+
+    Yields:
+        numpy.ndarray: Puntos (n, 2) de cada elemento, invertidos si corresponde
+    """
+    for index, reverse in order:
+        if index < len(strokes_mm):
+            points = strokes_mm[index]
+        else:
+            points = as_points_array(shape_outline(shapes[index - len(strokes_mm)], arc_tolerance))
+        yield points[::-1] if reverse else points
+
+
+def transform_paths(paths, offset=(0.0, 0.0), scale=1.0):
+    """
+    Lleva las polilíneas del modelo a las coordenadas de la máquina.
+
+    Args:
+        paths: Iterable de arreglos (n, 2) en mm del modelo
+        offset: Posición (mm) de la máquina a la que va el origen del modelo
+        scale: Factor de escala del dibujo
+
+    Yields:
+        numpy.ndarray: Nuevo arreglo (n, 2) en mm de la máquina
+    """
+    for points in paths:
+        yield points * scale + offset
+
+
+def simplify_paths(paths, tolerance):
+    """
+    Simplifica cada polilínea (Ramer–Douglas–Peucker) a medida que pasa.
+
+    Args:
+        paths: Iterable de arreglos (n, 2)
+        tolerance: Desviación máxima en mm, o None para no simplificar
+    """
+    for points in paths:
+        yield points if tolerance is None else simplify_polyline(points, tolerance)
+
+
+def gcode_lines(paths, feed=1500.0, z_up=5.0, z_down=0.0, origin=None):
+    """
+    Emite G-code para dibujar las polilíneas.
+
+    Cada trazo baja la herramienta en su primer punto, avanza con G1 y la
+    vuelve a subir; los desplazamientos entre trazos son G0.
+
+    Args:
+        paths: Iterable de arreglos (n, 2) en mm de la máquina
+        feed: Velocidad de dibujo en mm/min
+        z_up: Altura de la herramienta levantada (mm)
+        z_down: Altura de la herramienta dibujando (mm)
+        origin: Descripción del origen de coordenadas para la cabecera, o None
+
+    Yields:
+        str: Líneas de G-code terminadas en salto de línea
+    """
+    yield "; Trabajo generado por el editor de trazos\n"
+    if origin:
+        yield f"; Origen: {origin}\n"
+    yield "G21 ; milímetros\n"
+    yield "G90 ; coordenadas absolutas\n"
+    yield f"G0 Z{z_up:.3f}\n"
+
+    for points in paths:
+        (x, y), rest = points[0], points[1:].tolist()
+        yield f"G0 X{x:.3f} Y{y:.3f}\n"
+        yield f"G1 Z{z_down:.3f} F{feed:.0f}\n"
+        yield "".join(f"G1 X{x:.3f} Y{y:.3f}\n" for x, y in rest)
+        yield f"G0 Z{z_up:.3f}\n"
+
+    yield "M2\n"
+
+
+def joint_lines(paths, planner, start=None, block_size=4096):
+    """
+    Emite la trayectoria muestreada como ángulos de articulación.
+
+    Las polilíneas pasan por TrajectoryPlanner.samples, que las planifica
+    de a una; cada bloque de muestras se formatea como un trozo de CSV.
+
+    Args:
+        paths: Iterable de arreglos (n, 2) en mm de la máquina
+        planner: TrajectoryPlanner del brazo
+        start: Posición inicial del efector (ver TrajectoryPlanner.moves)
+        block_size: Muestras por trozo de texto
+
+    Yields:
+        str: Encabezado y filas "t,theta1,theta2,pen" (s, rad, 0/1)
+    """
+    yield "t,theta1,theta2,pen\n"
+    for block in planner.samples(paths, start, block_size):
+        rows = block[:, [0, 3, 4, 5]].tolist()
+        yield "".join("%.4f,%.6f,%.6f,%d\n" % tuple(row) for row in rows)
+
+
+def write_job(chunks, target):
+    """
+    Escribe el texto generado a medida que llega.
+
+    Args:
+        chunks: Iterable de trozos de texto
+        target: Ruta del archivo o objeto con método write()
+
+    Returns:
+        int: Líneas escritas
+    """
+    if hasattr(target, "write"):
+        return _write_chunks(chunks, target)
+    with open(target, "w", encoding="utf-8", newline="\n") as f:
+        return _write_chunks(chunks, f)
+
+
+def job_chunks(paths, fmt="gcode", offset=(0.0, 0.0), scale=1.0, tolerance=None,
+               feed=1500.0, planner=None, canvas_size=None):
+    """
+    Arma la cadena completa sobre un iterable de polilíneas del modelo.
+
+    El origen del modelo es la esquina superior izquierda del lienzo, con Y
+    hacia arriba: todo el dibujo tiene Y <= 0. Con canvas_size, los trazos
+    se trasladan para que la esquina inferior izquierda de la hoja quede en
+    offset y el dibujo en el primer cuadrante; el G-code lo indica en su
+    cabecera.
+
+    Args:
+        paths: Iterable de arreglos (n, 2) en mm del modelo (ver drawing_paths)
+        fmt: "gcode" o "articulaciones"
+        offset, scale: Transformación a la máquina (ver transform_paths)
+        tolerance: Tolerancia de simplificación en mm, o None
+        feed: Velocidad de dibujo del G-code en mm/min
+        planner: TrajectoryPlanner, requerido para "articulaciones"
+        canvas_size: (ancho_cm, alto_cm) de la hoja, o None para dejar el
+            origen del modelo en offset
+
+    Returns:
+        generator: Trozos de texto del trabajo
+
+    Raises:
+        ValueError: Si el formato no es válido o falta el planificador
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Formato no válido: {fmt!r}")
+    if fmt == "articulaciones" and planner is None:
+        raise ValueError("El formato de articulaciones requiere un planificador")
+
+    origin = None
+    if canvas_size is not None:
+        width_mm, height_mm = canvas_size[0] * 10 * scale, canvas_size[1] * 10 * scale
+        origin = (f"esquina inferior izquierda de la hoja ({width_mm:g} x {height_mm:g} mm) "
+                  f"en X{offset[0]:.3f} Y{offset[1]:.3f}")
+        offset = (offset[0], offset[1] + height_mm)
+
+    paths = simplify_paths(transform_paths(paths, offset, scale), tolerance)
+    if fmt == "gcode":
+        return gcode_lines(paths, feed, origin=origin)
+    return joint_lines(paths, planner)
+
+
+def main(argv=None):
+    """Exporta un dibujo JSON del editor desde la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Exporta un dibujo del editor de trazos como G-code o ángulos de articulación.")
+    parser.add_argument("dibujo", help="archivo JSON guardado por el editor")
+    parser.add_argument("-o", "--salida", default="-",
+                        help="archivo de salida (por defecto, la salida estándar)")
+    parser.add_argument("--formato", choices=FORMATS, default="gcode")
+    parser.add_argument("--origen", type=float, nargs=2, default=(0.0, 0.0), metavar=("X", "Y"),
+                        help="posición de la máquina para la esquina inferior izquierda "
+                             "de la hoja (mm)")
+    parser.add_argument("--escala", type=float, default=1.0)
+    parser.add_argument("--tolerancia", type=float, default=None,
+                        help="simplificar los trazos con esta tolerancia (mm)")
+    parser.add_argument("--avance", type=float, default=1500.0,
+                        help="velocidad de dibujo del G-code (mm/min)")
+
+    add_arm_arguments(parser)
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.dibujo, "r", encoding="utf-8") as f:
+            strokes, shapes, canvas_size = drawing_from_dict(json.load(f))
+
+        planner = arm_planner(args) if args.formato == "articulaciones" else None
+        chunks = job_chunks(drawing_paths(strokes, shapes), args.formato, args.origen,
+                            args.escala, args.tolerancia, args.avance, planner,
+                            canvas_size or DEFAULT_CANVAS_SIZE)
+        target = sys.stdout if args.salida == "-" else args.salida
+        lines = write_job(chunks, target)
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+
+    print(f"{lines} líneas escritas", file=sys.stderr)
+    return 0
+
+
+def add_arm_arguments(parser):
+    """Agrega a un argparse.ArgumentParser las opciones del brazo (ver arm_planner)."""
+    arm = parser.add_argument_group("brazo (formato articulaciones)")
+    arm.add_argument("--l1", type=float, default=200.0, help="primer eslabón (mm)")
+    arm.add_argument("--l2", type=float, default=150.0, help="segundo eslabón (mm)")
+    arm.add_argument("--base", type=float, nargs=2, default=(0.0, 0.0), metavar=("X", "Y"))
+    arm.add_argument("--velocidad", type=float, nargs=2, default=(3.0, 4.0),
+                     metavar=("W1", "W2"), help="rad/s")
+    arm.add_argument("--aceleracion", type=float, nargs=2, default=(20.0, 30.0),
+                     metavar=("A1", "A2"), help="rad/s²")
+    arm.add_argument("--jerk", type=float, nargs=2, default=(500.0, 800.0),
+                     metavar=("J1", "J2"), help="rad/s³")
+    arm.add_argument("--periodo", type=float, default=0.001, help="período de muestreo (s)")
+
+
+def arm_planner(args):
+    """
+    Crea el planificador con las opciones de add_arm_arguments.
+
+    Args:
+        args: Resultado de parse_args, con --avance en mm/min
+
+    Returns:
+        TrajectoryPlanner: Planificador del brazo
+    """
+    return TrajectoryPlanner(ScaraArm(args.l1, args.l2, args.base),
+                             args.velocidad, args.aceleracion, args.jerk,
+                             feed=args.avance / 60, sample_period=args.periodo)
+
+
+def _write_chunks(chunks, f):
+    """Escribe los trozos en un archivo abierto y cuenta las líneas."""
+    lines = 0
+    for chunk in chunks:
+        f.write(chunk)
+        lines += chunk.count("\n")
+    return lines
+
+
+if __name__ == "__main__":
+    sys.exit(main())
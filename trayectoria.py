@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Planificación de trayectorias del robot SCARA
+Parametrización temporal de los trazos bajo límites de velocidad,
+aceleración y jerk por articulación, independiente de Tkinter.
+
+Contenido:
+- Límites por segmento: los límites de cada articulación se traducen a
+  límites sobre la velocidad a lo largo del trazo con dθ/ds (jacobiano)
+- Velocidad de paso por los vértices, como los controladores CNC, para no
+  detenerse en cada uno: acotada por el salto de velocidad de cada
+  articulación, por su aceleración en curvas densas y por la desviación
+  máxima del recorrido al redondear la esquina
+- Anticipación (look-ahead): pasadas hacia atrás y hacia adelante sobre el
+  trazo completo, con perfiles trapezoidales por segmento
+- Límites de aceleración y jerk: dos promedios móviles (filtros FIR) en
+  cascada sobre los ángulos, de ancho T cada uno
+- Salida en flujo: bloques de muestras a período fijo generados a medida
+  que se consumen, y estimación del tiempo total sin muestrear
+
+Cada trazo se recorre de parada a parada (la herramienta baja y sube
+detenida); entre trazos hay un desplazamiento recto con la herramienta
+levantada. Las unidades son mm, s y radianes.
+"""
+
+import math
+
+import numpy as np
+
+from cinematica import wrap_angles
+
+
+# Columnas de los bloques de muestras
+SAMPLE_COLUMNS = ("t", "x", "y", "theta1", "theta2", "pen")
+
+
+class _Profile:
+    """Perfil de velocidad de un movimiento (trapecio por segmento)."""
+
+    __slots__ = ("points", "cum_length", "start_times", "v_in", "v_peak", "accel",
+                 "t_acc", "t_cruise", "duration")
+
+
+class TrajectoryPlanner:
+    """Planificador de trayectorias con anticipación para un ScaraArm."""
+
+    # Parte de la aceleración de cada articulación reservada a las esquinas;
+    # el resto queda para acelerar y frenar a lo largo del trazo
+    CORNER_SHARE = 0.5
+
+    # Largo máximo de segmento para evaluar dθ/ds: en un segmento largo la
+    # relación entre la velocidad del efector y la de las articulaciones varía
+    MAX_SEGMENT = 5.0  # mm
+
+    __slots__ = ("arm", "velocity", "acceleration", "jerk", "feed", "travel_feed",
+                 "corner_tolerance", "sample_period", "smoothing_time")
+
+    def __init__(self, arm, velocity, acceleration, jerk, feed=100.0, travel_feed=None,
+                 corner_tolerance=0.05, sample_period=0.001):
+        """
+        Crea un planificador.
+
+        Args:
+            arm: ScaraArm que ejecuta los trazos
+            velocity: (ω1, ω2) velocidad máxima de cada articulación (rad/s)
+            acceleration: (α1, α2) aceleración máxima de cada articulación (rad/s²)
+            jerk: (j1, j2) jerk máximo de cada articulación (rad/s³)
+            feed: Velocidad máxima del efector al dibujar (mm/s)
+            travel_feed: Velocidad máxima con la herramienta levantada
+                (mm/s); por defecto, sin límite cartesiano
+            corner_tolerance: Distancia máxima (mm) entre una esquina y el
+                recorrido filtrado que la redondea; más grande, esquinas
+                más rápidas
+            sample_period: Período de las muestras generadas (s)
+
+        Raises:
+            ValueError: Si algún límite no es positivo
+        """
+        limits = tuple(velocity) + tuple(acceleration) + tuple(jerk) + (feed, sample_period)
+        if min(limits) <= 0 or (travel_feed is not None and travel_feed <= 0):
+            raise ValueError("Los límites de movimiento deben ser positivos")
+
+        self.arm = arm
+        self.velocity = np.asarray(velocity, dtype=np.float64)
+        self.acceleration = np.asarray(acceleration, dtype=np.float64)
+        self.jerk = np.asarray(jerk, dtype=np.float64)
+        self.feed = float(feed)
+        self.travel_feed = math.inf if travel_feed is None else float(travel_feed)
+        self.corner_tolerance = float(corner_tolerance)
+        self.sample_period = float(sample_period)
+
+        # Tras el primer promedio, los trapecios (saltos de hasta 2·(1 - c)·α)
+        # dejan un jerk de 2·(1 - c)·α/T y las esquinas (pulsos de hasta c·α)
+        # suman c·α/T tras el segundo: T = (2 - c)·α/j respeta el límite
+        share = self.CORNER_SHARE
+        self.smoothing_time = (2 - share) * float(np.max(self.acceleration / self.jerk))
+
+    def moves(self, polylines, start=None):
+        """
+        Genera los movimientos de un dibujo, intercalando los desplazamientos.
+
+        Args:
+            polylines: Lista de arreglos (n, 2) en mm del modelo
+            start: Posición inicial del efector; por defecto, el comienzo
+                del primer trazo (sin desplazamiento inicial)
+
+        Yields:
+            tuple: (points, pen) con los puntos del movimiento y si la
+            herramienta dibuja (True) o se desplaza levantada (False)
+        """
+        position = None if start is None else np.asarray(start, dtype=np.float64).reshape(2)
+        for points in polylines:
+            points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+            if len(points) == 0:
+                continue
+            if position is not None and np.any(points[0] != position):
+                yield np.vstack((position, points[0])), False
+            if len(points) > 1:
+                yield points, True
+            position = points[-1]
+
+    def plan(self, points, pen=True):
+        """
+        Calcula el perfil de velocidad de un movimiento de parada a parada.
+
+        Args:
+            points: Arreglo (n, 2) en mm del modelo
+            pen: Si es un trazo (límite feed) o un desplazamiento (travel_feed)
+
+        Returns:
+            _Profile: Perfil con un trapecio por segmento
+
+        Raises:
+            ValueError: Si algún punto está fuera del alcance del brazo
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+
+        # Descartar segmentos de largo nulo
+        if len(points) > 1:
+            keep = np.ones(len(points), dtype=bool)
+            keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+            points = points[keep]
+
+        profile = _Profile()
+        m = len(points) - 1
+        if m < 1:
+            profile.points = points
+            profile.cum_length = np.zeros(1)
+            profile.start_times = np.zeros(1)
+            for name in ("v_in", "v_peak", "accel", "t_acc", "t_cruise"):
+                setattr(profile, name, np.zeros(0))
+            profile.duration = 0.0
+            return profile
+
+        angles = self._inverse(points)
+        caps = np.full(m, self.feed if pen else self.travel_feed)
+
+        # Zonas de esquina: a v_corner·T de cada vértice se agrega un punto y
+        # los dos segmentos resultantes van a la velocidad de paso, así los
+        # promedios (que abarcan T antes y T después) no mezclan la esquina
+        # con los tramos de aceleración
+        if m > 1:
+            lengths, directions = _segments(points)
+            v_corner = self._corner_speeds(angles[1:-1], directions, lengths)
+            span = np.minimum(v_corner * self.smoothing_time,
+                              0.5 * np.minimum(lengths[:-1], lengths[1:]))
+            zone = span > 1e-9
+            if zone.any():
+                corners = points[1:-1]
+                candidates = np.empty((m + 1, 3, 2))
+                candidates[:, 1] = points
+                candidates[1:-1, 0] = corners - span[:, None] * directions[:-1]
+                candidates[1:-1, 2] = corners + span[:, None] * directions[1:]
+                valid = np.zeros((m + 1, 3), dtype=bool)
+                valid[:, 1] = True
+                valid[1:-1, 0] = valid[1:-1, 2] = zone
+
+                # Límite de cada segmento nuevo: el de su segmento original,
+                # o la velocidad de paso si toca una esquina
+                seg_caps = np.empty((m + 1, 3))
+                seg_caps[:-1, 1] = seg_caps[1:, 0] = caps
+                seg_caps[1:-1, 0] = np.where(zone, np.minimum(caps[:-1], v_corner), caps[:-1])
+                seg_caps[1:-1, 1] = np.where(zone, np.minimum(caps[1:], v_corner), caps[1:])
+                seg_caps[1:-1, 2] = caps[1:]
+
+                points = candidates[valid]
+                caps = seg_caps[valid][:-1]
+
+                # Dos zonas que se tocan dejan un segmento de largo nulo
+                keep = np.ones(len(points), dtype=bool)
+                keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+                points = points[keep]
+                caps = caps[keep[1:]]
+
+        # Subdividir los segmentos largos (los puntos nuevos no son esquinas)
+        lengths, directions = _segments(points)
+        pieces = np.maximum(np.ceil(lengths / self.MAX_SEGMENT).astype(np.int64), 1)
+        if pieces.max() > 1:
+            segment = np.repeat(np.arange(len(pieces)), pieces)
+            first = np.repeat(np.cumsum(pieces) - pieces, pieces)
+            fraction = (np.arange(len(segment)) - first) / pieces[segment]
+            points = np.vstack((points[segment] + (fraction * lengths[segment])[:, None]
+                                * directions[segment], points[-1:]))
+            caps = caps[segment]
+            lengths, directions = _segments(points)
+
+        angles = self._inverse(points)
+        m = len(points) - 1
+
+        # Límites del segmento: el peor dθ/ds entre sus extremos y su punto medio
+        middle = self._inverse(0.5 * (points[:-1] + points[1:]))
+        rates = np.abs(self.arm.path_rates(angles[:-1], directions))
+        for at in (middle, angles[1:]):
+            np.maximum(rates, np.abs(self.arm.path_rates(at, directions)), out=rates)
+        rates = np.maximum(rates, 1e-12)
+        v_max = np.minimum(np.min(self.velocity / rates, axis=1), caps)
+        accel = (1 - self.CORNER_SHARE) * np.min(self.acceleration / rates, axis=1)
+
+        v_junction = np.zeros(m + 1)
+        if m > 1:
+            v_junction[1:-1] = np.minimum(self._corner_speeds(angles[1:-1], directions, lengths),
+                                          np.minimum(v_max[:-1], v_max[1:]))
+
+        # Anticipación: hacia atrás (poder frenar a tiempo) y hacia adelante
+        # (poder acelerar a tiempo); recurrencias secuenciales sobre listas
+        reach = (2 * accel * lengths).tolist()
+        limit = v_junction.tolist()
+        v = [0.0] * (m + 1)
+        for k in range(m - 1, 0, -1):
+            v[k] = min(limit[k], math.sqrt(v[k + 1] * v[k + 1] + reach[k]))
+        for k in range(1, m):
+            v[k] = min(v[k], math.sqrt(v[k - 1] * v[k - 1] + reach[k - 1]))
+        v = np.array(v)
+
+        # Trapecio de cada segmento entre v_in y v_out
+        v_in = v[:-1]
+        v_out = v[1:]
+        v_peak = np.minimum(v_max, np.sqrt(0.5 * (2 * accel * lengths + v_in ** 2 + v_out ** 2)))
+        v_peak = np.maximum(v_peak, np.maximum(v_in, v_out))
+        d_acc = (v_peak ** 2 - v_in ** 2) / (2 * accel)
+        d_dec = (v_peak ** 2 - v_out ** 2) / (2 * accel)
+        d_cruise = np.maximum(lengths - d_acc - d_dec, 0.0)
+        t_acc = (v_peak - v_in) / accel
+        t_dec = (v_peak - v_out) / accel
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t_cruise = np.where(d_cruise > 0, d_cruise / v_peak, 0.0)
+        seg_times = t_acc + t_cruise + t_dec
+
+        profile.points = points
+        profile.cum_length = np.concatenate(([0.0], np.cumsum(lengths)))
+        profile.start_times = np.concatenate(([0.0], np.cumsum(seg_times)))
+        profile.v_in = v_in
+        profile.v_peak = v_peak
+        profile.accel = accel
+        profile.t_acc = t_acc
+        profile.t_cruise = t_cruise
+        profile.duration = float(profile.start_times[-1])
+        return profile
+
+    def _inverse(self, points):
+        """Ángulos de puntos que deben ser alcanzables."""
+        angles, reachable, _ = self.arm.inverse(points)
+        if not reachable.all():
+            index = int(np.flatnonzero(~reachable)[0])
+            raise ValueError(f"Punto fuera del alcance del brazo: {points[index].tolist()}")
+        return angles
+
+    def _corner_speeds(self, angles, directions, lengths):
+        """
+        Velocidad máxima de paso por los vértices interiores de un trazo.
+
+        Al cambiar de dirección, la velocidad de cada articulación salta
+        v·|Δ(dθ/ds)|; el primer promedio lo reparte en T, así que una
+        esquina aislada aporta una aceleración v·|Δ(dθ/ds)|/T. En curvas
+        con vértices densos los saltos se acumulan dentro de T y lo que
+        cuenta es la aceleración centrípeta v²·|Δ(dθ/ds)|/L. Ambas se acotan
+        a CORNER_SHARE·α. La desviación del recorrido filtrado se acota de
+        la misma forma: v·|Δu|·T/6 en una esquina aislada y
+        v²·(|Δu|/L)·T²/12 en una curva.
+
+        Args:
+            angles: Ángulos (m - 1, 2) de los vértices interiores
+            directions: Direcciones unitarias (m, 2) de los segmentos
+            lengths: Largos (m,) de los segmentos
+
+        Returns:
+            numpy.ndarray: Velocidad máxima (m - 1,) en cada vértice (mm/s)
+        """
+        T = self.smoothing_time
+        spacing = 0.5 * (lengths[:-1] + lengths[1:])
+
+        jump = np.abs(self.arm.path_rates(angles, directions[1:])
+                      - self.arm.path_rates(angles, directions[:-1]))
+        turn = np.hypot(*(directions[1:] - directions[:-1]).T)
+
+        budget = self.CORNER_SHARE * self.acceleration
+        with np.errstate(divide="ignore"):
+            v_joint = np.min(np.minimum(budget * T / jump,
+                                        np.sqrt(budget * spacing[:, None] / jump)), axis=1)
+            v_path = np.minimum(6 * self.corner_tolerance / (T * turn),
+                                np.sqrt(12 * self.corner_tolerance * spacing / turn) / T)
+        return np.minimum(v_joint, v_path)
+
+    def sample_count(self, profile):
+        """Muestras de un movimiento, incluida la cola de los filtros."""
+        if profile.duration == 0:
+            return 0
+        return math.ceil(profile.duration / self.sample_period) + 2 * self._window() - 1
+
+    def estimate_time(self, polylines, start=None):
+        """
+        Estima el tiempo del trabajo sin generar las muestras.
+
+        Args:
+            polylines: Lista de arreglos (n, 2) en mm del modelo
+            start: Posición inicial del efector (ver moves)
+
+        Returns:
+            tuple: (total, drawing, travel) en segundos
+        """
+        drawing = travel = 0.0
+        for points, pen in self.moves(polylines, start):
+            seconds = self.sample_count(self.plan(points, pen)) * self.sample_period
+            if pen:
+                drawing += seconds
+            else:
+                travel += seconds
+        return drawing + travel, drawing, travel
+
+    def samples(self, polylines, start=None, block_size=4096):
+        """
+        Genera la trayectoria muestreada del dibujo completo, en flujo.
+
+        Sólo se planifica un movimiento a la vez y cada bloque se calcula
+        cuando se pide, así que la memoria no depende de la duración del
+        trabajo.
+
+        Args:
+            polylines: Lista de arreglos (n, 2) en mm del modelo
+            start: Posición inicial del efector (ver moves)
+            block_size: Máximo de muestras por bloque
+
+        Yields:
+            numpy.ndarray: Bloques (k, 6) con las columnas SAMPLE_COLUMNS:
+            tiempo (s), posición (mm), ángulos (rad) y 1.0 si la
+            herramienta dibuja o 0.0 si está levantada
+        """
+        offset = 0
+        for points, pen in self.moves(polylines, start):
+            profile = self.plan(points, pen)
+            count = self.sample_count(profile)
+            for first in range(0, count, block_size):
+                last = min(first + block_size, count)
+                yield self._sample_block(profile, first, last, offset, pen)
+            offset += count
+
+    def _window(self):
+        """Ancho del promedio móvil en muestras."""
+        return max(1, round(self.smoothing_time / self.sample_period))
+
+    def _sample_block(self, profile, first, last, offset, pen):
+        """Muestras [first, last) de un movimiento, con los filtros aplicados."""
+        window = self._window()
+        dt = self.sample_period
+
+        # La posición cruda es analítica en el tiempo: cada bloque calcula
+        # los 2·(window - 1) instantes previos que necesitan los promedios
+        distance = self._distance_at(profile, np.arange(first - 2 * (window - 1), last) * dt)
+        raw = np.column_stack((np.interp(distance, profile.cum_length, profile.points[:, 0]),
+                               np.interp(distance, profile.cum_length, profile.points[:, 1])))
+        angles = np.unwrap(self.arm.inverse(raw)[0], axis=0)
+
+        for _ in range(2):
+            sums = np.concatenate((np.zeros((1, 2)), np.cumsum(angles, axis=0)))
+            angles = (sums[window:] - sums[:-window]) / window
+
+        block = np.empty((last - first, 6))
+        block[:, 0] = (offset + np.arange(first, last)) * dt
+        block[:, 1:3] = self.arm.forward(angles)
+        block[:, 3:5] = wrap_angles(angles)
+        block[:, 5] = 1.0 if pen else 0.0
+        return block
+
+    def _distance_at(self, profile, times):
+        """Distancia recorrida sobre el perfil crudo (sin filtro) en cada instante."""
+        times = np.clip(times, 0.0, profile.duration)
+        k = np.clip(np.searchsorted(profile.start_times, times, side="right") - 1,
+                    0, len(profile.v_in) - 1)
+        tau = times - profile.start_times[k]
+
+        v_in = profile.v_in[k]
+        v_peak = profile.v_peak[k]
+        accel = profile.accel[k]
+        t_acc = profile.t_acc[k]
+        t_cruise = profile.t_cruise[k]
+
+        tau_acc = np.minimum(tau, t_acc)
+        tau_cruise = np.clip(tau - t_acc, 0.0, t_cruise)
+        tau_dec = np.maximum(tau - t_acc - t_cruise, 0.0)
+        along = (v_in * tau_acc + 0.5 * accel * tau_acc ** 2
+                 + v_peak * tau_cruise
+                 + v_peak * tau_dec - 0.5 * accel * tau_dec ** 2)
+        seg_length = profile.cum_length[k + 1] - profile.cum_length[k]
+        return profile.cum_length[k] + np.minimum(along, seg_length)
+
+
+def _segments(points):
+    """Largos (m,) y direcciones unitarias (m, 2) de los segmentos de una polilínea."""
+    deltas = np.diff(points, axis=0)
+    lengths = np.hypot(deltas[:, 0], deltas[:, 1])
+    return lengths, deltas / lengths[:, None]